@@ -1,29 +1,66 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+import anyio
+import asyncio
+import json
+from contextlib import asynccontextmanager
 import logging
-from io import StringIO
-from typing import Optional
+import os
+from typing import List, Optional
 
-from src.network import NetworkClass
+from src.async_network import AsyncNetworkClass
+from src import metrics
+from src.key_pool import KeyPool
+from src.logging import RingBufferHandler, use_queue_handler
 from src.person import PersonClass
+from src.push import PushHub
+from src.registry import ParticipantRegistry, SQLiteStore
 
-# Capture logs in-memory
-log_stream = StringIO()
-handler = logging.StreamHandler(log_stream)
+# Capture logs in a bounded in-memory ring buffer
+LOG_CAPACITY = 10000
+handler = RingBufferHandler(capacity=LOG_CAPACITY)
 handler.setLevel(logging.INFO)
 logger = logging.getLogger()
 logger.addHandler(handler)
 logger.setLevel(logging.INFO)
+# Format and write log records on a background thread, not in request handlers
+use_queue_handler()
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # Stop the delivery tasks and the key generator threads on shutdown
+    await network.close()
+    key_pool.close()
 
 app = FastAPI(
     title="Secure Messaging API [Ahsan]",
     description="FastAPI for Project",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan,
 )
 
-# Global network and participants storage
-network = NetworkClass(name="Internet")
-participants = {}
+# Global network and participants storage. The objects live for the whole
+# process; /reset clears them in place so in-flight requests never see a
+# half-swapped global.
+network = AsyncNetworkClass(name="Internet")
+# RSA key pairs generated in the background so POST /participant doesn't wait.
+# With P2P_KEY_DIR set, every worker process loads the same key per name.
+key_pool = KeyPool(depth=16, key_dir=os.environ.get("P2P_KEY_DIR")).start()
+# Deliveries are pushed to /ws/{participant} subscribers as they arrive;
+# a subscriber that stalls a single send this long is disconnected
+push_hub = PushHub()
+WS_SEND_TIMEOUT = 10.0
+# With P2P_REGISTRY_DB set, participants are shared by all uvicorn workers
+registry_db = os.environ.get("P2P_REGISTRY_DB")
+participants = ParticipantRegistry(
+    lambda name, is_bad_man: push_hub.hook(
+        PersonClass(name=name, is_bad_man=is_bad_man, key_pool=key_pool)
+    ),
+    network=network,
+    store=SQLiteStore(registry_db) if registry_db else None,
+)
 
 # Models
 class Participant(BaseModel):
@@ -38,57 +75,166 @@ class SendRequest(BaseModel):
     recipient: str
     message: str
 
+class BatchItem(BaseModel):
+    recipient: str
+    message: str
+
+class SendBatchRequest(BaseModel):
+    sender: str
+    messages: List[BatchItem]
+
 class ExchangeKeyRequest(BaseModel):
     sender: str
     recipient: str
     sym_key: str
 
+def require_key(sender, recipient):
+    # Keys live in the worker that ran /exchange; with a shared registry
+    # another worker would otherwise send the text in the clear
+    if participants.store is not None and recipient.name not in sender.secure_partners:
+        raise HTTPException(
+            status_code=409,
+            detail=f"No key shared with {recipient.name} in this worker; "
+            "exchange keys first",
+        )
+
 @app.post("/participant", summary="Create a participant")
 def create_participant(p: Participant):
-    if p.name in participants:
+    _, created = participants.create(p.name, is_bad_man=p.is_bad_man)
+    if not created:
         raise HTTPException(status_code=400, detail="Participant already exists")
-    person = PersonClass(name=p.name, is_bad_man=p.is_bad_man)
-    participants[p.name] = person
     return {"status": "created", "name": p.name}
 
 @app.post("/join", summary="Join the network")
 def join_network(req: JoinRequest):
-    person = participants.get(req.name)
-    if not person:
+    if participants.join(req.name) is None:
         raise HTTPException(status_code=404, detail="Participant not found")
-    network.join(person)
     return {"status": "joined", "name": req.name}
 
+@app.post("/leave", summary="Leave the network")
+def leave_network(req: JoinRequest):
+    person = participants.leave(req.name)
+    if person is None:
+        raise HTTPException(status_code=404, detail="Participant not found")
+    person.close()
+    return {"status": "left", "name": req.name}
+
 @app.post("/send", summary="Send message")
-def send_message(req: SendRequest):
+async def send_message(req: SendRequest):
     sender = participants.get(req.sender)
     recipient = participants.get(req.recipient)
     if not sender or not recipient:
         raise HTTPException(status_code=404, detail="Sender or recipient not found")
-    sender.send_message(recipient, req.message, network)
+    require_key(sender, recipient)
+    await sender.asend_message(recipient, req.message, network)
     return {"status": "sent", "from": req.sender, "to": req.recipient}
 
+@app.post("/send/batch", summary="Send several messages at once")
+async def send_batch(req: SendBatchRequest):
+    sender = participants.get(req.sender)
+    if not sender:
+        raise HTTPException(status_code=404, detail="Sender not found")
+    items = []
+    for item in req.messages:
+        recipient = participants.get(item.recipient)
+        if not recipient:
+            raise HTTPException(
+                status_code=404, detail=f"Recipient not found: {item.recipient}"
+            )
+        require_key(sender, recipient)
+        items.append((recipient, item.message))
+    await sender.asend_many(items, network)
+    return {"status": "sent", "from": req.sender, "count": len(items)}
+
 @app.post("/exchange", summary="Exchange symmetric key")
-def exchange_key(req: ExchangeKeyRequest):
+async def exchange_key(req: ExchangeKeyRequest):
     sender = participants.get(req.sender)
     recipient = participants.get(req.recipient)
     if not sender or not recipient:
         raise HTTPException(status_code=404, detail="Sender or recipient not found")
-    sender.exchange_key_with(recipient, req.sym_key, network)
+    await sender.aexchange_key_with(recipient, req.sym_key, network)
     return {"status": "key_exchanged", "from": req.sender, "to": req.recipient}
 
 @app.get("/logs", summary="Retrieve log output")
-def get_logs():
-    handler.flush()
-    return {"logs": log_stream.getvalue().splitlines()}
+def get_logs(
+    after: int = Query(0, ge=0, description="Return records with seq > after"),
+    limit: int = Query(1000, ge=1, le=LOG_CAPACITY),
+):
+    records = handler.after(after, limit)
+    cursor = records[-1]["seq"] if records else max(after, handler.last_seq)
+    return {"logs": records, "next": cursor}
+
+@app.get("/logs/stream", summary="Tail log output as server-sent events")
+async def stream_logs(after: int = Query(0, ge=0)):
+    async def events():
+        cursor = after
+        # Set from the logging thread for every new record; no thread waits
+        arrived = handler.subscribe()
+        try:
+            while True:
+                arrived.clear()
+                records = handler.after(cursor, 500)
+                if not records:
+                    try:
+                        await asyncio.wait_for(arrived.wait(), 15.0)
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                    continue
+                for record in records:
+                    yield f"id: {record['seq']}\ndata: {json.dumps(record)}\n\n"
+                cursor = records[-1]["seq"]
+        finally:
+            handler.unsubscribe(arrived)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/metrics", summary="Prometheus metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@app.websocket("/ws/{name}")
+async def push_messages(websocket: WebSocket, name: str):
+    """Push every message delivered to *name* as a JSON event."""
+    if participants.get(name) is None:
+        await websocket.close(code=4404, reason="Participant not found")
+        return
+    await websocket.accept()
+    sub = push_hub.subscribe(name)
+    try:
+        async with anyio.create_task_group() as tg:
+            async def forward():
+                while (event := await sub.get()) is not None:
+                    with anyio.move_on_after(WS_SEND_TIMEOUT) as scope:
+                        await websocket.send_json(event)
+                    if scope.cancelled_caught:
+                        break
+                # Evicted: the client fell a whole queue or timeout behind
+                await websocket.close(code=1008, reason="Slow consumer")
+                tg.cancel_scope.cancel()
+
+            async def watch():
+                # Clients only listen; reading notices when they disconnect
+                try:
+                    while True:
+                        await websocket.receive_text()
+                except WebSocketDisconnect:
+                    pass
+                tg.cancel_scope.cancel()
+
+            tg.start_soon(forward)
+            tg.start_soon(watch)
+    finally:
+        push_hub.unsubscribe(sub)
 
 @app.get("/reset", summary="Reset network and logs")
-def reset():
-    global network, participants
+async def reset():
     # reset network
-    network = NetworkClass(name="Internet")
-    participants.clear()
+    await network.close()
+    network.clear()
+    for person in participants.clear():
+        person.close()
     # reset logs
-    log_stream.truncate(0)
-    log_stream.seek(0)
+    handler.clear()
     return {"status": "reset"}
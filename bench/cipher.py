@@ -0,0 +1,73 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Micro-benchmark of CipherClass modes: DES/AES-CBC vs AES-GCM/ChaCha20-Poly1305.
+
+Usage:
+    python -m bench.cipher [--sizes 64 1024 65536] [--seconds 0.5]
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import argparse
+import os
+import time
+
+from src.cryp import CipherClass
+
+ALGOS = ("DES", "AES", "AES-GCM", "CHACHA20")
+
+
+def measure(fn, seconds):
+    """Call *fn* repeatedly for about *seconds*; return calls per second."""
+    calls = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        fn()
+        calls += 1
+        now = time.perf_counter()
+        if now >= deadline:
+            return calls / (now - start)
+
+
+def run(sizes, seconds):
+    """Benchmark every algorithm at every payload size.
+
+    Returns:
+        list[dict]: One row per (algo, size) with MB/s and wire overhead.
+    """
+    rows = []
+    for size in sizes:
+        data = os.urandom(size)
+        for algo in ALGOS:
+            cipher = CipherClass("bench-passphrase", algo=algo)
+            ct = cipher.encrypt_bytes(data)
+            enc = measure(lambda: cipher.encrypt_bytes(data), seconds)
+            dec = measure(lambda: cipher.decrypt_bytes(ct), seconds)
+            rows.append(
+                {
+                    "algo": algo,
+                    "size": size,
+                    "encrypt_MBps": enc * size / 1e6,
+                    "decrypt_MBps": dec * size / 1e6,
+                    "overhead_bytes": len(ct) - size,
+                }
+            )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 1024, 65536])
+    parser.add_argument("--seconds", type=float, default=0.5)
+    args = parser.parse_args(argv)
+    print(f"{'algo':<10}{'size':>8}{'enc MB/s':>12}{'dec MB/s':>12}{'overhead':>10}")
+    for row in run(args.sizes, args.seconds):
+        print(
+            f"{row['algo']:<10}{row['size']:>8}{row['encrypt_MBps']:>12.1f}"
+            f"{row['decrypt_MBps']:>12.1f}{row['overhead_bytes']:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
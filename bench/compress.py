@@ -0,0 +1,156 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Compression before encryption: bytes on the wire and CPU cost per message.
+
+Runs three corpora (short chat lines, multi-line log excerpts and base64
+of random bytes) through compress-then-encrypt with no compression, zlib, zlib with a
+preset dictionary built from other chat lines, and lzma. Each row shows the
+mean ciphertext size per message and the microseconds spent sending
+(compress + encrypt) and receiving (decrypt + decompress) one message.
+
+Usage:
+    python -m bench.compress [--messages 2000] [--algo AES-GCM] [--threshold 128]
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import argparse
+import base64
+import os
+import random
+import time
+
+from src import compress
+from src.cryp import CipherClass
+
+_NAMES = ("Alice", "Bob", "Joe", "Ahsan")
+_PLACES = ("the Memorial Union", "the library", "Devon Energy Hall", "the lab")
+_CHAT = (
+    "Hi {a}, are we still meeting at {p} at {h}PM?",
+    "Okay {a}, I got you. See you at {p} at {h}PM!",
+    "Running about {m} minutes late, save me a seat at {p}.",
+    "Did you push the fix for the key exchange? The build at {h}PM failed.",
+    "Can you send me the notes from today's lecture, {a}? Thanks!",
+)
+_LOG = "{t} [INFO] [{a}] Decrypted message from {b}: message {n} of the session"
+
+
+def _chat(rng):
+    return rng.choice(_CHAT).format(
+        a=rng.choice(_NAMES),
+        p=rng.choice(_PLACES),
+        h=rng.randint(1, 12),
+        m=rng.randint(2, 30),
+    )
+
+
+def _logs(rng):
+    lines = (
+        _LOG.format(
+            t=f"2026-10-18 12:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}",
+            a=rng.choice(_NAMES),
+            b=rng.choice(_NAMES),
+            n=rng.randint(1, 10_000),
+        )
+        for _ in range(rng.randint(10, 40))
+    )
+    return "\n".join(lines)
+
+
+def _base64(rng):
+    return base64.b64encode(os.urandom(rng.randint(256, 2048))).decode("ascii")
+
+
+CORPORA = {"chat": _chat, "logs": _logs, "base64": _base64}
+
+
+def _methods(dictionary):
+    return {
+        "none": None,
+        "zlib": dict(method=compress.ZLIB),
+        "zlib+dict": dict(method=compress.ZLIB, dictionary=dictionary),
+        "lzma": dict(method=compress.LZMA),
+    }
+
+
+def run(messages, algo, threshold, seed=0):
+    """Measure every (corpus, method) pair.
+
+    Returns:
+        list[dict]: One row per pair with mean plaintext and wire bytes, the
+        ratio to uncompressed, the share of messages compressed and the send
+        and receive cost in microseconds.
+
+    Raises:
+        AssertionError: If a message does not survive the round trip.
+    """
+    rng = random.Random(seed)
+    cipher = CipherClass("bench-passphrase", algo=algo)
+    dictionary = compress.build_dictionary(_chat(rng) for _ in range(500))
+    rows = []
+    for corpus, make in CORPORA.items():
+        texts = [make(rng) for _ in range(messages)]
+        plain = sum(len(t.encode("utf-8")) for t in texts)
+        baseline = None
+        for name, options in _methods(dictionary).items():
+            start = time.perf_counter()
+            sent = []
+            for text in texts:
+                frame = options and compress.compress(
+                    text, threshold=threshold, **options
+                )
+                sent.append((bool(frame), cipher.encrypt_bytes(frame or text.encode())))
+            send = time.perf_counter() - start
+
+            start = time.perf_counter()
+            received = []
+            for compressed, data in sent:
+                body = cipher.decrypt_bytes(data)
+                received.append(
+                    compress.decompress(body, dictionary)
+                    if compressed
+                    else body.decode("utf-8")
+                )
+            receive = time.perf_counter() - start
+            assert received == texts, f"{corpus}/{name} did not round-trip"
+
+            wire = sum(len(data) for _, data in sent)
+            baseline = baseline or wire
+            rows.append(
+                {
+                    "corpus": corpus,
+                    "method": name,
+                    "plain_bytes": plain / messages,
+                    "wire_bytes": wire / messages,
+                    "ratio": wire / baseline,
+                    "compressed": sum(c for c, _ in sent) / messages,
+                    "send_us": send / messages * 1e6,
+                    "receive_us": receive / messages * 1e6,
+                }
+            )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--algo", default="AES-GCM")
+    parser.add_argument(
+        "--threshold", type=int, default=None,
+        help="Bytes below which texts are not compressed (default: per method)",
+    )
+    args = parser.parse_args(argv)
+    print(
+        f"{'corpus':<8}{'method':<11}{'plain B':>9}{'wire B':>9}{'ratio':>7}"
+        f"{'compr.':>8}{'send µs':>9}{'recv µs':>9}"
+    )
+    for row in run(args.messages, args.algo, args.threshold):
+        print(
+            f"{row['corpus']:<8}{row['method']:<11}{row['plain_bytes']:>9.0f}"
+            f"{row['wire_bytes']:>9.0f}{row['ratio']:>7.2f}{row['compressed']:>8.0%}"
+            f"{row['send_us']:>9.1f}{row['receive_us']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
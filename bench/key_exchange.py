@@ -0,0 +1,51 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Benchmark of participant creation and key setup: RSA transport vs X25519.
+
+Usage:
+    python -m bench.key_exchange [--rounds 20]
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import argparse
+import logging
+import time
+
+from src.network import NetworkClass
+from src.person import PersonClass
+
+
+def run(mode, rounds):
+    """Time participant creation and one key exchange under *mode*.
+
+    Returns:
+        dict: Mean milliseconds for creation and for a full exchange.
+    """
+    start = time.perf_counter()
+    people = [PersonClass(f"p{i}", key_exchange=mode) for i in range(2 * rounds)]
+    create_ms = (time.perf_counter() - start) * 1000 / len(people)
+
+    network = NetworkClass("bench", mode="routed")
+    for person in people:
+        network.join(person)
+    start = time.perf_counter()
+    for i in range(rounds):
+        people[2 * i].exchange_key_with(people[2 * i + 1], "bench-key", network)
+    exchange_ms = (time.perf_counter() - start) * 1000 / rounds
+    return {"mode": mode, "create_ms": create_ms, "exchange_ms": exchange_ms}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+    print(f"{'mode':<8}{'create ms':>12}{'exchange ms':>14}")
+    for mode in ("RSA", "X25519"):
+        row = run(mode, args.rounds)
+        print(f"{row['mode']:<8}{row['create_ms']:>12.2f}{row['exchange_ms']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
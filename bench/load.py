@@ -0,0 +1,363 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Load generator for the messaging stack: NetworkClass/PersonClass or the API.
+
+Each scenario creates the participants, exchanges a session key along a ring
+(participant i talks to i + 1) and then sends messages round-robin, timing
+every send. A message is only timed once it has been delivered, so with the
+synchronous ``NetworkClass`` the latency covers encryption, fan-out and every
+recipient's decryption. With ``--rate`` each latency is measured from the
+send's scheduled time, so a stack that falls behind is not hidden.
+
+Usage:
+    python -m bench.load [--participants 20] [--messages 2000] [--rate 0]
+                         [--sizes 64 1024] [--algos DES AES]
+                         [--eavesdroppers 0.1] [--mode broadcast routed]
+                         [--crypto-workers 0]
+                         [--api] [--json results.json] [--compare old.json]
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import argparse
+import gc
+import json
+import logging
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+
+from src import person as person_module
+from src.fun_introduction import set_trace
+from src.crypto_pool import CryptoPool
+from src.key_pool import KeyPool
+from src.network import NetworkClass, BROADCAST, ROUTED
+from src.person import PersonClass
+
+# Messages replayed under tracemalloc per scenario (tracing is slow, so the
+# timed run and the allocation run are kept apart)
+ALLOC_SAMPLE = 200
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _summary(latencies, elapsed):
+    latencies.sort()
+    return {
+        "messages": len(latencies),
+        "throughput_msgps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+        "max_ms": (latencies[-1] if latencies else 0.0) * 1e3,
+    }
+
+
+def _paced(count, rate):
+    """Yield ``(i, scheduled_time)``, sleeping to hold *rate* msg/s (0 = flat out)."""
+    start = time.perf_counter()
+    for i in range(count):
+        if rate:
+            scheduled = start + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            yield i, scheduled
+        else:
+            yield i, time.perf_counter()
+
+
+def _allocations(send, count):
+    """Bytes and blocks allocated per message by *send*, via tracemalloc.
+
+    CPython has no cumulative allocation counter, so this reports the peak
+    traced memory growth per message and what is still held afterwards.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for i in range(count):
+            send(i)
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    return {
+        "peak_bytes_per_msg": (peak - base) / count,
+        "retained_bytes_per_msg": sum(s.size_diff for s in stats) / count,
+        "retained_blocks_per_msg": sum(s.count_diff for s in stats) / count,
+    }
+
+
+def _people(count, eavesdroppers, pool, seed, crypto_pool=None):
+    """Build *count* participants, the given fraction of them eavesdroppers."""
+    rng = random.Random(seed)
+    bad = set(rng.sample(range(count), round(count * eavesdroppers)))
+    return [
+        PersonClass(
+            f"p{i}", is_bad_man=i in bad, key_pool=pool, crypto_pool=crypto_pool
+        )
+        for i in range(count)
+    ]
+
+
+def run_network(
+    participants,
+    messages,
+    rate,
+    size,
+    algo,
+    eavesdroppers,
+    mode,
+    pool,
+    crypto_pool=None,
+):
+    """Drive ``NetworkClass``/``PersonClass`` directly for one scenario.
+
+    With a *crypto_pool* recipients decrypt on its workers; the clock then
+    stops only once every participant has drained.
+    """
+    person_module.ALGO = algo
+    people = _people(participants, eavesdroppers, pool, participants, crypto_pool)
+    network = NetworkClass("Bench", mode=mode)
+    for p in people:
+        network.join(p)
+    pairs = [(p, people[(i + 1) % len(people)]) for i, p in enumerate(people)]
+    for i, (sender, recipient) in enumerate(pairs):
+        sender.exchange_key_with(recipient, f"bench-key-{i}", network)
+    text = "x" * size
+
+    def send(i):
+        sender, recipient = pairs[i % len(pairs)]
+        sender.send_message(recipient, text, network)
+
+    latencies = []
+    start = time.perf_counter()
+    for i, scheduled in _paced(messages, rate):
+        send(i)
+        latencies.append(time.perf_counter() - scheduled)
+    for p in people:
+        p.drain()
+    row = _summary(latencies, time.perf_counter() - start)
+    row.update(_allocations(send, min(ALLOC_SAMPLE, messages)))
+    for p in people:
+        p.drain()
+    return row
+
+
+def run_api(participants, messages, rate, size, eavesdroppers):
+    """Drive the FastAPI app in-process through its HTTP endpoints."""
+    from fastapi.testclient import TestClient
+
+    import app as api
+
+    # Importing the app installs its INFO-level log capture; quiet it again
+    logging.getLogger().setLevel(logging.ERROR)
+    rng = random.Random(participants)
+    bad = set(rng.sample(range(participants), round(participants * eavesdroppers)))
+    names = [f"p{i}" for i in range(participants)]
+    text = "x" * size
+    with TestClient(api.app) as client:
+        client.get("/reset")
+        for i, name in enumerate(names):
+            client.post("/participant", json={"name": name, "is_bad_man": i in bad})
+            client.post("/join", json={"name": name})
+        for i, name in enumerate(names):
+            client.post(
+                "/exchange",
+                json={
+                    "sender": name,
+                    "recipient": names[(i + 1) % participants],
+                    "sym_key": f"bench-key-{i}",
+                },
+            )
+
+        def send(i):
+            response = client.post(
+                "/send",
+                json={
+                    "sender": names[i % participants],
+                    "recipient": names[(i + 1) % participants],
+                    "message": text,
+                },
+            )
+            response.raise_for_status()
+
+        latencies = []
+        start = time.perf_counter()
+        for i, scheduled in _paced(messages, rate):
+            send(i)
+            latencies.append(time.perf_counter() - scheduled)
+        # /send returns once queued; wait for delivery before stopping the clock
+        client.portal.call(api.network.drain)
+        row = _summary(latencies, time.perf_counter() - start)
+        row.update(_allocations(send, min(ALLOC_SAMPLE, messages)))
+        row["mode"] = api.network.mode  # the app's own network, not --mode
+        client.get("/reset")
+    return row
+
+
+def run(args):
+    """Run every requested scenario.
+
+    Returns:
+        list[dict]: One row per scenario with its parameters and results.
+    """
+    rows = []
+    scenario = {
+        "participants": args.participants,
+        "crypto_workers": args.crypto_workers,
+        "rate": args.rate,
+        "eavesdroppers": args.eavesdroppers,
+    }
+    pool = KeyPool(depth=min(args.participants, 32)).start()
+    crypto_pool = CryptoPool(args.crypto_workers) if args.crypto_workers else None
+    try:
+        for size in args.sizes:
+            for algo in args.algos:
+                for mode in args.mode:
+                    row = dict(
+                        scenario, target="network", size=size, algo=algo, mode=mode
+                    )
+                    row.update(
+                        run_network(
+                            args.participants,
+                            args.messages,
+                            args.rate,
+                            size,
+                            algo,
+                            args.eavesdroppers,
+                            mode,
+                            pool,
+                            crypto_pool,
+                        )
+                    )
+                    rows.append(row)
+    finally:
+        pool.close()
+        if crypto_pool is not None:
+            crypto_pool.close()
+    if args.api:
+        for size in args.sizes:
+            row = dict(scenario, target="api", size=size)
+            row["algo"] = person_module.ALGO
+            row.update(
+                run_api(
+                    args.participants,
+                    args.messages,
+                    args.rate,
+                    size,
+                    args.eavesdroppers,
+                )
+            )
+            rows.append(row)
+    return rows
+
+
+def _key(row):
+    return (
+        row["target"],
+        row["mode"],
+        row["algo"],
+        row["size"],
+        row["participants"],
+        row.get("crypto_workers", 0),
+    )
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--participants", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument(
+        "--rate", type=float, default=0, help="Target msg/s; 0 sends flat out"
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 1024])
+    parser.add_argument("--algos", nargs="+", default=["DES", "AES"])
+    parser.add_argument("--eavesdroppers", type=float, default=0.1)
+    parser.add_argument(
+        "--mode", nargs="+", choices=[BROADCAST, ROUTED], default=[BROADCAST, ROUTED]
+    )
+    parser.add_argument(
+        "--crypto-workers",
+        type=int,
+        default=0,
+        help="Decrypt on a CryptoPool of this many threads; 0 decrypts inline",
+    )
+    parser.add_argument("--api", action="store_true", help="Also drive the FastAPI app")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Earlier --json output to diff against")
+    args = parser.parse_args(argv)
+    if args.participants < 2:
+        parser.error("--participants must be at least 2")
+    if not 0 <= args.eavesdroppers <= 1:
+        parser.error("--eavesdroppers must be between 0 and 1")
+
+    # Measure the stack, not its console output (eavesdroppers failing to
+    # decrypt would otherwise log a warning per message)
+    set_trace(enabled=False, level=logging.ERROR)
+    previous_algo = person_module.ALGO
+    try:
+        rows = run(args)
+    finally:
+        person_module.ALGO = previous_algo
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as fh:
+            baseline = {_key(r): r for r in json.load(fh)["results"]}
+
+    print(
+        f"{'target':<8}{'mode':<10}{'algo':<6}{'size':>6}{'msg/s':>10}"
+        f"{'p50 ms':>9}{'p99 ms':>9}{'peak B/msg':>12}{'vs base':>9}"
+    )
+    for row in rows:
+        old = baseline.get(_key(row))
+        change = (
+            f"{(row['throughput_msgps'] / old['throughput_msgps'] - 1) * 100:+.0f}%"
+            if old and old["throughput_msgps"]
+            else ""
+        )
+        print(
+            f"{row['target']:<8}{row['mode']:<10}{row['algo']:<6}{row['size']:>6}"
+            f"{row['throughput_msgps']:>10.0f}{row['p50_ms']:>9.3f}"
+            f"{row['p99_ms']:>9.3f}{row['peak_bytes_per_msg']:>12.0f}{change:>9}"
+        )
+
+    if args.json:
+        report = {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "args": vars(args),
+            "results": rows,
+        }
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Wrote {len(rows)} results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
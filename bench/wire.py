@@ -0,0 +1,86 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Encode/decode throughput of WireMessage vs the JSON + base64 MessageClass form.
+
+Usage:
+    python -m bench.wire [--sizes 64 1024 65536] [--seconds 0.5]
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import argparse
+import base64
+import json
+import os
+
+from bench.cipher import measure
+from src.message import MessageClass, WireMessage, FLAG_ENCRYPTED
+
+
+def _json_encode(message):
+    return json.dumps(
+        {
+            "sender": message.sender,
+            "recipient": message.to_person,
+            "data": message.data,
+            "is_encrypted": message.is_encrypted,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def _json_decode(raw):
+    record = json.loads(raw)
+    return MessageClass(
+        base64.b64decode(record["data"]),
+        record["sender"],
+        record["recipient"],
+        record["is_encrypted"],
+    )
+
+
+def run(sizes, seconds):
+    """Benchmark both representations at every ciphertext size.
+
+    Returns:
+        list[dict]: One row per (format, size) with ops/s and encoded bytes.
+    """
+    rows = []
+    for size in sizes:
+        ciphertext = os.urandom(size)
+        legacy = MessageClass(
+            base64.b64encode(ciphertext).decode("utf-8"), "Alice", "Bob", True
+        )
+        wire = WireMessage("Alice", "Bob", ciphertext, FLAG_ENCRYPTED)
+        for fmt, encode, decode in (
+            ("json+b64", lambda: _json_encode(legacy), _json_decode),
+            ("wire", wire.encode, WireMessage.decode),
+        ):
+            raw = encode()
+            rows.append(
+                {
+                    "format": fmt,
+                    "size": size,
+                    "encode_ops": measure(encode, seconds),
+                    "decode_ops": measure(lambda: decode(raw), seconds),
+                    "encoded_bytes": len(raw),
+                }
+            )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 1024, 65536])
+    parser.add_argument("--seconds", type=float, default=0.5)
+    args = parser.parse_args(argv)
+    print(f"{'format':<10}{'size':>8}{'encode/s':>12}{'decode/s':>12}{'bytes':>9}")
+    for row in run(args.sizes, args.seconds):
+        print(
+            f"{row['format']:<10}{row['size']:>8}{row['encode_ops']:>12.0f}"
+            f"{row['decode_ops']:>12.0f}{row['encoded_bytes']:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
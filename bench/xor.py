@@ -0,0 +1,103 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Stored-history XOR cipher: per-byte loop vs whole-buffer and bulk decryption.
+
+Builds a synthetic encrypted history of roughly ``--mb`` megabytes, checks
+every implementation agrees, then times decrypting all of it.
+
+Usage:
+    python -m bench.xor [--mb 1 4] [--message-size 200] [--repeat 3]
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import argparse
+import base64
+import os
+import time
+
+import secure_chat
+
+KEY = "correct horse battery staple"
+
+
+def _decrypt_loop(key, ciphertext):
+    """The original per-byte implementation, kept as the baseline."""
+    data = base64.b64decode(ciphertext)
+    k = key.encode("utf-8")
+    plain = bytearray()
+    for i, byte in enumerate(data):
+        plain.append(byte ^ k[i % len(k)])
+    return plain.decode("utf-8")
+
+
+def _history(megabytes, message_size):
+    count = max(1, int(megabytes * 1e6) // message_size)
+    texts = [
+        base64.b64encode(os.urandom(message_size * 3 // 4)).decode("ascii")
+        for _ in range(count)
+    ]
+    return texts, [secure_chat.encrypt(KEY, t) for t in texts]
+
+
+def _best(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, message_size, repeat):
+    """Time each implementation on every history size.
+
+    Returns:
+        list[dict]: One row per (method, MB) with seconds, MB/s and speedup.
+
+    Raises:
+        AssertionError: If an implementation disagrees with the baseline.
+    """
+    methods = {
+        "loop": lambda cts: [_decrypt_loop(KEY, c) for c in cts],
+        "bigint": lambda cts: [secure_chat.decrypt(KEY, c) for c in cts],
+        "bulk": lambda cts: secure_chat.decrypt_many(KEY, cts),
+    }
+    rows = []
+    for mb in sizes:
+        texts, ciphertexts = _history(mb, message_size)
+        for name, method in methods.items():
+            assert method(ciphertexts) == texts, f"{name} decrypted incorrectly"
+        baseline = None
+        for name, method in methods.items():
+            seconds = _best(lambda: method(ciphertexts), repeat)
+            baseline = baseline or seconds
+            rows.append(
+                {
+                    "method": name,
+                    "MB": mb,
+                    "messages": len(ciphertexts),
+                    "seconds": seconds,
+                    "MBps": mb / seconds,
+                    "speedup": baseline / seconds,
+                }
+            )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[2])
+    parser.add_argument("--mb", type=float, nargs="+", default=[1, 4])
+    parser.add_argument("--message-size", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    print(f"{'method':<8}{'MB':>6}{'msgs':>8}{'seconds':>10}{'MB/s':>9}{'speedup':>9}")
+    for row in run(args.mb, args.message_size, args.repeat):
+        print(
+            f"{row['method']:<8}{row['MB']:>6g}{row['messages']:>8}"
+            f"{row['seconds']:>10.3f}{row['MBps']:>9.1f}{row['speedup']:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,26 @@
-
 import argparse
+import getpass
 import json
 import os
 import base64
+import hashlib
+import heapq
+import itertools
+from collections import deque
 from datetime import datetime
 from src.network import NetworkClass
 from src.person import PersonClass
+from src.transport import DEFAULT_ADDRESS, SocketNetworkClass
+from src.message_store import MessageLog, InboxIndex
+from src.key_pool import KeyPool
+from src.key_store import KeyStore
+from src.history import PlaintextCache, iter_history
 
-PLAIN_FILE = "messages_plain.json"
-ENC_FILE = "messages_enc.json"
+PLAIN_FILE = "messages_plain.jsonl"
+ENC_FILE = "messages_enc.jsonl"
+# Histories written by earlier versions as a single JSON array
+LEGACY_PLAIN_FILE = "messages_plain.json"
+LEGACY_ENC_FILE = "messages_enc.json"
 
 """
 key mapping json object
@@ -16,6 +28,10 @@ so that we can store the messages in a separaet encrypted
 we take the frozen object of the python to predefined the set of sender and recipent
 """
 keys_map = {}
+logs = {}
+indexes = {}
+# Decrypted inbox entries, so re-running `messages` only decrypts new ones
+plaintext_cache = PlaintextCache(max_entries=1024, max_bytes=1 << 20)
 
 def load_json(path):
     if os.path.exists(path):
@@ -27,27 +43,139 @@ def load_json(path):
     return []
 
 
-def save_json(path, data):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+def open_log(path, legacy_path=None):
+    """Return the shared append-only log for *path*, importing a legacy file once."""
+    if path not in logs:
+        fresh = not os.path.exists(path)
+        logs[path] = MessageLog(path)
+        if fresh and legacy_path:
+            for entry in load_json(legacy_path):
+                logs[path].append(entry)
+    return logs[path]
+
+
+def plain_log():
+    return open_log(PLAIN_FILE, LEGACY_PLAIN_FILE)
+
+
+def enc_log():
+    return open_log(ENC_FILE, LEGACY_ENC_FILE)
+
+
+def plain_index():
+    if PLAIN_FILE not in indexes:
+        indexes[PLAIN_FILE] = InboxIndex(plain_log())
+    return indexes[PLAIN_FILE]
+
+
+def enc_index():
+    if ENC_FILE not in indexes:
+        indexes[ENC_FILE] = InboxIndex(enc_log())
+    return indexes[ENC_FILE]
+
+
+def parse_page_args(tokens):
+    """Parse ``[--since <ts>] [--limit N]`` into ``(since, limit)``."""
+    parser = argparse.ArgumentParser(prog="messages", add_help=False, exit_on_error=False)
+    parser.add_argument("--since", default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    opts, extra = parser.parse_known_args(tokens)
+    if extra:
+        raise ValueError(f"unexpected arguments: {' '.join(extra)}")
+    return opts.since, opts.limit
+
+
+def page(records, since, limit):
+    """Apply the same windowing as ``InboxIndex`` to a merged iterator."""
+    if limit is None:
+        return records
+    if since is not None:
+        return itertools.islice(records, limit)
+    return iter(deque(records, maxlen=limit))
+
+
+def print_next_page(records, cmd):
+    if records:
+        print_next_cursor(records[-1], cmd)
+
+
+def print_next_cursor(last, cmd):
+    if last is not None:
+        print(f"(newer: {cmd} --since {last['timestamp']})")
+
+
+def keystream(k, n):
+    """The key bytes *k* repeated and cut to exactly *n* bytes."""
+    return (k * (n // len(k) + 1))[:n]
+
+
+def xor_bytes(data, stream):
+    """XOR two equal-length byte strings as one big-integer operation."""
+    if not data:
+        return b""
+    x = int.from_bytes(data, "big") ^ int.from_bytes(stream, "big")
+    return x.to_bytes(len(data), "big")
 
 
 def encrypt(key, text):
     b = text.encode("utf-8")
-    k = key.encode("utf-8")
-    cipher = bytearray()
-    for i, byte in enumerate(b):
-        cipher.append(byte ^ k[i % len(k)])
-    return base64.b64encode(bytes(cipher)).decode("ascii")
+    cipher = xor_bytes(b, keystream(key.encode("utf-8"), len(b)))
+    return base64.b64encode(cipher).decode("ascii")
 
 
 def decrypt(key, ciphertext):
     data = base64.b64decode(ciphertext)
-    k = key.encode("utf-8")
-    plain = bytearray()
-    for i, byte in enumerate(data):
-        plain.append(byte ^ k[i % len(k)])
-    return plain.decode("utf-8")
+    return xor_bytes(data, keystream(key.encode("utf-8"), len(data))).decode("utf-8")
+
+
+def decrypt_many(key, ciphertexts):
+    """Decrypt several ciphertexts under one *key* in one call.
+
+    The key restarts at every message, exactly as in :func:`decrypt`, so one
+    keystream as long as the longest message serves them all through
+    zero-copy slices.
+    """
+    blobs = [base64.b64decode(c) for c in ciphertexts]
+    stream = memoryview(keystream(key.encode("utf-8"), max(map(len, blobs), default=0)))
+    return [xor_bytes(b, stream[:len(b)]).decode("utf-8") for b in blobs]
+
+
+def key_id(key):
+    """Digest naming *key* in cache keys, so the cache never holds the key."""
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+def read_inbox(role, since=None, limit=None):
+    """Yield ``(record, text)`` for *role*'s inbox, oldest first.
+
+    Entries are merged from both logs and each one is decrypted only when
+    the caller pulls it, reusing ``plaintext_cache`` for anything already
+    seen under the same key. *text* is None if no key is known. It is an
+    ordinary ``str`` the cache cannot wipe, so callers should drop it once
+    shown.
+    """
+    merged = heapq.merge(
+        plain_index().inbox(role, since, limit),
+        enc_index().inbox(role, since, limit),
+        key=lambda m: m["timestamp"],
+    )
+
+    def conv_key(m):
+        return keys_map.get(frozenset({m["sender"], role}))
+
+    def decrypt_record(m):
+        key = conv_key(m)
+        if not key:
+            return None
+        data = base64.b64decode(m["ciphertext"])
+        return bytearray(xor_bytes(data, keystream(key.encode("utf-8"), len(data))))
+
+    def cache_key(m):
+        return m["offset"], key_id(conv_key(m) or "")
+
+    yield from iter_history(
+        page(merged, since, limit), decrypt_record, plaintext_cache, cache_key
+    )
 
 
 def append_message(sender, recipient, text):
@@ -62,9 +190,7 @@ def append_message(sender, recipient, text):
             "recipient": recipient,
             "ciphertext": cipher
         }
-        msgs = load_json(ENC_FILE)
-        msgs.append(entry)
-        save_json(ENC_FILE, msgs)
+        enc_log().append(entry)
     else:
         # plaintext message
         entry = {
@@ -73,9 +199,20 @@ def append_message(sender, recipient, text):
             "recipient": recipient,
             "message": text
         }
-        msgs = load_json(PLAIN_FILE)
-        msgs.append(entry)
-        save_json(PLAIN_FILE, msgs)
+        plain_log().append(entry)
+
+
+def show_incoming(me, role, message):
+    """Print a payload pushed by the hub while the prompt is waiting."""
+    sender = message.sender.name
+    text = message.data
+    if message.is_encrypted:
+        cipher = me.secure_partners.get(sender)
+        try:
+            text = f"(encrypted) {cipher.decrypt_bytes(text).decode('utf-8')}"
+        except (AttributeError, ValueError, UnicodeDecodeError):
+            text = f"(encrypted) {base64.b64encode(text).decode('ascii')}"
+    print(f"\n📨 {sender}→{message.to_person}: {text}\n{role}> ", end="", flush=True)
 
 
 def display_menu(is_eve, role):
@@ -85,7 +222,7 @@ def display_menu(is_eve, role):
 Commands:
   join <name>                            Add a target to monitor
   intercept <sender> <recipient> <text>  Intercept and modify a message
-  listen                                 Show plaintext traffic
+  listen [--since <ts>] [--limit N]      Show plaintext traffic
   targets                                List monitored targets
   help                                   Show this menu
   quit / exit                            Exit surveillance
@@ -100,7 +237,8 @@ Commands:
   send <recipient> <text>         Send a message (plaintext or encrypted if key exists)
   exchange <recipient> <key>      Exchange a symmetric key for encryption
   list                            List network participants
-  messages                        View your received messages
+  messages [--since <ts>] [--limit N]
+                                  View your received messages (paged)
   help                            Show this menu
   quit / exit                     Exit the system
 """)
@@ -108,12 +246,45 @@ Commands:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Secure Messaging Interface")
     parser.add_argument("role", help="Your name (Alice, Bob, or Eavesdropper)")
+    parser.add_argument(
+        "--hub", nargs="?", const=DEFAULT_ADDRESS, default=None,
+        help=f"Push messages through a socket hub (default {DEFAULT_ADDRESS}; "
+             "unix:///path also works). The first terminal hosts it."
+    )
+    parser.add_argument(
+        "--key-dir", default=None,
+        help="Load RSA keys from <dir>/<name>.pem, saving newly generated ones there"
+    )
+    parser.add_argument(
+        "--key-store", default=None,
+        help="Keep your key pair, session keys and conversation keys in this "
+             "passphrase-protected file (passphrase from $P2P_KEY_STORE_PASSPHRASE "
+             "or prompted)"
+    )
     args = parser.parse_args()
     role = args.role
     is_eve = role.lower() in ("eavesdropper", "eve", "attacker")
-    me = PersonClass(name=role, is_bad_man=is_eve)
-    net = NetworkClass(name="Internet")
-    net.join(me)
+    key_store = None
+    if args.key_store:
+        passphrase = os.environ.get("P2P_KEY_STORE_PASSPHRASE") or getpass.getpass(
+            f"Passphrase for {args.key_store}: "
+        )
+        try:
+            key_store = KeyStore(args.key_store, passphrase)
+        except ValueError as exc:
+            parser.error(str(exc))
+        keys_map = key_store.conversations(role)
+    key_pool = KeyPool(depth=4, key_dir=args.key_dir).start()
+    me = PersonClass(
+        name=role, is_bad_man=is_eve, key_pool=key_pool, key_store=key_store
+    )
+    if args.hub:
+        net = SocketNetworkClass(name="Internet", address=args.hub)
+        net.join(me)
+        net.connect(me, on_receive=lambda m: show_incoming(me, role, m))
+    else:
+        net = NetworkClass(name="Internet")
+        net.join(me)
 
     contacts = {}
     print(f"Welcome, {role}! You are now on the network.\n")
@@ -144,7 +315,7 @@ if __name__ == "__main__":
                     print(f"✗ {name} already joined.")
                 else:
                     bad = (not is_eve) and name.lower() in ("eavesdropper","eve","attacker")
-                    p = PersonClass(name=name, is_bad_man=bad)
+                    p = PersonClass(name=name, is_bad_man=bad, key_pool=key_pool)
                     net.join(p)
                     contacts[name] = p
                     status = " (⚠️  Eavesdropper)" if bad else ""
@@ -190,24 +361,18 @@ if __name__ == "__main__":
                     continue
 
                 if cmd == "messages":
-                    plain = load_json(PLAIN_FILE)
-                    inbox_plain = [m for m in plain if m["recipient"]==role]
-                    enc = load_json(ENC_FILE)
-                    inbox_enc = [m for m in enc if m["recipient"]==role]
+                    since, limit = parse_page_args(line.split()[1:])
                     print("\nYour messages:")
-                    items = []
-                    for m in inbox_plain:
-                        items.append((m["timestamp"], f"{m['sender']}: {m['message']}"))
-                    for m in inbox_enc:
-                        conv = frozenset({m['sender'],role})
-                        key = keys_map.get(conv)
-                        text = decrypt(key,m['ciphertext']) if key else "<cannot decrypt>"
-                        items.append((m["timestamp"], f"{m['sender']} (encrypted): {text}"))
-                    if not items:
+                    m = None
+                    for m, text in read_inbox(role, since, limit):
+                        if "ciphertext" in m:
+                            text = "<cannot decrypt>" if text is None else text
+                            print(f"[{m['timestamp']}] {m['sender']} (encrypted): {text}")
+                        else:
+                            print(f"[{m['timestamp']}] {m['sender']}: {m['message']}")
+                    if m is None:
                         print("No messages.")
-                    else:
-                        for ts, line in sorted(items):
-                            print(f"[{ts}] {line}")
+                    print_next_cursor(m, "messages")
                     continue
 
             else:
@@ -229,13 +394,15 @@ if __name__ == "__main__":
                     continue
 
                 if cmd == "listen":
-                    plain = load_json(PLAIN_FILE)
+                    since, limit = parse_page_args(line.split()[1:])
+                    plain = plain_index().traffic(since, limit)
                     print("\nPlaintext traffic:")
                     if not plain:
                         print("No messages.")
                     else:
                         for m in plain:
                             print(f"[{m['timestamp']}] {m['sender']}→{m['recipient']}: {m['message']}")
+                    print_next_page(plain, "listen")
                     continue
 
                 if cmd == "targets":
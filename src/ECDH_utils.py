@@ -0,0 +1,60 @@
+"""
+~~~~~~~~~~~~~~~~~~~
+Utility functions for X25519 key agreement and HKDF session-key derivation.
+
+A fast alternative to RSA key transport: both sides combine their own
+private key with the peer's public key and derive the same session key,
+so no private-key RSA operation is needed.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+from Crypto.Hash import SHA256
+from Crypto.Protocol.DH import key_agreement
+from Crypto.Protocol.KDF import HKDF
+from Crypto.PublicKey import ECC
+
+from src.metrics import KEYGEN_SECONDS
+
+SESSION_KEY_SIZE = 32
+SALT_SIZE = 16
+_INFO = b"p2p-communication session key"
+
+
+def generate_X25519_key_pairs():
+    """Generate an X25519 key pair.
+
+    Returns:
+        tuple: (private_key, public_key), both as `Crypto.PublicKey.ECC` objects.
+    """
+    with KEYGEN_SECONDS.labels("x25519").time():
+        private_key = ECC.generate(curve="curve25519")
+    return private_key, private_key.public_key()
+
+
+def export_public_key(public_key):
+    """Serialize an X25519 public key (DER SubjectPublicKeyInfo, 44 bytes)."""
+    return public_key.export_key(format="DER")
+
+
+def import_public_key(encoded):
+    """Load a public key produced by :func:`export_public_key`."""
+    return ECC.import_key(encoded)
+
+
+def derive_session_key(private_key, peer_public_key, salt):
+    """Derive a shared session key from an X25519 agreement via HKDF-SHA256.
+
+    Args:
+        private_key (Crypto.PublicKey.ECC.EccKey): Our X25519 private key.
+        peer_public_key (Crypto.PublicKey.ECC.EccKey): The peer's public key.
+        salt (bytes): Per-exchange random salt, sent alongside the public key.
+
+    Returns:
+        bytes: ``SESSION_KEY_SIZE`` bytes of key material.
+    """
+    return key_agreement(
+        static_priv=private_key,
+        static_pub=peer_public_key,
+        kdf=lambda z: HKDF(z, SESSION_KEY_SIZE, salt, SHA256, context=_INFO),
+    )
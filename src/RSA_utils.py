@@ -2,28 +2,78 @@
 ~~~~~~~~~~~~~~~~~~~
 Utility functions for RSA key generation, encryption, and decryption.
 
+Inputs longer than a single OAEP block are encrypted hybrid-style: RSA only
+wraps a random session key, and the text itself is sealed with
+ChaCha20-Poly1305 under that key.
+
 Author: Ahsan Bilal, University of Oklahoma
 """
 
 import base64
+import time
 from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_OAEP
+from Crypto.Cipher import PKCS1_OAEP, ChaCha20_Poly1305
+from Crypto.Random import get_random_bytes
+
+from src.metrics import KEYGEN_SECONDS, RSA_SECONDS
+
+KEY_SIZE = 1024
+SESSION_KEY_SIZE = 32
+NONCE_SIZE = 12
+TAG_SIZE = 16
+# PKCS1_OAEP defaults to SHA-1: 2 * 20-byte digests + 2 bytes of framing
+_OAEP_OVERHEAD = 2 * 20 + 2
 
 
-def generate_RSA_key_pairs():
+def generate_RSA_key_pairs(bits=KEY_SIZE):
     """Generate an RSA public/private key pair.
 
+    Args:
+        bits (int, optional): Modulus size. Defaults to ``KEY_SIZE``.
+
     Returns:
         tuple: (private_key, public_key), both as `Crypto.PublicKey.RSA` objects.
     """
-    private_key = RSA.generate(1024)
+    with KEYGEN_SECONDS.labels("rsa").time():
+        private_key = RSA.generate(bits)
     public_key = private_key.publickey()
     return private_key, public_key
 
 
+def wrap_key(session_key, public_key):
+    """Encrypt a short symmetric *session_key* with the recipient's public key.
+
+    Args:
+        session_key (bytes): Key material, at most one OAEP block.
+        public_key (Crypto.PublicKey.RSA.RsaKey): Recipient's public key.
+
+    Returns:
+        bytes: OAEP ciphertext, exactly one modulus long.
+    """
+    with RSA_SECONDS.labels("wrap").time():
+        return PKCS1_OAEP.new(public_key).encrypt(session_key)
+
+
+def unwrap_key(wrapped_key, private_key):
+    """Recover a session key produced by :func:`wrap_key`.
+
+    Args:
+        wrapped_key (bytes): OAEP ciphertext.
+        private_key (Crypto.PublicKey.RSA.RsaKey): Receiver's private RSA key.
+
+    Returns:
+        bytes: The original session key.
+    """
+    with RSA_SECONDS.labels("unwrap").time():
+        return PKCS1_OAEP.new(private_key).decrypt(wrapped_key)
+
+
 def encrypt_text(plain_text, public_key):
     """Encrypt plaintext using the recipient's RSA public key.
 
+    Text that fits in one OAEP block is encrypted directly; anything longer is
+    sealed with a fresh ChaCha20-Poly1305 session key that RSA wraps.
+
     Args:
         plain_text (str): Message to be encrypted.
         public_key (Crypto.PublicKey.RSA.RsaKey): Recipient's public key.
@@ -32,8 +82,14 @@ def encrypt_text(plain_text, public_key):
         str: Base64-encoded ciphertext.
     """
     original_bytes = plain_text.encode("utf-8")
-    cipher = PKCS1_OAEP.new(public_key)
-    encrypted_bytes = cipher.encrypt(original_bytes)
+    if len(original_bytes) <= public_key.size_in_bytes() - _OAEP_OVERHEAD:
+        encrypted_bytes = wrap_key(original_bytes, public_key)
+    else:
+        session_key = get_random_bytes(SESSION_KEY_SIZE)
+        nonce = get_random_bytes(NONCE_SIZE)
+        cipher = ChaCha20_Poly1305.new(key=session_key, nonce=nonce)
+        ct, tag = cipher.encrypt_and_digest(original_bytes)
+        encrypted_bytes = wrap_key(session_key, public_key) + nonce + ct + tag
     return base64.b64encode(encrypted_bytes).decode("utf-8")
 
 
@@ -46,8 +102,21 @@ def decrypt_text(encrypted_text, private_key):
 
     Returns:
         str: Decrypted original plaintext.
+
+    Raises:
+        ValueError: If the ciphertext is malformed or was modified.
     """
     encrypted_bytes = base64.b64decode(encrypted_text)
-    cipher = PKCS1_OAEP.new(private_key)
-    decrypted_bytes = cipher.decrypt(encrypted_bytes)
+    k = private_key.size_in_bytes()
+    if len(encrypted_bytes) == k:
+        decrypted_bytes = unwrap_key(encrypted_bytes, private_key)
+    else:
+        if len(encrypted_bytes) < k + NONCE_SIZE + TAG_SIZE:
+            raise ValueError("Ciphertext too short")
+        session_key = unwrap_key(encrypted_bytes[:k], private_key)
+        nonce = encrypted_bytes[k:k + NONCE_SIZE]
+        cipher = ChaCha20_Poly1305.new(key=session_key, nonce=nonce)
+        decrypted_bytes = cipher.decrypt_and_verify(
+            encrypted_bytes[k + NONCE_SIZE:-TAG_SIZE], encrypted_bytes[-TAG_SIZE:]
+        )
     return decrypted_bytes.decode("utf-8")
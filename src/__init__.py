@@ -1,7 +1,42 @@
-__all__ = ["RSA_utils", "cryp", "fun_introduction", "network"]
+__all__ = [
+    "RSA_utils",
+    "ECDH_utils",
+    "cryp",
+    "fun_introduction",
+    "network",
+    "async_network",
+    "transport",
+    "message_store",
+    "history",
+    "stream",
+    "compress",
+    "key_pool",
+    "key_store",
+    "crypto_pool",
+    "channel",
+    "reliable",
+    "registry",
+    "push",
+    "metrics",
+]
 
 from . import RSA_utils
+from . import ECDH_utils
 from . import cryp
 from . import fun_introduction
 from . import person
 from . import network
+from . import async_network
+from . import transport
+from . import message_store
+from . import history
+from . import stream
+from . import compress
+from . import key_pool
+from . import key_store
+from . import crypto_pool
+from . import channel
+from . import reliable
+from . import registry
+from . import push
+from . import metrics
@@ -0,0 +1,205 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Asyncio variant of the demo network with per-peer inboxes.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import asyncio
+import time
+
+from src.logging import logger
+from src.fun_introduction import introduce
+from src.metrics import DELIVERY_SECONDS, DROPPED
+from src.network import NetworkClass, BROADCAST
+
+BLOCK = "block"
+DROP_NEW = "drop_new"
+DROP_OLDEST = "drop_oldest"
+
+_KEY = "key"
+_MESSAGE = "message"
+_BATCH = "batch"
+
+_DROPPED_INBOX_FULL = DROPPED.labels("inbox_full")
+
+
+class AsyncNetworkClass(NetworkClass):
+    """Asynchronous counterpart of :class:`NetworkClass`.
+
+    Every participant owns a bounded ``asyncio.Queue`` inbox drained by its
+    own consumer task, so a slow ``receive_message`` (RSA decrypt, logging)
+    only delays that participant. Senders ``await`` the enqueue, which is
+    where backpressure is applied according to `policy`:
+
+    * ``"block"`` waits for room in the inbox (optionally bounded by
+      `put_timeout`, after which the message is dropped).
+    * ``"drop_new"`` discards the incoming message when the inbox is full.
+    * ``"drop_oldest"`` evicts the oldest queued message to make room.
+
+    Args:
+        name (str): Human-readable network name.
+        mode (str, optional): ``"broadcast"`` (default) or ``"routed"``.
+        queue_size (int, optional): Capacity of each inbox. Defaults to 1024.
+        policy (str, optional): Backpressure policy. Defaults to ``"block"``.
+        put_timeout (float, optional): Seconds a blocked sender waits before
+            dropping. ``None`` (default) waits forever.
+        offload (bool, optional): Run handlers in the default executor so
+            CPU-bound crypto does not stall the event loop. Defaults to True.
+
+    Raises:
+        ValueError: If `policy` is unknown or `queue_size` is not positive.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        mode: str = BROADCAST,
+        queue_size: int = 1024,
+        policy: str = BLOCK,
+        put_timeout: float = None,
+        offload: bool = True,
+    ):
+        super().__init__(name, mode=mode)
+        policy = policy.lower()
+        if policy not in (BLOCK, DROP_NEW, DROP_OLDEST):
+            raise ValueError(
+                "Unsupported policy: choose 'block', 'drop_new' or 'drop_oldest'"
+            )
+        if queue_size < 1:
+            raise ValueError("queue_size must be positive")
+        self.queue_size = queue_size
+        self.policy = policy
+        self.put_timeout = put_timeout
+        self.offload = offload
+        self.dropped = 0
+        self._inboxes = {}  # {person_name: asyncio.Queue}
+        self._consumers = {}  # {person_name: asyncio.Task}
+
+    def join(self, person):
+        """Register *person* and allocate its inbox."""
+        super().join(person)
+        self._inboxes.setdefault(person.name, asyncio.Queue(self.queue_size))
+
+    def leave(self, person):
+        """Unregister *person*, stop its consumer and discard its inbox.
+
+        Safe to call from any thread (e.g. a sync FastAPI endpoint): the
+        consumer is cancelled on its own event loop.
+        """
+        super().leave(person)
+        if person.name in self._index:
+            return  # a different participant now owns the name
+        task = self._consumers.pop(person.name, None)
+        if task is not None and not task.get_loop().is_closed():
+            task.get_loop().call_soon_threadsafe(task.cancel)
+        self._inboxes.pop(person.name, None)
+
+    def clear(self):
+        """Disconnect every participant; call :meth:`close` first."""
+        super().clear()
+        self._inboxes.clear()
+
+    def _ensure_consumer(self, person):
+        """Start the consumer task for *person* on the running loop if needed."""
+        task = self._consumers.get(person.name)
+        if task is None or task.done():
+            self._consumers[person.name] = asyncio.get_running_loop().create_task(
+                self._consume(person), name=f"{self.name}:{person.name}"
+            )
+        return self._inboxes[person.name]
+
+    async def _consume(self, person):
+        """Drain *person*'s inbox forever, handing each item to its handler."""
+        inbox = self._inboxes[person.name]
+        loop = asyncio.get_running_loop()
+        while True:
+            kind, message = await inbox.get()
+            handler = {
+                _KEY: person.rsa_encrypted_key,
+                _MESSAGE: person.receive_message,
+                _BATCH: person.receive_batch,
+            }[kind]
+            start = time.perf_counter()
+            try:
+                if self.offload:
+                    await loop.run_in_executor(None, handler, message)
+                else:
+                    handler(message)
+                DELIVERY_SECONDS.observe(time.perf_counter() - start)
+            except Exception:
+                logger.exception(
+                    "[NET %s] %s failed to handle a %s.", self.name, person.name, kind
+                )
+            finally:
+                inbox.task_done()
+
+    def _drop(self, person, kind):
+        self.dropped += 1
+        _DROPPED_INBOX_FULL.inc()
+        logger.warning(
+            "[NET %s] Inbox of %s is full; dropped a %s.", self.name, person.name, kind
+        )
+
+    async def _deliver(self, person, item):
+        """Enqueue *item* for *person* honouring the backpressure policy."""
+        inbox = self._ensure_consumer(person)
+        if self.policy == BLOCK:
+            try:
+                await asyncio.wait_for(inbox.put(item), self.put_timeout)
+            except asyncio.TimeoutError:
+                self._drop(person, item[0])
+            return
+        if inbox.full():
+            if self.policy == DROP_NEW:
+                self._drop(person, item[0])
+                return
+            inbox.get_nowait()
+            inbox.task_done()
+            self._drop(person, "queued " + item[0])
+        inbox.put_nowait(item)
+
+    async def _fan_out(self, kind, message):
+        await asyncio.gather(
+            *(self._deliver(p, (kind, message)) for p in self._recipients(message))
+        )
+
+    @introduce
+    async def send_message(self, message):
+        """Enqueue an arbitrary *message* object for the relevant participants."""
+        logger.info("[NET %s] Broadcasting payload from %s.", self.name, message.sender)
+        await self._fan_out(_MESSAGE, message)
+
+    @introduce
+    async def send_symmetric_key(self, message):
+        """Enqueue an RSA-encrypted AES key for the relevant participants."""
+        logger.info(
+            "[NET %s] Broadcasting symmetric key from %s.", self.name, message.sender
+        )
+        await self._fan_out(_KEY, message)
+
+    @introduce
+    async def send_batch(self, messages):
+        """Enqueue several payloads, one inbox item per participant."""
+        logger.info(
+            "[NET %s] Broadcasting batch of %d payloads.", self.name, len(messages)
+        )
+        await asyncio.gather(
+            *(
+                self._deliver(person, (_BATCH, batch))
+                for person, batch in self._batch_recipients(messages)
+            )
+        )
+
+    async def drain(self):
+        """Wait until every inbox has been fully processed."""
+        await asyncio.gather(*(q.join() for q in self._inboxes.values()))
+
+    async def close(self):
+        """Cancel all consumer tasks; undelivered messages are discarded."""
+        loop = asyncio.get_running_loop()
+        tasks = [t for t in self._consumers.values() if t.get_loop() is loop]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._consumers.clear()
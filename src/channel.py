@@ -0,0 +1,74 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Group channels: one shared key, one encryption, delivery to every member.
+
+The channel owner generates a group key and wraps it once for each member,
+using the pairwise session key when one exists and the member's RSA key
+otherwise. Membership changes rekey incrementally:
+
+* join  - the key is ratcheted forward with a hash, which existing members
+  compute locally; only the newcomer receives a wrapped key.
+* leave - a fresh random key is wrapped for the remaining members only.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import hashlib
+
+GROUP_KEY_SIZE = 32
+_RATCHET_LABEL = b"p2p-communication channel ratchet"
+
+
+def ratchet(key: bytes) -> bytes:
+    """Derive the next join epoch's key from the current one."""
+    return hashlib.sha256(_RATCHET_LABEL + key).digest()
+
+
+class ChannelClass:
+    """Public metadata of a group channel (no key material).
+
+    Args:
+        name (str): Channel name, unique per network.
+        owner (PersonClass): Participant that manages membership and keys.
+    """
+
+    def __init__(self, name: str, owner):
+        self.name = name
+        self.owner = owner
+        self.members = {}  # {person_name: PersonClass}
+        self.epoch = 0
+
+    def __str__(self):
+        return f"#{self.name}"
+
+
+class GroupKeyPayload:
+    """A group key for one epoch, wrapped for a single member.
+
+    Args:
+        channel (str): Channel name.
+        epoch (int): Epoch the key belongs to.
+        wrapped (bytes): Key encrypted under the pairwise cipher or RSA.
+        via (str): ``"pairwise"`` or ``"rsa"``.
+    """
+
+    def __init__(self, channel: str, epoch: int, wrapped: bytes, via: str):
+        self.channel = channel
+        self.epoch = epoch
+        self.wrapped = wrapped
+        self.via = via
+
+    def __str__(self):
+        return f"<group key {self.channel}@{self.epoch}>"
+
+
+class GroupCiphertext:
+    """A channel message, encrypted once under the epoch's group key."""
+
+    def __init__(self, channel: str, epoch: int, data: bytes):
+        self.channel = channel
+        self.epoch = epoch
+        self.data = data
+
+    def __str__(self):
+        return f"<group message {self.channel}@{self.epoch}>"
@@ -0,0 +1,199 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Optional compression of message bodies ahead of encryption.
+
+Ciphertext does not compress, so long chat text and log output have to be
+shrunk before `CipherClass` sees them. :func:`compress` returns a small
+self-describing frame (method byte, optional dictionary ID, compressed data)
+or None when compressing is not worth it: the text is below a size
+threshold, a quick level-1 probe of its head saves too little, or the result
+is not meaningfully smaller. Short, repetitive messages compress far better
+with a zlib preset dictionary shared by the two sides of a conversation;
+:func:`build_dictionary` makes one from sample messages.
+
+Compressing before encrypting lets message lengths reveal something about
+their content, so leave it off where an attacker can mix their own text
+into a secret's message.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import lzma
+import struct
+import zlib
+from functools import lru_cache
+
+from src.metrics import REGISTRY
+
+ZLIB = "zlib"
+LZMA = "lzma"
+
+DEFAULT_THRESHOLD = 128  # bytes; shorter texts are sent as they are
+DICTIONARY_THRESHOLD = 16  # the same, when a preset dictionary is available
+DEFAULT_LEVEL = 6
+MIN_SAVING = 0.1  # give up unless at least 10% smaller
+PROBE_SIZE = 4096  # bytes of a large text trial-compressed first
+MAX_DICTIONARY = 32 * 1024  # deflate only looks back 32 KiB
+MAX_PLAINTEXT = 16 * 1024 * 1024  # decompression limit
+
+# Frame method byte
+_DEFLATE = 1
+_DEFLATE_DICT = 2  # followed by the dictionary's adler32
+_LZMA = 3
+
+_DICT_ID = struct.Struct("!I")
+# The preset's 8 MiB window costs ~1 ms to set up per message; messages
+# rarely need more than 1 MiB of history
+_LZMA_FILTERS = [
+    {"id": lzma.FILTER_LZMA2, "preset": DEFAULT_LEVEL, "dict_size": 1 << 20}
+]
+
+COMPRESSION_BYTES = REGISTRY.counter(
+    "p2p_compression_bytes_total",
+    "Message bytes before (in) and after (out) compression.",
+    ("stage",),
+)
+COMPRESSION_SKIPPED = REGISTRY.counter(
+    "p2p_compression_skipped_total", "Messages sent uncompressed.", ("reason",)
+)
+_BYTES_IN = COMPRESSION_BYTES.labels("in")
+_BYTES_OUT = COMPRESSION_BYTES.labels("out")
+_BELOW_THRESHOLD = COMPRESSION_SKIPPED.labels("below_threshold")
+_INCOMPRESSIBLE = COMPRESSION_SKIPPED.labels("incompressible")
+
+
+@lru_cache(maxsize=64)
+def _primed(level, dictionary):
+    """Compressor with *dictionary* loaded; copying it is about twice as cheap
+    as loading the dictionary again for every message."""
+    return zlib.compressobj(level, zlib.DEFLATED, -15, zdict=dictionary)
+
+
+def _deflate(data, level, dictionary=None):
+    if dictionary:
+        c = _primed(level, dictionary).copy()
+    else:
+        c = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return c.compress(data) + c.flush()
+
+
+def compress(
+    text: str,
+    method: str = ZLIB,
+    dictionary: bytes = None,
+    threshold: int = None,
+    level: int = DEFAULT_LEVEL,
+):
+    """Compress *text* into a frame for :func:`decompress`, if it pays off.
+
+    Args:
+        text (str): Message body.
+        method (str, optional): ``"zlib"`` or ``"lzma"``. Defaults to zlib.
+        dictionary (bytes, optional): zlib preset dictionary; ignored by lzma.
+        threshold (int, optional): Smallest UTF-8 size worth compressing.
+            Defaults to ``DICTIONARY_THRESHOLD`` with a zlib dictionary and
+            ``DEFAULT_THRESHOLD`` otherwise.
+        level (int, optional): zlib level 1-9. Defaults to 6.
+
+    Returns:
+        bytes: The frame, or None to send *text* uncompressed.
+
+    Raises:
+        ValueError: If `method` is not "zlib" or "lzma".
+    """
+    if method not in (ZLIB, LZMA):
+        raise ValueError("Unsupported compression: choose 'zlib' or 'lzma'")
+    data = text.encode("utf-8")
+    if threshold is None:
+        use_dictionary = dictionary and method == ZLIB
+        threshold = DICTIONARY_THRESHOLD if use_dictionary else DEFAULT_THRESHOLD
+    if len(data) < threshold:
+        _BELOW_THRESHOLD.inc()
+        return None
+    if len(data) > 2 * PROBE_SIZE:
+        # Cheap look at the head before paying for the whole text
+        head = data[:PROBE_SIZE]
+        if len(_deflate(head, 1)) > (1 - MIN_SAVING) * len(head):
+            _INCOMPRESSIBLE.inc()
+            return None
+    if method == LZMA:
+        frame = bytes((_LZMA,)) + lzma.compress(
+            data, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS
+        )
+    elif dictionary:
+        frame = (
+            bytes((_DEFLATE_DICT,))
+            + _DICT_ID.pack(zlib.adler32(dictionary))
+            + _deflate(data, level, dictionary)
+        )
+    else:
+        frame = bytes((_DEFLATE,)) + _deflate(data, level)
+    if len(frame) > (1 - MIN_SAVING) * len(data):
+        _INCOMPRESSIBLE.inc()
+        return None
+    _BYTES_IN.inc(len(data))
+    _BYTES_OUT.inc(len(frame))
+    return frame
+
+
+def decompress(frame: bytes, dictionary: bytes = None) -> str:
+    """Inverse of :func:`compress`.
+
+    Args:
+        frame (bytes): Compressed frame.
+        dictionary (bytes, optional): The conversation's preset dictionary.
+
+    Returns:
+        str: The original text.
+
+    Raises:
+        ValueError: If the frame is corrupt, needs a dictionary other than
+            *dictionary*, or expands beyond ``MAX_PLAINTEXT`` bytes.
+    """
+    if not frame:
+        raise ValueError("Empty compressed frame")
+    method, body = frame[0], memoryview(frame)[1:]
+    try:
+        if method == _LZMA:
+            d = lzma.LZMADecompressor(format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+            data = d.decompress(body, MAX_PLAINTEXT)
+        elif method in (_DEFLATE, _DEFLATE_DICT):
+            if method == _DEFLATE_DICT:
+                if len(body) < _DICT_ID.size:
+                    raise ValueError("Truncated compressed frame")
+                (dict_id,) = _DICT_ID.unpack_from(body)
+                if not dictionary or zlib.adler32(dictionary) != dict_id:
+                    raise ValueError("Message needs an unknown compression dictionary")
+                d = zlib.decompressobj(-15, zdict=dictionary)
+                body = body[_DICT_ID.size:]
+            else:
+                d = zlib.decompressobj(-15)
+            data = d.decompress(body, MAX_PLAINTEXT)
+        else:
+            raise ValueError(f"Unknown compression method {method}")
+    except (zlib.error, lzma.LZMAError) as exc:
+        raise ValueError(f"Corrupt compressed frame: {exc}") from None
+    if not d.eof:
+        raise ValueError("Compressed frame is truncated or too large")
+    return data.decode("utf-8")
+
+
+def build_dictionary(samples, size: int = MAX_DICTIONARY) -> bytes:
+    """Preset dictionary from typical messages of a conversation.
+
+    zlib matches nearer the end of the dictionary with shorter codes, so the
+    most frequent samples go last. Both sides must use the same bytes.
+
+    Args:
+        samples (iterable[str]): Representative messages.
+        size (int, optional): Dictionary size limit. Defaults to 32 KiB.
+
+    Returns:
+        bytes: The dictionary.
+    """
+    counts = {}
+    for sample in samples:
+        counts[sample] = counts.get(sample, 0) + 1
+    ordered = sorted(counts, key=counts.get)  # least frequent first
+    dictionary = b"".join(s.encode("utf-8") for s in ordered)
+    return dictionary[-size:]
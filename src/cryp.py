@@ -1,42 +1,180 @@
 import base64
 import hashlib
+import time
+from functools import lru_cache
 from Crypto import Random
-from Crypto.Cipher import DES, AES
+from Crypto.Cipher import DES, AES, ChaCha20_Poly1305
 from Crypto.Util.Padding import pad, unpad
 
+from src.metrics import SYMMETRIC_SECONDS
+
 # This code taken from answer https://stackoverflow.com/a/21928790/4791963
 
+# One RNG handle shared by every cipher instead of a fresh one per message
+_rng = Random.new()
+
+# {algo: (cipher module, key length in bytes, authenticated)}
+_ALGOS = {
+    "AES": (AES, 16, False),  # AES-128-CBC
+    "DES": (DES, 8, False),  # DES-CBC, 56 bits used + parity
+    "AES-GCM": (AES, 16, True),  # AES-128-GCM
+    "CHACHA20": (ChaCha20_Poly1305, 32, True),  # ChaCha20-Poly1305
+}
+
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+# Histogram children resolved once, not per message
+_ENCRYPT_SECONDS = {a: SYMMETRIC_SECONDS.labels("encrypt", a) for a in _ALGOS}
+_DECRYPT_SECONDS = {a: SYMMETRIC_SECONDS.labels("decrypt", a) for a in _ALGOS}
+
+
+def derive_key(passphrase: str, algo: str) -> bytes:
+    """
+    Derive the symmetric key for *passphrase* under *algo*.
+
+    A single SHA-256 is cheap enough not to memoize, and a cache would keep
+    every passphrase alive.
+
+    Args:
+        passphrase (str): Arbitrary-length shared secret.
+        algo (str): "AES", "DES", "AES-GCM" or "CHACHA20".
+
+    Returns:
+        bytes: SHA-256 digest truncated to the algorithm's key length.
+    """
+    key_len = _ALGOS[algo][1]
+    return hashlib.sha256(passphrase.encode('utf-8')).digest()[:key_len]
+
+
 class CipherClass(object):
     """
-    A unified cipher wrapper supporting AES-128 and DES-56 in CBC mode with PKCS#7 padding.
+    A unified cipher wrapper supporting AES-128 and DES-56 in CBC mode with PKCS#7 padding,
+    plus the authenticated modes AES-128-GCM and ChaCha20-Poly1305.
+
+    The authenticated modes encrypt in a single pass without padding and append a 16-byte
+    tag, so any modified ciphertext is rejected on decryption.
 
     This class derives a fixed-size key from an arbitrary-length passphrase using SHA-256,
     then provides methods to encrypt and decrypt text via symmetric block ciphers.
+    :meth:`session` returns a shared instance, cached by the passphrase's digest, so
+    repeated key messages do not rebuild the cipher state.
 
     Args:
-        key (str): Passphrase used to derive the AES or DES key.
+        key (str): Passphrase used to derive the symmetric key.
         algo (str, optional): Cipher algorithm to use. "AES" selects AES-128 (16-byte key).
-                              "DES" selects DES-56 (8-byte key + parity). Defaults to "DES".
+                              "DES" selects DES-56 (8-byte key + parity).
+                              "AES-GCM" and "CHACHA20" select the authenticated modes.
+                              Defaults to "DES".
 
     Raises:
-        ValueError: If `algo` is not "AES" or "DES".
+        ValueError: If `algo` is not "AES", "DES", "AES-GCM" or "CHACHA20".
     """
     def __init__(self, key: str, algo: str = "DES"):
         algo = algo.upper()
-        if algo == "AES":
-            # AES block size is 16 bytes
-            self.bs = AES.block_size
-            # Derive a 16-byte key from the passphrase
-            self.key = hashlib.sha256(key.encode('utf-8')).digest()[:16]
-            self.cipher_mod = AES
-        elif algo == "DES":
-            # DES block size is 8 bytes
-            self.bs = DES.block_size
-            # Derive an 8-byte key (56 bits used + parity) from the passphrase
-            self.key = hashlib.sha256(key.encode('utf-8')).digest()[:8]
-            self.cipher_mod = DES
+        if algo not in _ALGOS:
+            raise ValueError(
+                "Unsupported algorithm: choose 'AES', 'DES', 'AES-GCM' or 'CHACHA20'"
+            )
+        self.algo = algo
+        self.cipher_mod, _, self.aead = _ALGOS[algo]
+        self.bs = getattr(self.cipher_mod, "block_size", 1)
+        self.key = derive_key(key, algo)
+
+    @classmethod
+    def from_raw_key(cls, key: bytes, algo: str = "DES") -> "CipherClass":
+        """
+        Build a cipher from already-derived key material (e.g. an HKDF output).
+
+        Args:
+            key (bytes): At least as many bytes as the algorithm's key length.
+            algo (str, optional): Cipher algorithm, as for the constructor.
+
+        Returns:
+            CipherClass: Cipher keyed with the leading bytes of *key*.
+        """
+        algo = algo.upper()
+        if algo not in _ALGOS:
+            raise ValueError(
+                "Unsupported algorithm: choose 'AES', 'DES', 'AES-GCM' or 'CHACHA20'"
+            )
+        key_len = _ALGOS[algo][1]
+        if len(key) < key_len:
+            raise ValueError(f"{algo} needs a {key_len}-byte key")
+        cipher = cls.__new__(cls)
+        cipher.algo = algo
+        cipher.cipher_mod, _, cipher.aead = _ALGOS[algo]
+        cipher.bs = getattr(cipher.cipher_mod, "block_size", 1)
+        cipher.key = key[:key_len]
+        return cipher
+
+    @classmethod
+    def session(cls, key: str, algo: str = "DES") -> "CipherClass":
+        """
+        Return the shared cipher for (*key*, *algo*), creating it on first use.
+
+        Instances hold no per-message state, so one object can serve every
+        message of a conversation. They are cached under the SHA-256 digest
+        of *key*, never the passphrase itself.
+        """
+        return cls._session(hashlib.sha256(key.encode("utf-8")).digest(), algo.upper())
+
+    @classmethod
+    @lru_cache(maxsize=256)
+    def _session(cls, digest: bytes, algo: str) -> "CipherClass":
+        return cls.from_raw_key(digest, algo)
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        """
+        Encrypt raw bytes and return IV + ciphertext without any text encoding.
+
+        Args:
+            data (bytes): Bytes to encrypt.
+
+        Returns:
+            bytes: Random IV followed by the CBC ciphertext, or for the
+            authenticated modes nonce + ciphertext + tag.
+        """
+        start = time.perf_counter()
+        if self.aead:
+            nonce = _rng.read(NONCE_SIZE)
+            cipher = self._aead_cipher(nonce)
+            ct, tag = cipher.encrypt_and_digest(data)
+            out = nonce + ct + tag
+        else:
+            iv = _rng.read(self.bs)
+            # CBC cipher objects are bound to their IV, so one is built per message
+            cipher = self.cipher_mod.new(self.key, self.cipher_mod.MODE_CBC, iv)
+            out = iv + cipher.encrypt(self._pad(data))
+        _ENCRYPT_SECONDS[self.algo].observe(time.perf_counter() - start)
+        return out
+
+    def decrypt_bytes(self, raw: bytes) -> bytes:
+        """
+        Decrypt IV + ciphertext bytes produced by :meth:`encrypt_bytes`.
+
+        Args:
+            raw (bytes): IV followed by ciphertext.
+
+        Returns:
+            bytes: Original plaintext bytes.
+
+        Raises:
+            ValueError: If padding is invalid, or if an authenticated ciphertext
+                was modified (tag mismatch).
+        """
+        start = time.perf_counter()
+        if self.aead:
+            if len(raw) < NONCE_SIZE + TAG_SIZE:
+                raise ValueError("Ciphertext too short")
+            cipher = self._aead_cipher(raw[:NONCE_SIZE])
+            out = cipher.decrypt_and_verify(raw[NONCE_SIZE:-TAG_SIZE], raw[-TAG_SIZE:])
         else:
-            raise ValueError("Unsupported algorithm: choose 'AES' or 'DES'")
+            iv = raw[:self.bs]
+            cipher = self.cipher_mod.new(self.key, self.cipher_mod.MODE_CBC, iv)
+            out = self._unpad(cipher.decrypt(raw[self.bs:]))
+        _DECRYPT_SECONDS[self.algo].observe(time.perf_counter() - start)
+        return out
 
     def encrypt(self, plaintext: str) -> str:
         """
@@ -51,12 +189,8 @@ class CipherClass(object):
         Returns:
             str: Base64-encoded string containing IV + ciphertext.
         """
-        data = plaintext.encode('utf-8')
-        data = self._pad(data)
-        iv = Random.new().read(self.bs)
-        cipher = self.cipher_mod.new(self.key, self.cipher_mod.MODE_CBC, iv)
-        ct = cipher.encrypt(data)
-        return base64.b64encode(iv + ct).decode('utf-8')
+        ct = self.encrypt_bytes(plaintext.encode('utf-8'))
+        return base64.b64encode(ct).decode('utf-8')
 
     def decrypt(self, b64cipher: str) -> str:
         """
@@ -72,13 +206,23 @@ class CipherClass(object):
             str: Decrypted UTF-8 plaintext.
 
         Raises:
-            ValueError: If padding is invalid.
+            ValueError: If padding is invalid or an authenticated ciphertext was modified.
+        """
+        return self.decrypt_bytes(base64.b64decode(b64cipher)).decode('utf-8')
+
+    def _aead_cipher(self, nonce: bytes):
+        """
+        Build the authenticated cipher object for *nonce*.
+
+        Args:
+            nonce (bytes): 12-byte per-message nonce.
+
+        Returns:
+            object: A GCM or ChaCha20-Poly1305 cipher with a 16-byte tag.
         """
-        raw = base64.b64decode(b64cipher)
-        iv, ct = raw[:self.bs], raw[self.bs:]
-        cipher = self.cipher_mod.new(self.key, self.cipher_mod.MODE_CBC, iv)
-        data = cipher.decrypt(ct)
-        return self._unpad(data).decode('utf-8')
+        if self.cipher_mod is AES:
+            return AES.new(self.key, AES.MODE_GCM, nonce=nonce, mac_len=TAG_SIZE)
+        return ChaCha20_Poly1305.new(key=self.key, nonce=nonce)
 
     def _pad(self, data: bytes) -> bytes:
         """
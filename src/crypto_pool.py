@@ -0,0 +1,176 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Worker pool for message encryption and decryption.
+
+PyCryptodome runs its ciphers in C with the GIL released, so a thread pool
+decrypts several messages at once on separate cores. A process pool is also
+available for pure-Python-heavy workloads; then only bytes cross the process
+boundary. `OrderedLanes` hands results back in per-sender order however the
+workers finish, so conversations stay in sequence while different senders
+proceed in parallel.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import base64
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from Crypto.PublicKey import RSA
+
+from src import RSA_utils, compress
+from src.cryp import CipherClass
+from src.logging import logger
+
+
+def _decrypt(algo, key, data, compressed=False, dictionary=None):
+    """Worker entry point: decrypt base64 text or raw bytes to a string."""
+    raw = base64.b64decode(data) if isinstance(data, str) else data
+    plain = CipherClass.from_raw_key(key, algo=algo).decrypt_bytes(raw)
+    if compressed:
+        return compress.decompress(plain, dictionary)
+    return plain.decode("utf-8")
+
+
+def _encrypt(algo, key, text):
+    """Worker entry point: encrypt *text* to base64, as ``CipherClass.encrypt``."""
+    return CipherClass.from_raw_key(key, algo=algo).encrypt(text)
+
+
+@lru_cache(maxsize=64)
+def _import_private_key(der):
+    return RSA.import_key(der)
+
+
+def _rsa_decrypt(private_key, text):
+    """Worker entry point; process workers receive the key as DER bytes."""
+    if isinstance(private_key, bytes):
+        private_key = _import_private_key(private_key)
+    return RSA_utils.decrypt_text(text, private_key)
+
+
+def completed(value):
+    """Return an already finished future holding *value*."""
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def chain(future, fn):
+    """Future for the future returned by ``fn(future.result())``.
+
+    Lets a job wait for another (e.g. a message for the key that precedes it)
+    without parking a worker on it.
+    """
+    out = Future()
+
+    def copy(inner):
+        if inner.exception() is not None:
+            out.set_exception(inner.exception())
+        else:
+            out.set_result(inner.result())
+
+    def step(first):
+        try:
+            inner = fn(first.result())
+        except BaseException as exc:
+            out.set_exception(exc)
+            return
+        inner.add_done_callback(copy)
+
+    future.add_done_callback(step)
+    return out
+
+
+class CryptoPool:
+    """Thread or process pool running CipherClass and RSA operations.
+
+    Args:
+        workers (int, optional): Pool size. Defaults to the CPU count.
+        use_processes (bool, optional): Use a process pool instead of threads.
+            Defaults to False.
+    """
+
+    def __init__(self, workers: int = None, use_processes: bool = False):
+        self.workers = workers or os.cpu_count() or 1
+        self.use_processes = use_processes
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = executor_cls(max_workers=self.workers)
+        self._der = {}  # {id(private_key): DER}, process pools only
+
+    def decrypt(
+        self, cipher: CipherClass, data, compressed: bool = False, dictionary=None
+    ) -> Future:
+        """Decrypt *data* (base64 str or raw bytes) with *cipher*.
+
+        A *compressed* plaintext is decompressed on the worker too, using the
+        conversation's preset *dictionary* if it has one.
+        """
+        return self._executor.submit(
+            _decrypt, cipher.algo, cipher.key, data, compressed, dictionary
+        )
+
+    def encrypt(self, cipher: CipherClass, text: str) -> Future:
+        """Encrypt *text* with *cipher* to base64."""
+        return self._executor.submit(_encrypt, cipher.algo, cipher.key, text)
+
+    def rsa_decrypt(self, private_key, text: str) -> Future:
+        """Run ``RSA_utils.decrypt_text`` on a worker."""
+        if self.use_processes:
+            der = self._der.get(id(private_key))
+            if der is None:
+                der = self._der[id(private_key)] = private_key.export_key(format="DER")
+            private_key = der
+        return self._executor.submit(_rsa_decrypt, private_key, text)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+class OrderedLanes:
+    """Run completion callbacks in submission order within each lane.
+
+    Futures in one lane (e.g. one sender) may finish in any order; their
+    callbacks still run one at a time, oldest first. Different lanes do not
+    wait for each other.
+    """
+
+    def __init__(self):
+        self._lanes = {}  # {lane: deque([(future, callback), ...])}
+        self._draining = set()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def submit(self, lane, future, callback):
+        """Queue ``callback(future)`` behind everything already in *lane*."""
+        with self._lock:
+            self._lanes.setdefault(lane, deque()).append((future, callback))
+        future.add_done_callback(lambda _: self._drain(lane))
+
+    def _drain(self, lane):
+        with self._lock:
+            if lane in self._draining:
+                return  # the thread already draining will reach this result
+            self._draining.add(lane)
+        while True:
+            with self._lock:
+                pending = self._lanes.get(lane)
+                if not pending or not pending[0][0].done():
+                    self._draining.discard(lane)
+                    if not pending:
+                        self._lanes.pop(lane, None)
+                        self._idle.notify_all()
+                    return
+                future, callback = pending.popleft()
+            try:
+                callback(future)
+            except Exception:
+                logger.exception("[CRYPTO] Completion callback for %s failed.", lane)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until every lane is empty; False if *timeout* expired first."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._lanes, timeout)
@@ -1,12 +1,95 @@
+import itertools
+import logging
 from functools import wraps
 from src.logging import logger
 
+BANNER = "banner"
+EVENT = "event"
+
+# Current tracing configuration, changed only through `set_trace`
+_config = {
+    "enabled": logger.isEnabledFor(logging.INFO),
+    "style": BANNER,
+    "sample_every": 1,
+    "generation": 0,  # bumped by every `set_trace`, so stale wrappers are rebuilt
+}
+# Every decorated method, so `set_trace` can rebind it: [_Introduced, ...]
+_registry = []
+
+
+def _make_wrapper(func):
+    """Build the tracing wrapper for *func* under the current configuration."""
+    name = func.__qualname__
+    if _config["style"] == EVENT:
+        counter = itertools.count()
+        every = _config["sample_every"]
+
+        @wraps(func)
+        def introduce_before_call(*args, **kwargs):
+            if next(counter) % every == 0:
+                actor = str(args[0])
+                logger.info(
+                    "event=%s actor=%s", name, actor,
+                    extra={"event": name, "actor": actor},
+                )
+            return func(*args, **kwargs)
+    else:
+        @wraps(func)
+        def introduce_before_call(*args, **kwargs):
+            # args[0] is always the instance (`self`) for bound methods
+            logger.info("\n%s\n%s:", "*-" * 37, args[0])
+            return func(*args, **kwargs)
+
+    introduce_before_call.__wrapped__ = func
+    return introduce_before_call
+
+
+class _Introduced:
+    """Placeholder that installs the plain or traced method on its class.
+
+    On ``__set_name__`` it replaces itself with either *func* (tracing off,
+    zero overhead) or the tracing wrapper, and remembers where it lives so
+    :func:`set_trace` can swap the binding later.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.owner = None
+        self.name = None
+        self.traced = None  # built by `install`, or on first call outside a class
+        self.generation = None  # `_config["generation"]` `traced` was built for
+        wraps(func)(self)
+
+    def __set_name__(self, owner, name):
+        self.owner, self.name = owner, name
+        _registry.append(self)
+        self.install()
+
+    def _wrapper(self):
+        if self.traced is None or self.generation != _config["generation"]:
+            self.traced = _make_wrapper(self.func)
+            self.generation = _config["generation"]
+        return self.traced
+
+    def install(self):
+        traced = self._wrapper()
+        setattr(self.owner, self.name, traced if _config["enabled"] else self.func)
+
+    def __call__(self, *args, **kwargs):
+        # Only reached when used outside a class body
+        if not _config["enabled"]:
+            return self.func(*args, **kwargs)
+        return self._wrapper()(*args, **kwargs)
+
+
 def introduce(func):
     """Decorator that emits a visual delimiter and the caller’s name **before**
     the wrapped method executes.
 
     The log entry makes it easy to spot high-level transitions in the
-    application’s output when debugging.
+    application’s output when debugging. Whether the method is wrapped at all
+    is decided when its class is created and again on every :func:`set_trace`
+    call, so disabled tracing adds no per-call overhead.
 
     Args:
         func (Callable): The instance method being wrapped.
@@ -14,10 +97,37 @@ def introduce(func):
     Returns:
         Callable: The wrapped method, unchanged in signature.
     """
-    @wraps(func)
-    def introduce_before_call(*args, **kwargs):
-        # args[0] is always the instance (`self`) for bound methods
-        logger.info("\n%s\n%s:", "*-" * 37, args[0])
-        return func(*args, **kwargs)
+    return _Introduced(func)
 
-    return introduce_before_call
\ No newline at end of file
+
+def set_trace(enabled=None, style=None, sample_every=None, level=None):
+    """Reconfigure `introduce` tracing and rebind every decorated method.
+
+    Args:
+        enabled (bool, optional): Turn tracing on or off. When omitted it
+            follows whether the logger emits INFO records.
+        style (str, optional): ``"banner"`` (the original delimiter) or
+            ``"event"`` (one structured ``event=... actor=...`` record, with
+            ``event``/``actor`` attributes for structured handlers).
+        sample_every (int, optional): In event style, log one call in N.
+        level (int, optional): New level for the project logger.
+
+    Raises:
+        ValueError: If `style` is unknown or `sample_every` is not positive.
+    """
+    if level is not None:
+        logger.setLevel(level)
+    if style is not None:
+        if style not in (BANNER, EVENT):
+            raise ValueError("Unsupported style: choose 'banner' or 'event'")
+        _config["style"] = style
+    if sample_every is not None:
+        if sample_every < 1:
+            raise ValueError("sample_every must be positive")
+        _config["sample_every"] = sample_every
+    _config["enabled"] = (
+        logger.isEnabledFor(logging.INFO) if enabled is None else enabled
+    )
+    _config["generation"] += 1
+    for method in _registry:
+        method.install()
@@ -0,0 +1,124 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Lazily decrypted message history with a bounded plaintext cache.
+
+`iter_history` walks log records as a generator and only decrypts an entry
+when the caller actually pulls it, consulting a `PlaintextCache` first, so
+viewing the same inbox again costs one decryption per new message. The
+cache is an LRU bounded by entry count and total bytes; plaintext is kept in
+``bytearray`` buffers that are overwritten with zeros when evicted. The wipe
+covers only those buffers: the ``str`` handed to the caller for display is
+an immutable copy that lives until it is garbage collected.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import threading
+from collections import OrderedDict
+
+
+def _wipe(buffer: bytearray) -> None:
+    buffer[:] = bytes(len(buffer))
+
+
+class PlaintextCache:
+    """LRU of decrypted message bodies keyed by message ID.
+
+    Args:
+        max_entries (int, optional): Most messages kept. Defaults to 1024.
+        max_bytes (int, optional): Most plaintext bytes kept. Defaults to 1 MiB.
+
+    Raises:
+        ValueError: If a bound is not positive.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 1 << 20):
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError("Cache bounds must be positive")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # {key: bytearray}, least recent first
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached plaintext for *key* as ``str``, or None.
+
+        The returned string is an ordinary immutable copy; only the cache's
+        own buffer is wiped on eviction.
+        """
+        with self._lock:
+            buffer = self._entries.get(key)
+            if buffer is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return buffer.decode("utf-8")
+
+    def put(self, key, plaintext: bytearray) -> None:
+        """Cache *plaintext* (taken over, not copied) and evict to the bounds.
+
+        A buffer larger than ``max_bytes`` is wiped immediately instead.
+        """
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+                _wipe(old)
+            if len(plaintext) > self.max_bytes:
+                _wipe(plaintext)
+                return
+            self._entries[key] = plaintext
+            self.size += len(plaintext)
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+                _wipe(evicted)
+
+    def clear(self) -> None:
+        """Wipe and drop every entry."""
+        with self._lock:
+            for buffer in self._entries.values():
+                _wipe(buffer)
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def iter_history(records, decrypt, cache: PlaintextCache, cache_key=None):
+    """Yield ``(record, text)`` for *records*, decrypting only on demand.
+
+    Args:
+        records (iterable): Log records; plaintext ones carry ``message``,
+            encrypted ones ``ciphertext``.
+        decrypt (callable): ``decrypt(record)`` returns the plaintext as a
+            ``bytearray``, or None if no key is available.
+        cache (PlaintextCache): Cache consulted before decrypting.
+        cache_key (callable, optional): Maps a record to its cache key.
+            Defaults to the record's ``offset`` message ID.
+
+    Yields:
+        tuple: ``(record, text)``; *text* is None for undecryptable entries.
+    """
+    cache_key = cache_key or (lambda record: record["offset"])
+    for record in records:
+        if "ciphertext" not in record:
+            yield record, record.get("message")
+            continue
+        key = cache_key(record)
+        text = cache.get(key)
+        if text is None:
+            plaintext = decrypt(record)
+            if plaintext is not None:
+                try:
+                    text = plaintext.decode("utf-8")
+                except UnicodeDecodeError:
+                    _wipe(plaintext)
+                    raise
+                cache.put(key, plaintext)
+        yield record, text
@@ -0,0 +1,138 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Background RSA key-pair pool.
+
+Generating an RSA key dominates participant creation. A pool keeps up to
+`depth` ready key pairs, refilled by a thread or process pool, so creating
+a participant only pops a finished key. Keys can also be persisted per
+participant name and loaded on the next run instead of being regenerated.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from Crypto.PublicKey import RSA
+
+from src import RSA_utils
+from src.logging import logger
+from src.metrics import KEYGEN_SECONDS
+
+
+def _generate_pem(bits):
+    """Worker entry point: return a fresh private key as PEM and the seconds
+    it took, both picklable so process workers can report their timing."""
+    start = time.perf_counter()
+    key = RSA.generate(bits)
+    return key.export_key(), time.perf_counter() - start
+
+
+def _pair(private_key):
+    return private_key, private_key.publickey()
+
+
+class KeyPool:
+    """Pre-generated RSA key pairs, refilled in the background.
+
+    Args:
+        depth (int, optional): Number of ready key pairs to keep. Defaults to 8.
+        bits (int, optional): RSA modulus size. Defaults to ``RSA_utils.KEY_SIZE``.
+        workers (int, optional): Concurrent generators. Defaults to the CPU count.
+        use_processes (bool, optional): Generate in a process pool instead of
+            threads. Defaults to False.
+        key_dir (str, optional): Directory of ``<name>.pem`` files. When set,
+            :meth:`acquire` loads a participant's saved key, or saves the one
+            it hands out, so later runs skip generation entirely.
+    """
+
+    def __init__(
+        self,
+        depth: int = 8,
+        bits: int = RSA_utils.KEY_SIZE,
+        workers: int = None,
+        use_processes: bool = False,
+        key_dir: str = None,
+    ):
+        self.depth = depth
+        self.bits = bits
+        self.key_dir = key_dir
+        self._ready = queue.Queue()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        workers = workers or os.cpu_count() or 1
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        self._executor = executor_cls(max_workers=workers)
+        if key_dir:
+            os.makedirs(key_dir, exist_ok=True)
+
+    def start(self):
+        """Begin filling the pool up to `depth`; returns immediately."""
+        self._refill()
+        return self
+
+    def _refill(self):
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.depth - self._ready.qsize() - self._pending
+            self._pending += max(missing, 0)
+        for _ in range(missing):
+            future = self._executor.submit(_generate_pem, self.bits)
+            future.add_done_callback(self._on_generated)
+
+    def _on_generated(self, future):
+        try:
+            pem, seconds = future.result()
+            KEYGEN_SECONDS.labels("rsa").observe(seconds)
+            self._ready.put(_pair(RSA.import_key(pem)))
+        except Exception:
+            if not self._closed:
+                logger.exception("[KEYPOOL] Background key generation failed.")
+        finally:
+            # Only now, so _refill never sees the key as neither pending nor
+            # ready and generates a surplus one
+            with self._lock:
+                self._pending -= 1
+
+    def acquire(self, name: str = None):
+        """Return a ``(private_key, public_key)`` pair.
+
+        Uses the persisted key for *name* if one exists, otherwise a pooled
+        key, falling back to generating one inline when the pool is empty.
+        """
+        path = self._path(name)
+        if path and os.path.exists(path):
+            with open(path, "rb") as f:
+                return _pair(RSA.import_key(f.read()))
+        try:
+            pair = self._ready.get_nowait()
+        except queue.Empty:
+            logger.debug("[KEYPOOL] Pool empty; generating a key inline.")
+            pair = RSA_utils.generate_RSA_key_pairs(self.bits)
+        self._refill()
+        if path:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(pair[0].export_key())
+        return pair
+
+    def available(self) -> int:
+        """Number of key pairs ready right now."""
+        return self._ready.qsize()
+
+    def _path(self, name):
+        if not (self.key_dir and name):
+            return None
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+        return os.path.join(self.key_dir, f"{safe}.pem")
+
+    def close(self):
+        """Stop refilling and shut the worker pool down."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,239 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Passphrase-protected on-disk key store.
+
+Keeps a participant's RSA key pair, its session ciphers (``secure_partners``)
+and the chat's conversation keys (``keys_map``) in one SQLite file, so a
+restart needs neither new key pairs nor new key exchanges. Every secret is
+sealed with AES-256-GCM under a key derived from the passphrase with scrypt;
+the row's owner, kind and name are bound in as associated data so rows
+cannot be swapped. Nothing is decrypted up front: mappings load one entry
+on first use, so opening a store with thousands of contacts is instant.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+
+from Crypto.Cipher import AES
+from Crypto.Protocol.KDF import scrypt
+from Crypto.PublicKey import RSA
+from Crypto.Random import get_random_bytes
+
+from src.cryp import CipherClass
+
+SALT_SIZE = 16
+NONCE_SIZE = 12
+TAG_SIZE = 16
+# scrypt cost, recorded in the file so it can be raised for new stores
+SCRYPT_N = 2 ** 14
+_CHECK = b"p2p key store"
+
+IDENTITY = "identity"
+SESSION = "session"
+CONVERSATION = "conversation"
+
+
+class KeyStore:
+    """SQLite file of sealed keys for one or more local participants.
+
+    Args:
+        path (str): Database file; created (with a fresh salt) if missing.
+        passphrase (str): Secret the sealing key is derived from.
+
+    Raises:
+        ValueError: If *passphrase* does not open an existing store.
+    """
+
+    def __init__(self, path: str, passphrase: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS secrets ("
+                " owner TEXT, kind TEXT, name TEXT, sealed BLOB NOT NULL,"
+                " PRIMARY KEY (owner, kind, name))"
+            )
+            # A new store; if another process races us, its salt wins
+            conn.executemany(
+                "INSERT OR IGNORE INTO meta VALUES (?, ?)",
+                [("salt", get_random_bytes(SALT_SIZE)), ("n", SCRYPT_N)],
+            )
+        meta = dict(conn.execute("SELECT name, value FROM meta"))
+        self._key = scrypt(
+            passphrase.encode("utf-8"), meta["salt"], 32, int(meta["n"]), 8, 1
+        )
+        if "check" not in meta:
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO meta VALUES ('check', ?)",
+                    (self._seal(b"check", _CHECK),),
+                )
+            meta = dict(conn.execute("SELECT name, value FROM meta"))
+        try:
+            if self._open(b"check", meta["check"]) != _CHECK:
+                raise ValueError
+        except ValueError:
+            raise ValueError("Wrong passphrase for key store") from None
+
+    def _conn(self):
+        """Return this thread's connection (sqlite3 objects are per-thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            self._local.conn = conn
+        return conn
+
+    def _seal(self, aad: bytes, data: bytes) -> bytes:
+        nonce = get_random_bytes(NONCE_SIZE)
+        cipher = AES.new(self._key, AES.MODE_GCM, nonce=nonce, mac_len=TAG_SIZE)
+        cipher.update(aad)
+        ct, tag = cipher.encrypt_and_digest(data)
+        return nonce + ct + tag
+
+    def _open(self, aad: bytes, sealed: bytes) -> bytes:
+        nonce, tag = sealed[:NONCE_SIZE], sealed[-TAG_SIZE:]
+        ct = sealed[NONCE_SIZE:-TAG_SIZE]
+        cipher = AES.new(self._key, AES.MODE_GCM, nonce=nonce, mac_len=TAG_SIZE)
+        cipher.update(aad)
+        return cipher.decrypt_and_verify(ct, tag)
+
+    @staticmethod
+    def _aad(owner, kind, name):
+        return "\x00".join((owner, kind, name)).encode("utf-8")
+
+    def get(self, owner: str, kind: str, name: str):
+        """Return the unsealed secret, or None if there is none.
+
+        Raises:
+            ValueError: If the stored row was tampered with.
+        """
+        row = self._conn().execute(
+            "SELECT sealed FROM secrets WHERE owner = ? AND kind = ? AND name = ?",
+            (owner, kind, name),
+        ).fetchone()
+        if row is None:
+            return None
+        return self._open(self._aad(owner, kind, name), row[0])
+
+    def put(self, owner: str, kind: str, name: str, secret: bytes) -> None:
+        sealed = self._seal(self._aad(owner, kind, name), secret)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO secrets VALUES (?, ?, ?, ?)",
+                (owner, kind, name, sealed),
+            )
+
+    def delete(self, owner: str, kind: str, name: str) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "DELETE FROM secrets WHERE owner = ? AND kind = ? AND name = ?",
+                (owner, kind, name),
+            )
+
+    def names(self, owner: str, kind: str):
+        """Names stored for (*owner*, *kind*), without unsealing anything."""
+        rows = self._conn().execute(
+            "SELECT name FROM secrets WHERE owner = ? AND kind = ?", (owner, kind)
+        )
+        return [name for (name,) in rows]
+
+    def identity(self, owner: str):
+        """Return *owner*'s ``(private_key, public_key)``, or None."""
+        der = self.get(owner, IDENTITY, "rsa")
+        if der is None:
+            return None
+        private_key = RSA.import_key(der)
+        return private_key, private_key.publickey()
+
+    def save_identity(self, owner: str, private_key) -> None:
+        self.put(owner, IDENTITY, "rsa", private_key.export_key(format="DER"))
+
+    def partners(self, owner: str) -> "LazyMap":
+        """*owner*'s ``secure_partners``: partner name -> CipherClass."""
+        return LazyMap(self, owner, SESSION, _dump_cipher, _load_cipher)
+
+    def conversations(self, owner: str) -> "LazyMap":
+        """Conversation keys: ``frozenset({a, b})`` -> passphrase string."""
+        return LazyMap(
+            self,
+            owner,
+            CONVERSATION,
+            lambda key: key.encode("utf-8"),
+            lambda raw: raw.decode("utf-8"),
+            encode_name=lambda conv: "\x00".join(sorted(conv)),
+            decode_name=lambda name: frozenset(name.split("\x00")),
+        )
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _dump_cipher(cipher):
+    return cipher.algo.encode("ascii") + b"\x00" + cipher.key
+
+
+def _load_cipher(raw):
+    algo, key = raw.split(b"\x00", 1)
+    return CipherClass.from_raw_key(key, algo=algo.decode("ascii"))
+
+
+_MISSING = object()
+
+
+class LazyMap(MutableMapping):
+    """Dict-like view of one (owner, kind) in a :class:`KeyStore`.
+
+    Entries are unsealed the first time they are read and cached; writes go
+    straight through to disk.
+    """
+
+    def __init__(
+        self, store, owner, kind, dump, load, encode_name=str, decode_name=str
+    ):
+        self._store = store
+        self._owner = owner
+        self._kind = kind
+        self._dump = dump
+        self._load = load
+        self._encode_name = encode_name
+        self._decode_name = decode_name
+        self._cache = {}  # {key: value or _MISSING}
+
+    def __getitem__(self, key):
+        value = self._cache.get(key)
+        if value is None:
+            raw = self._store.get(self._owner, self._kind, self._encode_name(key))
+            value = _MISSING if raw is None else self._load(raw)
+            self._cache[key] = value
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        name = self._encode_name(key)
+        self._store.put(self._owner, self._kind, name, self._dump(value))
+        self._cache[key] = value
+
+    def __delitem__(self, key):
+        self[key]  # raise KeyError if absent
+        self._store.delete(self._owner, self._kind, self._encode_name(key))
+        self._cache[key] = _MISSING
+
+    def __iter__(self):
+        return (
+            self._decode_name(name)
+            for name in self._store.names(self._owner, self._kind)
+        )
+
+    def __len__(self):
+        return len(self._store.names(self._owner, self._kind))
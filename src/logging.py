@@ -1,7 +1,124 @@
+import asyncio
+import atexit
+import itertools
 import logging
+import queue
+import threading
+from collections import deque
+from logging.handlers import QueueHandler, QueueListener
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s",
 )
 logger = logging.getLogger(__name__)
+
+
+def use_queue_handler():
+    """Move the root logger's handlers onto a background listener thread.
+
+    Callers then only enqueue records; formatting and stream writes happen on
+    the listener thread, off the delivery path. Calling it again is a no-op.
+
+    Returns:
+        logging.handlers.QueueListener: The running listener.
+    """
+    root = logging.getLogger()
+    for handler in root.handlers:
+        if isinstance(handler, QueueHandler):
+            return handler.listener
+    records = queue.SimpleQueue()
+    listener = QueueListener(records, *root.handlers, respect_handler_level=True)
+    handler = QueueHandler(records)
+    handler.listener = listener
+    root.handlers = [handler]
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class RingBufferHandler(logging.Handler):
+    """Keep the most recent log records in a fixed-capacity ring buffer.
+
+    Each record is stored as a small dict with a monotonically increasing
+    ``seq``, so readers can page with ``after=<seq>`` cursors instead of
+    re-reading everything. Sequence numbers keep growing across
+    :meth:`clear`, so existing cursors stay valid.
+
+    Args:
+        capacity (int, optional): Records kept before the oldest are dropped.
+        level (int, optional): Minimum level stored.
+    """
+
+    def __init__(self, capacity: int = 10000, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.capacity = capacity
+        self._records = deque(maxlen=capacity)
+        self._next_seq = 1
+        self._changed = threading.Condition()
+        self._subscribers = {}  # {asyncio.Event: its event loop}
+
+    def emit(self, record):
+        try:
+            entry = {
+                "time": record.created,
+                "level": record.levelname,
+                "message": record.getMessage(),
+            }
+            for field in ("event", "actor"):
+                if hasattr(record, field):
+                    entry[field] = getattr(record, field)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._changed:
+            entry["seq"] = self._next_seq
+            self._next_seq += 1
+            self._records.append(entry)
+            self._changed.notify_all()
+            subscribers = list(self._subscribers.items())
+        for event, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                pass  # loop already closed
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest record ever stored (0 if none)."""
+        return self._next_seq - 1
+
+    def after(self, seq: int = 0, limit: int = None):
+        """Return up to *limit* records with a sequence number above *seq*."""
+        with self._changed:
+            if not self._records:
+                return []
+            start = max(seq + 1 - self._records[0]["seq"], 0)
+            stop = None if limit is None else start + limit
+            return list(itertools.islice(self._records, start, stop))
+
+    def wait(self, seq: int, timeout: float = None) -> bool:
+        """Block until a record newer than *seq* exists; False on timeout."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.last_seq > seq, timeout)
+
+    def subscribe(self) -> asyncio.Event:
+        """Return an event set on the running loop whenever a record arrives.
+
+        Async readers clear it, read with :meth:`after` and await it, so no
+        thread is parked per reader. Pass it to :meth:`unsubscribe` when done.
+        """
+        event = asyncio.Event()
+        with self._changed:
+            self._subscribers[event] = asyncio.get_running_loop()
+        return event
+
+    def unsubscribe(self, event: asyncio.Event) -> None:
+        """Stop notifying *event*."""
+        with self._changed:
+            self._subscribers.pop(event, None)
+
+    def clear(self):
+        """Drop all stored records; sequence numbers are not reset."""
+        with self._changed:
+            self._records.clear()
@@ -1,12 +1,174 @@
+import base64
+import struct
+import time
+
+from src.reliable import HEADER, AckPayload, SequencedPayload
+
 
 class MessageClass:
     """Lightweight container for data transferred across the network."""
 
-    def __init__(self, data, sender, to_person, is_encrypted: bool = False):
+    def __init__(self, data, sender, to_person, is_encrypted: bool = False,
+                 compressed: bool = False):
         self.sender = sender
         self.to_person = to_person
         self.data = data
         self.is_encrypted = is_encrypted
+        # The plaintext inside the ciphertext is a ``src.compress`` frame
+        self.compressed = compressed
 
     def __str__(self):
         return "\n".join(f"- {k} = {v}" for k, v in self.__dict__.items())
+
+
+WIRE_VERSION = 1
+
+# Flag bits carried in the wire header
+FLAG_ENCRYPTED = 0x01
+FLAG_KEY = 0x02
+FLAG_HELLO = 0x04
+FLAG_OBSERVER = 0x08
+FLAG_COMPRESSED = 0x10
+# Payload starts with a 4-byte epoch and an 8-byte sequence number
+# (SequencedPayload) or cumulative ack followed by its tag (AckPayload)
+FLAG_SEQUENCED = 0x20
+FLAG_ACK = 0x40
+
+# version, flags, sender length, recipient length, timestamp, payload length
+_WIRE_HEADER = struct.Struct("!BBHHdI")
+
+
+class WireMessage:
+    """Compact, serializable message: peer IDs and raw payload bytes.
+
+    Unlike :class:`MessageClass` it holds no references to participant
+    objects and no base64 text, so it maps 1:1 onto the binary encoding used
+    by the socket transport::
+
+        header (18 bytes) | sender (utf-8) | recipient (utf-8) | payload
+
+    :meth:`decode` slices the payload out of the input as a ``memoryview``
+    without copying it.
+    """
+
+    __slots__ = ("sender", "recipient", "payload", "flags", "timestamp")
+
+    def __init__(self, sender: str, recipient: str, payload=b"", flags: int = 0,
+                 timestamp: float = None):
+        self.sender = sender
+        self.recipient = recipient
+        self.payload = payload
+        self.flags = flags
+        self.timestamp = time.time() if timestamp is None else timestamp
+
+    @property
+    def is_encrypted(self) -> bool:
+        return bool(self.flags & FLAG_ENCRYPTED)
+
+    @classmethod
+    def from_message(cls, message: MessageClass, flags: int = 0) -> "WireMessage":
+        """Convert a :class:`MessageClass`, undoing the base64 of ciphertexts."""
+        data = message.data
+        if isinstance(data, SequencedPayload):
+            flags |= FLAG_SEQUENCED
+            body = data.data
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            data = HEADER.pack(data.epoch, data.seq) + body
+        elif isinstance(data, AckPayload):
+            flags |= FLAG_ACK
+            data = HEADER.pack(data.epoch, data.ack) + (data.sealed or b"")
+        elif isinstance(data, str):
+            data = base64.b64decode(data) if message.is_encrypted else data.encode("utf-8")
+        if message.is_encrypted:
+            flags |= FLAG_ENCRYPTED
+        if getattr(message, "compressed", False):
+            flags |= FLAG_COMPRESSED
+        return cls(
+            getattr(message.sender, "name", message.sender),
+            getattr(message.to_person, "name", message.to_person),
+            data,
+            flags,
+        )
+
+    def to_message(self, sender, to_person) -> MessageClass:
+        """Rebuild a :class:`MessageClass` around the given participant objects.
+
+        Ciphertexts stay raw ``bytes``; plaintext is decoded back to ``str``.
+        Sequenced messages and acks get their payload objects back.
+
+        Raises:
+            ValueError: If a sequenced payload is shorter than its header.
+        """
+        data = bytes(self.payload)
+        if self.flags & (FLAG_SEQUENCED | FLAG_ACK):
+            if len(data) < HEADER.size:
+                raise ValueError("Truncated sequenced payload")
+            epoch, number = HEADER.unpack_from(data)
+            data = data[HEADER.size:]
+            if self.flags & FLAG_ACK:
+                return MessageClass(
+                    AckPayload(number, data or None, epoch), sender, to_person,
+                    is_encrypted=self.is_encrypted,
+                )
+            if not self.is_encrypted:
+                data = data.decode("utf-8")
+            data = SequencedPayload(number, data, epoch)
+        elif not self.is_encrypted:
+            data = data.decode("utf-8")
+        return MessageClass(
+            data, sender, to_person, is_encrypted=self.is_encrypted,
+            compressed=bool(self.flags & FLAG_COMPRESSED),
+        )
+
+    def encode(self) -> bytes:
+        """Serialize to the versioned binary format."""
+        sender = self.sender.encode("utf-8")
+        recipient = self.recipient.encode("utf-8")
+        header = _WIRE_HEADER.pack(
+            WIRE_VERSION, self.flags, len(sender), len(recipient),
+            self.timestamp, len(self.payload),
+        )
+        return b"".join((header, sender, recipient, self.payload))
+
+    @staticmethod
+    def peek(buffer):
+        """Return ``(flags, sender, recipient)`` without touching the payload.
+
+        Raises:
+            ValueError: If the buffer is truncated or of an unknown version.
+        """
+        view = memoryview(buffer)
+        if len(view) < _WIRE_HEADER.size:
+            raise ValueError("Truncated wire message")
+        version, flags, s_len, r_len, _, _ = _WIRE_HEADER.unpack_from(view)
+        if version != WIRE_VERSION:
+            raise ValueError(f"Unsupported wire version {version}")
+        start = _WIRE_HEADER.size
+        sender = str(view[start:start + s_len], "utf-8")
+        recipient = str(view[start + s_len:start + s_len + r_len], "utf-8")
+        return flags, sender, recipient
+
+    @classmethod
+    def decode(cls, buffer) -> "WireMessage":
+        """Parse :meth:`encode` output; the payload is a zero-copy ``memoryview``.
+
+        Raises:
+            ValueError: If the buffer is truncated or of an unknown version.
+        """
+        view = memoryview(buffer)
+        if len(view) < _WIRE_HEADER.size:
+            raise ValueError("Truncated wire message")
+        version, flags, s_len, r_len, ts, p_len = _WIRE_HEADER.unpack_from(view)
+        if version != WIRE_VERSION:
+            raise ValueError(f"Unsupported wire version {version}")
+        start = _WIRE_HEADER.size
+        end = start + s_len + r_len + p_len
+        if len(view) < end:
+            raise ValueError("Truncated wire message")
+        sender = str(view[start:start + s_len], "utf-8")
+        recipient = str(view[start + s_len:start + s_len + r_len], "utf-8")
+        return cls(sender, recipient, view[start + s_len + r_len:end], flags, ts)
+
+    def __str__(self):
+        return "\n".join(f"- {k} = {getattr(self, k)}" for k in self.__slots__)
@@ -0,0 +1,200 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Append-only, multi-process safe message log.
+
+Each record is one line of compact JSON. Appends are a single ``write`` on a
+descriptor opened once with ``O_APPEND`` and guarded by an exclusive
+``fcntl`` lock, so several terminals can share one log without clobbering
+each other. Readers remember a byte offset and only parse what was appended
+since.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import bisect
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None
+
+FSYNC_NEVER = "never"
+FSYNC_ALWAYS = "always"
+
+
+class MessageLog:
+    """Newline-delimited JSON log opened once for appending.
+
+    Args:
+        path (str): File backing the log; created if missing.
+        fsync (str, optional): ``"never"`` (default) leaves flushing to the OS,
+            ``"always"`` calls ``os.fsync`` after every append.
+
+    Raises:
+        ValueError: If `fsync` is not "never" or "always".
+    """
+
+    def __init__(self, path: str, fsync: str = FSYNC_NEVER):
+        if fsync not in (FSYNC_NEVER, FSYNC_ALWAYS):
+            raise ValueError("Unsupported fsync policy: choose 'never' or 'always'")
+        self.path = path
+        self.fsync = fsync
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def append(self, record: dict) -> None:
+        """Append *record* as one line with a single locked ``write``."""
+        self._write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    def _write(self, data: bytes) -> None:
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            os.write(self._fd, data)
+            if self.fsync == FSYNC_ALWAYS:
+                os.fsync(self._fd)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def read_from(self, offset: int = 0, with_offsets: bool = False):
+        """Return ``(records, next_offset)`` for everything after *offset*.
+
+        A trailing line without its newline is still being written by another
+        process and is left for the next call. With *with_offsets* each record
+        comes as ``(byte_offset, record)``; the offset never changes in an
+        append-only log, so it doubles as a message ID.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], offset
+        end = data.rfind(b"\n") + 1
+        records = []
+        position = offset
+        for line in data[:end].splitlines(keepends=True):
+            start, position = position, position + len(line)
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records.append((start, record) if with_offsets else record)
+        return records, offset + end
+
+    def read_all(self):
+        """Return every record in the log."""
+        return self.read_from(0)[0]
+
+    def read_at(self, offsets):
+        """Return the records starting at each of *offsets*, in that order.
+
+        Offsets come from :meth:`read_from` with *with_offsets*.
+        """
+        records = []
+        with open(self.path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                records.append(json.loads(f.readline()))
+        return records
+
+    def close(self) -> None:
+        """Release the append descriptor."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Postings:
+    """Record offsets ordered by timestamp, with parallel keys for bisection."""
+
+    __slots__ = ("keys", "offsets")
+
+    def __init__(self):
+        self.keys = []
+        self.offsets = []
+
+    def add(self, ts, offset):
+        if not self.keys or ts >= self.keys[-1]:
+            self.keys.append(ts)
+            self.offsets.append(offset)
+        else:
+            i = bisect.bisect_right(self.keys, ts)
+            self.keys.insert(i, ts)
+            self.offsets.insert(i, offset)
+
+    def range(self, since=None, limit=None):
+        """Offsets strictly after *since*; the first *limit* of them, or the
+        last *limit* when no *since* is given."""
+        start = 0 if since is None else bisect.bisect_right(self.keys, since)
+        if limit is None:
+            return self.offsets[start:]
+        if since is None:
+            return self.offsets[max(len(self.offsets) - limit, 0):]
+        return self.offsets[start:start + limit]
+
+
+class InboxIndex:
+    """Per-recipient and per-conversation index over a :class:`MessageLog`.
+
+    The index tails the log from its last offset on every query, so only new
+    records are parsed. Postings hold just each record's timestamp and byte
+    offset, sorted by timestamp; a query seeks to the offsets in its range
+    and parses only those records. Each record returned gets an ``offset``
+    field, its byte position in the log, usable as a stable message ID.
+
+    Args:
+        log (MessageLog): Log whose records carry ``timestamp``, ``sender``
+            and ``recipient`` fields.
+    """
+
+    def __init__(self, log: MessageLog):
+        self.log = log
+        self._offset = 0
+        self._all = _Postings()
+        self._by_recipient = {}  # {name: _Postings}
+        self._by_conversation = {}  # {frozenset({a, b}): _Postings}
+
+    def refresh(self) -> None:
+        """Index every record appended since the previous refresh."""
+        records, self._offset = self.log.read_from(self._offset, with_offsets=True)
+        for offset, record in records:
+            ts = record["timestamp"]
+            self._all.add(ts, offset)
+            self._by_recipient.setdefault(record["recipient"], _Postings()).add(
+                ts, offset
+            )
+            conv = frozenset({record["sender"], record["recipient"]})
+            self._by_conversation.setdefault(conv, _Postings()).add(ts, offset)
+
+    def _load(self, offsets):
+        records = self.log.read_at(offsets)
+        for offset, record in zip(offsets, records):
+            record["offset"] = offset
+        return records
+
+    def inbox(self, recipient: str, since: str = None, limit: int = None):
+        """Messages addressed to *recipient*, oldest first."""
+        self.refresh()
+        postings = self._by_recipient.get(recipient)
+        return self._load(postings.range(since, limit)) if postings else []
+
+    def conversation(self, a: str, b: str, since: str = None, limit: int = None):
+        """Messages exchanged between *a* and *b* in either direction."""
+        self.refresh()
+        postings = self._by_conversation.get(frozenset({a, b}))
+        return self._load(postings.range(since, limit)) if postings else []
+
+    def traffic(self, since: str = None, limit: int = None):
+        """Every message in the log."""
+        self.refresh()
+        return self._load(self._all.range(since, limit))
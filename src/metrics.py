@@ -0,0 +1,246 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+In-process metrics: counters and histograms in Prometheus text format.
+
+Recording a value costs one bisect and an uncontended lock, cheap enough to
+leave on around every encryption and delivery. Hot paths resolve their label
+values once (``metric.labels(...)``) and keep the returned child.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import bisect
+import math
+import threading
+import time
+
+# Seconds: 10 µs .. 10 s, roughly x2.5 apart
+LATENCY_BUCKETS = (
+    1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# Recipients per message
+SIZE_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """Context manager observing the seconds spent inside it."""
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("_hist", "_start")
+
+    def __init__(self, hist):
+        self._hist = hist
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._hist.observe(time.perf_counter() - self._start)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Return the child for *values*, creating it on first use."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally split by labels."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in sorted(self._children.items()):
+            labels = _labels(self.labelnames, values)
+            yield f"{self.name}{labels} {_format(child.value)}"
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): One-line help text.
+        labelnames (tuple, optional): Label names. Defaults to none.
+        buckets (tuple, optional): Upper bounds, ascending. Defaults to
+            ``LATENCY_BUCKETS``.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def _samples(self):
+        for values, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts):
+                cumulative += n
+                le = _labels(self.labelnames, values, f'le="{_format(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            labels = _labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.setdefault(metric.name, metric)
+        if type(existing) is not type(metric):
+            raise ValueError(
+                f"Metric {metric.name} already registered as a {existing.kind}"
+            )
+        return existing
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Every metric in Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() + "\n" for metric in metrics)
+
+
+REGISTRY = MetricsRegistry()
+
+KEYGEN_SECONDS = REGISTRY.histogram(
+    "p2p_keygen_seconds", "Time to generate one key pair.", ("kind",)
+)
+RSA_SECONDS = REGISTRY.histogram(
+    "p2p_rsa_seconds", "Time for one RSA-OAEP key wrap or unwrap.", ("op",)
+)
+SYMMETRIC_SECONDS = REGISTRY.histogram(
+    "p2p_symmetric_seconds",
+    "Time for one symmetric encryption or decryption.",
+    ("op", "algo"),
+)
+FANOUT_RECIPIENTS = REGISTRY.histogram(
+    "p2p_fanout_recipients",
+    "Participants each message is handed to.",
+    buckets=SIZE_BUCKETS,
+)
+DELIVERY_SECONDS = REGISTRY.histogram(
+    "p2p_delivery_seconds", "Time a recipient spends handling one delivery."
+)
+DROPPED = REGISTRY.counter(
+    "p2p_messages_dropped_total", "Messages dropped before delivery.", ("reason",)
+)
+UNDECRYPTABLE = REGISTRY.counter(
+    "p2p_messages_undecryptable_total",
+    "Delivered messages the recipient could not decrypt.",
+    ("reason",),
+)
+
+
+def render():
+    """Render the default registry."""
+    return REGISTRY.render()
@@ -5,8 +5,16 @@ Core networking primitives for the demo P2P secure-messaging project.
 Author: Ahsan Bilal, University of Oklahoma
 """
 
+import threading
+import time
+
 from src.logging import logger
 from src.fun_introduction import introduce
+from src.metrics import DELIVERY_SECONDS, FANOUT_RECIPIENTS
+
+BROADCAST = "broadcast"
+ROUTED = "routed"
+
 
 class NetworkClass:
     """A deliberately insecure broadcast network.
@@ -14,41 +22,149 @@ class NetworkClass:
     Every message (plaintext or key material) is sent to *all* connected users.
     Cryptographic techniques (RSA for key transport, AES for payloads) are
     therefore required to achieve confidentiality over this channel.
+
+    In ``"routed"`` mode the network keeps a name index of its members and a
+    separate set of observers (participants created with ``is_bad_man``), so a
+    unicast message only reaches its recipient and the observers instead of
+    every connected user.
+
+    Args:
+        name (str): Human-readable network name.
+        mode (str, optional): ``"broadcast"`` (default) or ``"routed"``.
+
+    Raises:
+        ValueError: If `mode` is not "broadcast" or "routed".
     """
 
-    def __init__(self, name: str):
+    def __init__(self, name: str, mode: str = BROADCAST):
         """Create a new named network."""
+        mode = mode.lower()
+        if mode not in (BROADCAST, ROUTED):
+            raise ValueError("Unsupported mode: choose 'broadcast' or 'routed'")
         self.name = name
-        self.people = []
+        self.mode = mode
+        self._index = {}  # {person_name: PersonClass}, in join order
+        self._observers = {}  # {person_name: PersonClass}, eavesdroppers only
+        self._lock = threading.Lock()
+
+    @property
+    def people(self):
+        """Snapshot of the connected participants, in join order."""
+        return list(self._index.values())
 
     @introduce
     def join(self, person):
-        """Register *person* to receive future broadcasts."""
+        """Register *person* to receive future broadcasts.
+
+        Joining is idempotent: a participant is delivered to at most once per
+        message however often it joins. A different object with an existing
+        name replaces the old one.
+        """
+        with self._lock:
+            if self._index.get(person.name) is person:
+                logger.debug("[NET %s] %s already joined.", self.name, person.name)
+                return
+            self._index[person.name] = person
+            self._observers.pop(person.name, None)
+            if getattr(person, "is_bad_man", False):
+                self._observers[person.name] = person
         logger.info("[NET %s] %s joined the network.", self.name, person.name)
-        self.people.append(person)
+
+    def leave(self, person):
+        """Stop delivering to *person*; a no-op if it never joined."""
+        with self._lock:
+            if self._index.get(person.name) is not person:
+                return
+            del self._index[person.name]
+            self._observers.pop(person.name, None)
+        logger.info("[NET %s] %s left the network.", self.name, person.name)
+
+    def clear(self):
+        """Disconnect every participant."""
+        with self._lock:
+            self._index.clear()
+            self._observers.clear()
+
+    def _recipients(self, message):
+        """Return the participants *message* must be handed to."""
+        targets = self._targets(message)
+        FANOUT_RECIPIENTS.observe(len(targets))
+        return targets
+
+    def _targets(self, message):
+        """Recipients of *message* under the network mode.
+
+        Broadcast mode yields every member except the sender. Routed mode
+        yields the addressed recipient (or every member of an addressed
+        channel) followed by the registered observers.
+        """
+        if self.mode == BROADCAST:
+            return [p for p in list(self._index.values()) if p is not message.sender]
+
+        targets = []
+        to_person = message.to_person
+        members = getattr(to_person, "members", None)
+        if members is not None:
+            # Group channel: every member we know about, then the observers
+            for name in list(members):
+                member = self._index.get(name)
+                if member is not None and member is not message.sender:
+                    targets.append(member)
+            for name, observer in list(self._observers.items()):
+                if observer is not message.sender and name not in members:
+                    targets.append(observer)
+            return targets
+
+        recipient = self._index.get(getattr(to_person, "name", to_person))
+        if recipient is not None and recipient is not message.sender:
+            targets.append(recipient)
+        for observer in list(self._observers.values()):
+            if observer is not message.sender and observer is not recipient:
+                targets.append(observer)
+        return targets
 
     @introduce
     def send_message(self, message):
-        """Broadcast an arbitrary *message* object to all participants."""
+        """Deliver an arbitrary *message* object to the relevant participants."""
         logger.info("[NET %s] Broadcasting payload from %s.", self.name, message.sender)
-        for person in self.people:
-            if person is not message.sender:
-                person.receive_message(message)
+        for person in self._recipients(message):
+            start = time.perf_counter()
+            person.receive_message(message, network=self)
+            DELIVERY_SECONDS.observe(time.perf_counter() - start)
 
     @introduce
     def send_symmetric_key(self, message):
-        """Broadcast an RSA-encrypted AES key to all participants."""
+        """Deliver an RSA-encrypted AES key to the relevant participants."""
         logger.info(
             "[NET %s] Broadcasting symmetric key from %s.", self.name, message.sender
         )
-        for person in self.people:
-            if person is not message.sender:
-                person.rsa_encrypted_key(message)
-
-    def __str__(self):
-        return self.name
-
+        for person in self._recipients(message):
+            start = time.perf_counter()
+            person.rsa_encrypted_key(message)
+            DELIVERY_SECONDS.observe(time.perf_counter() - start)
 
+    def _batch_recipients(self, messages):
+        """Group *messages* per receiving participant, preserving order.
 
+        Returns:
+            list[tuple]: ``(person, [message, ...])`` pairs.
+        """
+        per_person = {}  # {id(person): (person, [message, ...])}
+        for message in messages:
+            for person in self._recipients(message):
+                per_person.setdefault(id(person), (person, []))[1].append(message)
+        return list(per_person.values())
 
+    @introduce
+    def send_batch(self, messages):
+        """Deliver several payloads in one fan-out, one call per participant."""
+        logger.info(
+            "[NET %s] Broadcasting batch of %d payloads.", self.name, len(messages)
+        )
+        for person, batch in self._batch_recipients(messages):
+            start = time.perf_counter()
+            person.receive_batch(batch, network=self)
+            DELIVERY_SECONDS.observe(time.perf_counter() - start)
 
+    def __str__(self):
+        return self.name
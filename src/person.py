@@ -1,94 +1,903 @@
-from src import RSA_utils
+import base64
+
+from Crypto.Random import get_random_bytes
+
+from src import RSA_utils, ECDH_utils, compress
 from src.cryp import CipherClass
+from src.crypto_pool import OrderedLanes, chain, completed
+from src import reliable
+from src.reliable import AckPayload, ReceiveWindow, ReliableSender, SequencedPayload
 from src.message import MessageClass
+from src.stream import StreamPayload
+from src.channel import (
+    GROUP_KEY_SIZE, ChannelClass, GroupCiphertext, GroupKeyPayload, ratchet
+)
 from src.network import NetworkClass
 from src.logging import logger
 from src.fun_introduction import introduce
+from src.metrics import UNDECRYPTABLE
 
 ALGO = "DES" # DES For 56-bits |  "AES" # For 128-bits
+# Authenticated: "AES-GCM" | "CHACHA20" (reject tampered ciphertexts)
+
+KEY_EXCHANGE = "RSA" # RSA key transport | "X25519" # ECDH agreement + HKDF
+X25519_PREFIX = "x25519:"
+
+_MISSING_KEY = UNDECRYPTABLE.labels("missing_key")
+_FAILED_VERIFICATION = UNDECRYPTABLE.labels("failed_verification")
 
 class PersonClass:
     """Represents an endpoint (honest or malicious) in the network."""
 
-    def __init__(self, name: str, is_bad_man: bool = False):
-        """Generate an RSA key-pair and initialize local key cache."""
+    def __init__(
+        self,
+        name: str,
+        is_bad_man: bool = False,
+        key_pool=None,
+        key_exchange=None,
+        crypto_pool=None,
+        key_store=None,
+        window: int = None,
+        rto: float = reliable.DEFAULT_RTO,
+        compression: str = None,
+        compress_threshold: int = None,
+    ):
+        """Generate key pairs and initialize local key cache.
+
+        If *key_pool* (a ``KeyPool``) is given, the RSA key pair is taken from
+        it instead of being generated inline. *key_exchange* overrides the
+        module-level ``KEY_EXCHANGE``; with ``"X25519"`` the RSA key pair is
+        only generated if something actually needs it (e.g. an attachment).
+        With a *crypto_pool* (a ``CryptoPool``) incoming messages and RSA key
+        messages are decrypted on its workers; see :meth:`receive_message`.
+        With a *key_store* (a ``KeyStore``) the RSA key pair and the session
+        ciphers persist across restarts; partners are loaded on first use.
+        A *window* turns on sequenced delivery for :meth:`send_message` and
+        :meth:`send_many`: up to *window* messages per partner await an ack,
+        and unacked ones are resent after *rto* seconds (doubling each time).
+        The async send methods refuse to bypass it. Receiving sequenced
+        messages (in order, without duplicates) needs no setting.
+        With *compression* (``"zlib"`` or ``"lzma"``) encrypted text of at
+        least *compress_threshold* bytes (see ``compress.compress``) is
+        compressed first when that saves space; a zlib dictionary in
+        :attr:`dictionaries` is used for that partner. Compressed messages
+        are always accepted.
+        """
         self.name = name
         self.is_bad_man = is_bad_man
-        self.__private_key, self.public_key = RSA_utils.generate_RSA_key_pairs()
-        self.secure_partners = {}  # {partner_name: CipherClass}
+        self.key_exchange = (key_exchange or KEY_EXCHANGE).upper()
+        if self.key_exchange not in ("RSA", "X25519"):
+            raise ValueError("Unsupported key exchange: choose 'RSA' or 'X25519'")
+        if compression not in (None, compress.ZLIB, compress.LZMA):
+            raise ValueError("Unsupported compression: choose 'zlib' or 'lzma'")
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+        # {partner_name: preset dictionary}, the same bytes on both sides
+        self.dictionaries = {}
+        self._key_pool = key_pool
+        self._key_store = key_store
+        self.__rsa_pair = None
+        if self.key_exchange == "RSA":
+            self.__rsa_keys()
+        self.__dh_private_key, self.dh_public_key = (
+            ECDH_utils.generate_X25519_key_pairs()
+        )
+        # {partner_name: CipherClass}
+        self.secure_partners = (
+            key_store.partners(name) if key_store is not None else {}
+        )
+        self.channel_keys = {}  # {channel_name: {epoch: group_key_bytes}}
+        # Called as on_attachment(sender_name, chunks) for incoming streams;
+        # by default the chunks are drained and only their size is logged.
+        self.on_attachment = None
+        # Called as on_message(event) for every delivered message; *event* is
+        # a dict with "from", "to", "channel", "encrypted", "text" (None when
+        # it could not be decrypted) and "intercepted".
+        self.on_message = None
+        self._crypto_pool = crypto_pool
+        self._lanes = OrderedLanes() if crypto_pool is not None else None
+        # {sender_name: Future[CipherClass]} for key messages still decrypting
+        self._pending_ciphers = {}
+        self._reliable = ReliableSender(window, rto) if window else None
+        self._receive_windows = {}  # {sender_name: ReceiveWindow}
+
+    def __rsa_keys(self):
+        """Return the RSA key pair, loading, acquiring or generating it once."""
+        if self.__rsa_pair is None:
+            if self._key_store is not None:
+                self.__rsa_pair = self._key_store.identity(self.name)
+            if self.__rsa_pair is not None:
+                return self.__rsa_pair
+            if self._key_pool is not None:
+                self.__rsa_pair = self._key_pool.acquire(self.name)
+            else:
+                self.__rsa_pair = RSA_utils.generate_RSA_key_pairs()
+            if self._key_store is not None:
+                self._key_store.save_identity(self.name, self.__rsa_pair[0])
+        return self.__rsa_pair
+
+    @property
+    def public_key(self):
+        """RSA public key used to wrap keys sent to this participant."""
+        return self.__rsa_keys()[1]
 
     @introduce
     def exchange_key_with(self, other_person, sym_key: str, network: NetworkClass):
-        """Securely send *sym_key* to *other_person* using RSA encryption."""
+        """Securely send *sym_key* to *other_person* using RSA encryption.
+
+        In ``"X25519"`` mode *sym_key* is not transmitted: the session key is
+        derived from an X25519 agreement and a random salt instead.
+        """
         logger.info(
             "[%s] Exchanging AES key with %s via %s.",
             self.name,
             other_person.name,
             network,
         )
-        encrypted_key = RSA_utils.encrypt_text(sym_key, other_person.public_key)
-        msg = MessageClass(encrypted_key, self, other_person, is_encrypted=True)
+        msg, cipher = self._key_message(other_person, sym_key)
         network.send_symmetric_key(msg)
-        self.secure_partners[other_person.name] = CipherClass(sym_key, algo=ALGO)
+        self.secure_partners[other_person.name] = cipher
+
+    @introduce
+    async def aexchange_key_with(self, other_person, sym_key: str, network):
+        """Async variant of :meth:`exchange_key_with` for an ``AsyncNetworkClass``."""
+        logger.info(
+            "[%s] Exchanging AES key with %s via %s.",
+            self.name,
+            other_person.name,
+            network,
+        )
+        msg, cipher = self._key_message(other_person, sym_key)
+        await network.send_symmetric_key(msg)
+        self.secure_partners[other_person.name] = cipher
+
+    def _key_message(self, other_person, sym_key: str):
+        """Build the key message for *other_person* and our matching cipher.
+
+        RSA mode wraps *sym_key* with *other_person*'s RSA public key. X25519
+        mode sends our public key plus a fresh salt; both sides then run HKDF
+        over the shared secret.
+        """
+        if self.key_exchange == "X25519":
+            salt = get_random_bytes(ECDH_utils.SALT_SIZE)
+            session_key = ECDH_utils.derive_session_key(
+                self.__dh_private_key, other_person.dh_public_key, salt
+            )
+            blob = ECDH_utils.export_public_key(self.dh_public_key) + salt
+            data = X25519_PREFIX + base64.b64encode(blob).decode("utf-8")
+            cipher = CipherClass.from_raw_key(session_key, algo=ALGO)
+        else:
+            data = RSA_utils.encrypt_text(sym_key, other_person.public_key)
+            cipher = CipherClass.session(sym_key, algo=ALGO)
+        return MessageClass(data, self, other_person, is_encrypted=True), cipher
 
     @introduce
     def rsa_encrypted_key(self, message):
-        """Handle an incoming RSA-encrypted AES key."""
+        """Handle an incoming RSA-encrypted AES key or X25519 key share."""
         if message.to_person != self:
             logger.warning("[%s] Received a key not intended for me.", self.name)
             return
 
         sender_name = message.sender.name
-        key = RSA_utils.decrypt_text(message.data, self.__private_key)
-        self.secure_partners[sender_name] = CipherClass(key, algo=ALGO)
+        if isinstance(message.data, GroupKeyPayload):
+            payload = message.data
+            self._in_order(message, lambda: self._store_group_key(sender_name, payload))
+            return
+        if message.data.startswith(X25519_PREFIX):
+            blob = base64.b64decode(message.data[len(X25519_PREFIX):])
+            peer_key = ECDH_utils.import_public_key(blob[:-ECDH_utils.SALT_SIZE])
+            session_key = ECDH_utils.derive_session_key(
+                self.__dh_private_key, peer_key, blob[-ECDH_utils.SALT_SIZE:]
+            )
+            cipher = CipherClass.from_raw_key(session_key, algo=ALGO)
+        elif self._crypto_pool is None:
+            key = RSA_utils.decrypt_text(message.data, self.__rsa_keys()[0])
+            cipher = CipherClass.session(key, algo=ALGO)
+        else:
+            # Later messages from this sender chain on the key, not on a worker
+            future = chain(
+                self._crypto_pool.rsa_decrypt(self.__rsa_keys()[0], message.data),
+                lambda key: completed(CipherClass.session(key, algo=ALGO)),
+            )
+            self._pending_ciphers[sender_name] = future
+            self._lanes.submit(
+                sender_name, future, lambda f: self._store_cipher(sender_name, f)
+            )
+            return
+        if self._lanes is None:
+            self._store_cipher(sender_name, completed(cipher))
+        else:
+            future = self._pending_ciphers[sender_name] = completed(cipher)
+            self._lanes.submit(
+                sender_name, future, lambda f: self._store_cipher(sender_name, f)
+            )
+
+    def _store_cipher(self, sender_name, future):
+        """Install the session cipher a key message resolved to."""
+        self.secure_partners[sender_name] = future.result()
+        if self._pending_ciphers.get(sender_name) is future:
+            del self._pending_ciphers[sender_name]
         logger.info(
             "[%s] Stored new AES key for secure chat with %s.", self.name, sender_name
         )
 
     @introduce
-    def receive_message(self, message):
-        """Process an incoming plaintext or AES-encrypted message."""
+    def receive_message(self, message, network=None):
+        """Process an incoming plaintext or AES-encrypted message.
+
+        With a crypto pool this returns as soon as the message is queued: it
+        is decrypted on a worker and handled after every earlier message from
+        the same sender. Use :meth:`drain` to wait for the results.
+        Sequenced messages are acknowledged over *network*, the network that
+        delivered them; without one they are handled but left unacked.
+        """
+        if self._lanes is None:
+            self._receive(message, network)
+        else:
+            self._receive_pooled(message, network)
+
+    @introduce
+    def receive_batch(self, messages, network=None):
+        """Process several incoming messages under a single log banner.
+
+        With a crypto pool the whole batch is decrypted in parallel.
+        """
+        receive = self._receive_pooled if self._lanes else self._receive
+        for message in messages:
+            receive(message, network)
+
+    def drain(self, timeout: float = None) -> bool:
+        """Wait until every pooled message has been handled.
+
+        Returns:
+            bool: False if *timeout* expired first. Always True without a pool.
+        """
+        return self._lanes is None or self._lanes.wait_idle(timeout)
+
+    def _in_order(self, message, handle):
+        """Run *handle* now, or after the sender's pooled messages if pooling."""
+        if self._lanes is None:
+            handle()
+        else:
+            self._lanes.submit(message.sender.name, completed(None), lambda _: handle())
+
+    def _receive_pooled(self, message, network=None):
+        """Queue *message*, decrypting pairwise ciphertext on the crypto pool."""
+        data, sender_name = message.data, message.sender.name
+        if isinstance(data, (GroupCiphertext, StreamPayload)):
+            # Channel keys and attachments don't follow one sender's order;
+            # handle them after everything queued so far, on this thread
+            self._lanes.wait_idle()
+            self._receive(message, network)
+            return
+        if not (
+            message.is_encrypted
+            and isinstance(data, (str, bytes))
+            and (message.to_person == self or self.is_bad_man)
+        ):
+            self._in_order(message, lambda: self._receive(message, network))
+            return
+        if message.to_person != self:
+            logger.info("[%s] Attempting to intercept foreign traffic.", self.name)
+        pending = self._pending_ciphers.get(sender_name)
+        dictionary = self.dictionaries.get(sender_name)
+        future = chain(
+            pending or completed(self.secure_partners.get(sender_name)),
+            lambda cipher: (
+                self._crypto_pool.decrypt(cipher, data, message.compressed, dictionary)
+                if cipher
+                else completed(None)
+            ),
+        )
+        self._lanes.submit(sender_name, future, lambda f: self._open(message, f.result))
+
+    def _receive(self, message, network=None):
+        """Shared body of :meth:`receive_message` and :meth:`receive_batch`."""
+        if isinstance(message.data, GroupCiphertext):
+            self._receive_group(message)
+            return
+        if isinstance(message.data, AckPayload):
+            self._receive_ack(message)
+            return
+        if isinstance(message.data, SequencedPayload):
+            self._receive_sequenced(message, network)
+            return
         if message.to_person != self:
             if not self.is_bad_man:
                 logger.debug("[%s] Ignored message for another recipient.", self.name)
                 return
             logger.info("[%s] Attempting to intercept foreign traffic.", self.name)
 
-        if message.is_encrypted:
+        if isinstance(message.data, StreamPayload):
+            self._receive_stream(message)
+        elif message.is_encrypted:
             cipher = self.secure_partners.get(message.sender.name)
-            if cipher:
-                plaintext = cipher.decrypt(message.data)
+            self._open(
+                message, lambda: cipher and self._decrypt_message(cipher, message)
+            )
+        else:
+            logger.info(
+                "[%s] Plaintext message from %s: %s",
+                self.name,
+                message.sender.name,
+                message.data,
+            )
+            self._notify(message, message.data)
+
+    @staticmethod
+    def _decrypt(cipher, data):
+        if isinstance(data, bytes):
+            # Raw ciphertext from a WireMessage, no base64 layer
+            return cipher.decrypt_bytes(data).decode("utf-8")
+        return cipher.decrypt(data)
+
+    def _decrypt_message(self, cipher, message):
+        if not message.compressed:
+            return self._decrypt(cipher, message.data)
+        data = message.data
+        raw = base64.b64decode(data) if isinstance(data, str) else data
+        return self._plaintext(message, cipher.decrypt_bytes(raw))
+
+    def _plaintext(self, message, body: bytes) -> str:
+        """Decode a decrypted body, decompressing it if the sender compressed it."""
+        if message.compressed:
+            return compress.decompress(body, self.dictionaries.get(message.sender.name))
+        return body.decode("utf-8")
+
+    def _open(self, message, decrypt):
+        """Log and publish the outcome of ``decrypt()`` for *message*.
+
+        *decrypt* returns the plaintext, None when no key is known, or raises
+        ``ValueError``/``UnicodeDecodeError`` for a forged or garbled message.
+        """
+        try:
+            plaintext = decrypt()
+        except (ValueError, UnicodeDecodeError):
+            _FAILED_VERIFICATION.inc()
+            logger.warning(
+                "[%s] Rejected message from %s: ciphertext failed verification.",
+                self.name,
+                message.sender.name,
+            )
+            return
+        if plaintext is None:
+            _MISSING_KEY.inc()
+            logger.warning(
+                "[%s] Encrypted message from %s could not be decrypted "
+                "(missing key).",
+                self.name,
+                message.sender.name,
+            )
+            self._notify(message, None)
+            return
+        logger.info(
+            "[%s] Decrypted message from %s: %s",
+            self.name,
+            message.sender.name,
+            plaintext,
+        )
+        self._notify(message, plaintext)
+
+    def _receive_sequenced(self, message, network):
+        """Hand on sequenced messages in order, dropping replays, and ack."""
+        payload, sender_name = message.data, message.sender.name
+        cipher = self.secure_partners.get(sender_name)
+        if message.to_person != self:
+            if not self.is_bad_man:
+                logger.debug("[%s] Ignored message for another recipient.", self.name)
+                return
+            logger.info("[%s] Attempting to intercept foreign traffic.", self.name)
+            if message.is_encrypted:
+                self._open(
+                    message, lambda: cipher and self._open_sequenced(cipher, message)
+                )
+            else:
                 logger.info(
-                    "[%s] Decrypted message from %s: %s",
+                    "[%s] Plaintext message from %s: %s",
                     self.name,
-                    message.sender.name,
-                    plaintext,
+                    sender_name,
+                    payload.data,
                 )
-            else:
+                self._notify(message, payload.data)
+            return
+
+        text = payload.data
+        if message.is_encrypted:
+            # Authenticate the sequence number before it can move the window
+            if cipher is None:
+                _MISSING_KEY.inc()
                 logger.warning(
-                    "[%s] Encrypted message from %s could not be decrypted "
-                    "(missing key).",
+                    "[%s] Message #%d from %s could not be decrypted (missing key).",
                     self.name,
-                    message.sender.name,
+                    payload.seq,
+                    sender_name,
                 )
-        else:
+                return  # unacked, so it is resent once the key has arrived
+            try:
+                text = self._open_sequenced(cipher, message)
+            except (ValueError, UnicodeDecodeError):
+                _FAILED_VERIFICATION.inc()
+                logger.warning(
+                    "[%s] Rejected message #%d from %s: ciphertext failed "
+                    "verification.",
+                    self.name,
+                    payload.seq,
+                    sender_name,
+                )
+                return
+
+        window = self._receive_windows.get(sender_name)
+        if window is None:
+            window = self._receive_windows.setdefault(sender_name, ReceiveWindow())
+        outcome, ready, ack = window.accept(
+            payload.seq, (message, text), payload.epoch
+        )
+        if outcome == reliable.DUPLICATE:
             logger.info(
-                "[%s] Plaintext message from %s: %s",
+                "[%s] Suppressed duplicate message #%d from %s.",
+                self.name,
+                payload.seq,
+                sender_name,
+            )
+        elif outcome == reliable.OUT_OF_WINDOW:
+            logger.debug(
+                "[%s] Dropped message #%d from %s beyond the receive window.",
+                self.name,
+                payload.seq,
+                sender_name,
+            )
+        if network is not None:
+            epoch = window.epoch
+            sealed = cipher and reliable.seal_ack(
+                cipher, ack, self.name, sender_name, epoch
+            )
+            network.send_message(
+                MessageClass(
+                    AckPayload(ack, sealed, epoch), self, message.sender, bool(sealed)
+                )
+            )
+        for delivered, text in ready:
+            logger.info(
+                "[%s] %s message #%d from %s: %s",
+                self.name,
+                "Decrypted" if delivered.is_encrypted else "Plaintext",
+                delivered.data.seq,
+                sender_name,
+                text,
+            )
+            self._notify(delivered, text)
+
+    def _open_sequenced(self, cipher, message):
+        """Verify a sequenced message's tag, then decrypt its body."""
+        payload = message.data
+        body = reliable.open_sealed(
+            cipher,
+            payload.seq,
+            payload.data,
+            message.sender.name,
+            getattr(message.to_person, "name", message.to_person),
+            payload.epoch,
+        )
+        return self._plaintext(message, body)
+
+    def _receive_ack(self, message):
+        """Slide our send window; acks must be sealed once a key is shared."""
+        if message.to_person != self or self._reliable is None:
+            return
+        payload, sender_name = message.data, message.sender.name
+        cipher = self.secure_partners.get(sender_name)
+        if cipher is not None and not reliable.open_ack(
+            cipher, payload, sender_name, self.name
+        ):
+            logger.warning(
+                "[%s] Rejected unauthenticated ack from %s.", self.name, sender_name
+            )
+            return
+        self._reliable.acknowledge(sender_name, payload.ack, payload.epoch)
+
+    def retransmit(self, now: float = None) -> int:
+        """Resend unacked messages whose timer has expired; returns how many.
+
+        A background timer does this automatically; calling it directly is
+        for tests and simulations driving their own clock.
+        """
+        return self._reliable.retransmit(now) if self._reliable else 0
+
+    def wait_acked(self, timeout: float = None) -> bool:
+        """Block until every sequenced message is acknowledged.
+
+        Returns:
+            bool: False if *timeout* expired first. Always True without a window.
+        """
+        return self._reliable is None or self._reliable.wait_acked(timeout)
+
+    def close(self) -> None:
+        """Stop retransmitting; call when this participant leaves for good."""
+        if self._reliable is not None:
+            self._reliable.close()
+
+    def _notify(self, message, text, channel=None):
+        """Hand a delivered message to :attr:`on_message`, if set."""
+        if self.on_message is None:
+            return
+        to_person = message.to_person
+        if channel is not None:
+            to_name, channel_name = None, channel.name
+            intercepted = self.name not in channel.members
+        else:
+            to_name, channel_name = getattr(to_person, "name", to_person), None
+            intercepted = to_person is not self
+        self.on_message(
+            {
+                "from": message.sender.name,
+                "to": to_name,
+                "channel": channel_name,
+                "encrypted": message.is_encrypted,
+                "text": text,
+                "intercepted": intercepted,
+            }
+        )
+
+    def _receive_group(self, message):
+        """Decrypt a channel message with the matching epoch's group key."""
+        channel, payload = message.to_person, message.data
+        if self.name not in channel.members:
+            if not self.is_bad_man:
+                logger.debug("[%s] Ignored message for %s.", self.name, channel)
+                return
+            logger.info("[%s] Attempting to intercept %s traffic.", self.name, channel)
+        key = self._group_key(payload.channel, payload.epoch)
+        if key is None:
+            _MISSING_KEY.inc()
+            logger.warning(
+                "[%s] Message from %s in %s could not be decrypted (missing key).",
                 self.name,
                 message.sender.name,
-                message.data,
+                channel,
             )
+            self._notify(message, None, channel)
+            return
+        try:
+            cipher = CipherClass.from_raw_key(key, algo=ALGO)
+            plaintext = cipher.decrypt_bytes(payload.data).decode("utf-8")
+        except (ValueError, UnicodeDecodeError):
+            _FAILED_VERIFICATION.inc()
+            logger.warning(
+                "[%s] Rejected message from %s in %s: ciphertext failed verification.",
+                self.name,
+                message.sender.name,
+                channel,
+            )
+            return
+        logger.info(
+            "[%s] Decrypted message from %s in %s: %s",
+            self.name,
+            message.sender.name,
+            channel,
+            plaintext,
+        )
+        self._notify(message, plaintext, channel)
+
+    def _group_key(self, channel_name, epoch):
+        """Key for *epoch*, ratcheting forward from the newest earlier one."""
+        keys = self.channel_keys.get(channel_name, {})
+        if epoch in keys:
+            return keys[epoch]
+        known = [e for e in keys if e < epoch]
+        if not known:
+            return None
+        # Join epochs are ratchets; a leave in between makes this key wrong,
+        # which the authenticated modes detect and CBC reports as bad padding.
+        e = max(known)
+        key = keys[e]
+        for e in range(e + 1, epoch + 1):
+            key = ratchet(key)
+        keys[epoch] = key
+        return key
+
+    def _store_group_key(self, sender_name, payload):
+        if payload.via == "pairwise":
+            cipher = self.secure_partners.get(sender_name)
+            if cipher is None:
+                logger.warning(
+                    "[%s] Group key for #%s from %s could not be unwrapped "
+                    "(missing key).",
+                    self.name,
+                    payload.channel,
+                    sender_name,
+                )
+                _MISSING_KEY.inc()
+                return
+        try:
+            if payload.via == "pairwise":
+                key = cipher.decrypt_bytes(payload.wrapped)
+            else:
+                key = RSA_utils.unwrap_key(payload.wrapped, self.__rsa_keys()[0])
+            if len(key) != GROUP_KEY_SIZE:
+                raise ValueError("Unwrapped group key has the wrong size")
+        except (ValueError, TypeError):
+            _FAILED_VERIFICATION.inc()
+            logger.warning(
+                "[%s] Group key for #%s from %s could not be unwrapped "
+                "(failed verification).",
+                self.name,
+                payload.channel,
+                sender_name,
+            )
+            return
+        self.channel_keys.setdefault(payload.channel, {})[payload.epoch] = key
+        logger.info(
+            "[%s] Stored key for #%s (epoch %d) from %s.",
+            self.name,
+            payload.channel,
+            payload.epoch,
+            sender_name,
+        )
+
+    @introduce
+    def create_channel(self, name: str, members, network: NetworkClass):
+        """Create channel *name* owned by us and give *members* its key."""
+        channel = ChannelClass(name, self)
+        channel.members[self.name] = self
+        for member in members:
+            channel.members[member.name] = member
+        key = get_random_bytes(GROUP_KEY_SIZE)
+        self.channel_keys[name] = {0: key}
+        logger.info(
+            "[%s] Created %s with %d members.", self.name, channel, len(channel.members)
+        )
+        self._distribute_group_key(channel, key, members, network)
+        return channel
+
+    @introduce
+    def add_to_channel(self, channel, person, network: NetworkClass):
+        """Add *person*: ratchet the key forward and wrap it for them only."""
+        self._require_owner(channel)
+        key = ratchet(self._group_key(channel.name, channel.epoch))
+        channel.epoch += 1
+        channel.members[person.name] = person
+        self.channel_keys[channel.name][channel.epoch] = key
+        logger.info("[%s] Added %s to %s.", self.name, person.name, channel)
+        self._distribute_group_key(channel, key, [person], network)
+
+    @introduce
+    def remove_from_channel(self, channel, person, network: NetworkClass):
+        """Remove *person*: pick a fresh key and wrap it for the others.
+
+        Raises:
+            ValueError: If this participant does not own *channel* or *person*
+                is not a member of it.
+        """
+        self._require_owner(channel)
+        if channel.members.pop(person.name, None) is None:
+            raise ValueError(f"{person.name} is not a member of {channel}")
+        key = get_random_bytes(GROUP_KEY_SIZE)
+        channel.epoch += 1
+        self.channel_keys[channel.name][channel.epoch] = key
+        logger.info("[%s] Removed %s from %s.", self.name, person.name, channel)
+        others = [m for m in channel.members.values() if m is not self]
+        self._distribute_group_key(channel, key, others, network)
+
+    def _require_owner(self, channel):
+        if channel.owner is not self:
+            raise ValueError(f"Only {channel.owner} can change {channel}")
+
+    def _distribute_group_key(self, channel, key, members, network):
+        """Wrap *key* once per member and send it as key material."""
+        for member in members:
+            if member is self:
+                continue
+            cipher = self.secure_partners.get(member.name)
+            if cipher is not None:
+                payload = GroupKeyPayload(
+                    channel.name, channel.epoch, cipher.encrypt_bytes(key), "pairwise"
+                )
+            else:
+                payload = GroupKeyPayload(
+                    channel.name,
+                    channel.epoch,
+                    RSA_utils.wrap_key(key, member.public_key),
+                    "rsa",
+                )
+            msg = MessageClass(payload, self, member, is_encrypted=True)
+            network.send_symmetric_key(msg)
+
+    @introduce
+    def send_group_message(self, channel, plain_text: str, network: NetworkClass):
+        """Encrypt *plain_text* once and deliver it to every member of *channel*."""
+        epoch = channel.epoch
+        key = self._group_key(channel.name, epoch)
+        if key is None:
+            raise ValueError(f"No key for {channel} (epoch {epoch})")
+        cipher = CipherClass.from_raw_key(key, algo=ALGO)
+        payload = GroupCiphertext(
+            channel.name, epoch, cipher.encrypt_bytes(plain_text.encode("utf-8"))
+        )
+        msg = MessageClass(payload, self, channel, is_encrypted=True)
+        logger.info("[%s] Sending message to %s via %s.", self.name, channel, network)
+        network.send_message(msg)
+
+    def _receive_stream(self, message):
+        """Decrypt an incoming attachment chunk by chunk."""
+        if message.to_person != self:
+            _MISSING_KEY.inc()
+            logger.warning(
+                "[%s] Encrypted attachment from %s could not be decrypted "
+                "(missing key).",
+                self.name,
+                message.sender.name,
+            )
+            return
+        chunks = message.data.open(self.__rsa_keys()[0])
+        if self.on_attachment is not None:
+            self.on_attachment(message.sender.name, chunks)
+            return
+        try:
+            size = sum(len(chunk) for chunk in chunks)
+        except ValueError:
+            _FAILED_VERIFICATION.inc()
+            logger.warning(
+                "[%s] Rejected attachment from %s: stream failed verification.",
+                self.name,
+                message.sender.name,
+            )
+            return
+        logger.info(
+            "[%s] Received %d-byte attachment from %s.",
+            self.name,
+            size,
+            message.sender.name,
+        )
 
     @introduce
     def send_message(self, to_person, plain_text: str, network: NetworkClass):
-        """Send *plain_text* to *to_person*, encrypting if a shared AES key exists."""
+        """Send *plain_text* to *to_person*, encrypting if a shared AES key exists.
+
+        *plain_text* may also be ``bytes``, a binary file object or an
+        iterable of bytes; it is then streamed as an attachment in
+        authenticated chunks under a fresh key wrapped with *to_person*'s RSA
+        public key, so memory use stays constant regardless of its size.
+        """
+        if self._reliable is not None and isinstance(plain_text, str):
+            logger.info(
+                "[%s] Sending sequenced message to %s via %s.",
+                self.name,
+                to_person,
+                network,
+            )
+            self._send_sequenced(to_person, plain_text, network)
+            return
+        msg = self._outgoing_message(to_person, plain_text)
+        logger.info("[%s] Sending message to %s via %s.", self.name, to_person, network)
+        network.send_message(msg)
+
+    @introduce
+    async def asend_message(self, to_person, plain_text: str, network):
+        """Async variant of :meth:`send_message` for an ``AsyncNetworkClass``.
+
+        Raises:
+            ValueError: If this participant has a send window.
+        """
+        self._require_unsequenced()
+        msg = self._outgoing_message(to_person, plain_text)
+        logger.info("[%s] Sending message to %s via %s.", self.name, to_person, network)
+        await network.send_message(msg)
+
+    @introduce
+    def send_many(self, items, network: NetworkClass):
+        """Send every ``(to_person, plain_text)`` pair in *items* as one batch.
+
+        Messages are grouped by recipient so each partner's cipher is looked up
+        once, then handed to ``network.send_batch`` in a single fan-out. With a
+        send window the items are sequenced one by one instead.
+        """
+        if self._reliable is not None:
+            for to_person, plain_text in items:
+                self._send_sequenced(to_person, plain_text, network)
+            return
+        batch = self._outgoing_batch(items)
+        logger.info(
+            "[%s] Sending batch of %d messages via %s.", self.name, len(batch), network
+        )
+        network.send_batch(batch)
+
+    @introduce
+    async def asend_many(self, items, network):
+        """Async variant of :meth:`send_many` for an ``AsyncNetworkClass``.
+
+        Raises:
+            ValueError: If this participant has a send window.
+        """
+        self._require_unsequenced()
+        batch = self._outgoing_batch(items)
+        logger.info(
+            "[%s] Sending batch of %d messages via %s.", self.name, len(batch), network
+        )
+        await network.send_batch(batch)
+
+    def _require_unsequenced(self):
+        # Acks and retransmissions go out synchronously from the window
+        if self._reliable is not None:
+            raise ValueError(
+                "Sequenced delivery needs a synchronous network: use send_message"
+            )
+
+    def _outgoing_batch(self, items):
+        """Encrypt *items* recipient by recipient, keeping per-recipient order."""
+        groups = {}  # {recipient_name: (PersonClass, [plain_text, ...])}
+        for to_person, plain_text in items:
+            groups.setdefault(to_person.name, (to_person, []))[1].append(plain_text)
+        batch = []
+        for name, (to_person, texts) in groups.items():
+            cipher = self.secure_partners.get(name)
+            if cipher and self._crypto_pool is not None and not self.compression:
+                # Encrypt the group in parallel; results keep submission order
+                futures = [self._crypto_pool.encrypt(cipher, t) for t in texts]
+                batch.extend(
+                    MessageClass(f.result(), self, to_person, True) for f in futures
+                )
+                continue
+            for plain_text in texts:
+                if cipher and self.compression:
+                    msg = self._outgoing_message(to_person, plain_text)
+                elif cipher:
+                    msg = MessageClass(cipher.encrypt(plain_text), self, to_person, True)
+                else:
+                    msg = MessageClass(plain_text, self, to_person, False)
+                batch.append(msg)
+        return batch
+
+    def _send_sequenced(self, to_person, plain_text: str, network):
+        self._reliable.send(
+            to_person.name,
+            lambda seq, epoch: self._sequenced_message(
+                to_person, plain_text, seq, epoch
+            ),
+            network,
+        )
+
+    def _sequenced_message(
+        self, to_person, plain_text: str, seq: int, epoch: int = 0
+    ):
+        """Message *seq* of *epoch* to *to_person*, sealed in if encrypted."""
         cipher = self.secure_partners.get(to_person.name)
+        frame = cipher and self._compress(to_person.name, plain_text)
+        if cipher:
+            data = reliable.seal(
+                cipher, seq, frame or plain_text, self.name, to_person.name, epoch
+            )
+        else:
+            data = plain_text
+        payload = SequencedPayload(seq, data, epoch)
+        return MessageClass(
+            payload, self, to_person, is_encrypted=bool(cipher), compressed=bool(frame)
+        )
+
+    def _compress(self, partner_name: str, plain_text: str):
+        """Compressed frame for *plain_text*, or None to send it as is."""
+        if self.compression is None:
+            return None
+        return compress.compress(
+            plain_text,
+            self.compression,
+            self.dictionaries.get(partner_name),
+            self.compress_threshold,
+        )
+
+    def _outgoing_message(self, to_person, plain_text: str):
+        """Build the message for *to_person*, encrypting if a shared key exists."""
+        if not isinstance(plain_text, str):
+            payload = StreamPayload(plain_text, to_person.public_key)
+            return MessageClass(payload, self, to_person, is_encrypted=True)
+        cipher = self.secure_partners.get(to_person.name)
+        frame = cipher and self._compress(to_person.name, plain_text)
+        if frame:
+            data = base64.b64encode(cipher.encrypt_bytes(frame)).decode("utf-8")
+            return MessageClass(data, self, to_person, True, compressed=True)
         data, is_encrypted = (
             (cipher.encrypt(plain_text), True) if cipher else (plain_text, False)
         )
-        msg = MessageClass(data, self, to_person, is_encrypted=is_encrypted)
-        logger.info("[%s] Sending message to %s via %s.", self.name, to_person, network)
-        network.send_message(msg)
+        return MessageClass(data, self, to_person, is_encrypted=is_encrypted)
 
     def __str__(self):
         return self.name
\ No newline at end of file
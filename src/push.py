@@ -0,0 +1,93 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Push delivery of received messages to live subscribers.
+
+``PushHub.publish`` is installed as a participant's ``on_message`` hook. Each
+subscriber (e.g. one WebSocket connection) owns a bounded queue on the event
+loop; publishing from any thread only schedules a non-blocking put, so a
+slow client can never stall message delivery. A subscriber whose queue
+overflows is evicted instead of buffering without limit.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import asyncio
+
+from src.logging import logger
+
+QUEUE_SIZE = 256
+
+
+class Subscription:
+    """One consumer's bounded view of a participant's deliveries.
+
+    Args:
+        name (str): Participant whose messages are delivered.
+        loop (asyncio.AbstractEventLoop): Loop that owns the queue.
+        queue_size (int, optional): Events buffered before eviction.
+            Defaults to ``QUEUE_SIZE``.
+    """
+
+    def __init__(self, name, loop, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.loop = loop
+        self.evicted = False
+        self._queue = asyncio.Queue(queue_size)
+
+    def _offer(self, event):
+        """Runs on the owning loop: enqueue or evict on overflow."""
+        if self.evicted:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.evicted = True
+            logger.warning(
+                "[PUSH] Evicted slow subscriber of %s (queue full).", self.name
+            )
+            # Drop the backlog and wake the reader with the end marker
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(None)
+
+    async def get(self):
+        """Return the next event, or None once this subscriber is evicted."""
+        return await self._queue.get()
+
+
+class PushHub:
+    """Fan delivered messages out to the subscribers of each participant."""
+
+    def __init__(self):
+        # {participant_name: tuple(Subscription)}; replaced, never mutated,
+        # so publishers on other threads can read it without a lock
+        self._subscribers = {}
+
+    def subscribe(self, name, queue_size=QUEUE_SIZE):
+        """Start buffering *name*'s deliveries; call from the event loop."""
+        sub = Subscription(name, asyncio.get_running_loop(), queue_size)
+        self._subscribers[name] = self._subscribers.get(name, ()) + (sub,)
+        return sub
+
+    def unsubscribe(self, sub):
+        subs = tuple(s for s in self._subscribers.get(sub.name, ()) if s is not sub)
+        if subs:
+            self._subscribers[sub.name] = subs
+        else:
+            self._subscribers.pop(sub.name, None)
+
+    def publish(self, name, event):
+        """Queue *event* for every subscriber of *name*; thread-safe."""
+        for sub in self._subscribers.get(name, ()):
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, event)
+            except RuntimeError:  # loop already closed
+                self.unsubscribe(sub)
+
+    def hook(self, person):
+        """Install :meth:`publish` as *person*'s ``on_message`` hook."""
+        person.on_message = lambda event: self.publish(person.name, event)
+        return person
+
+    def subscribers(self, name):
+        return len(self._subscribers.get(name, ()))
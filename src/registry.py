@@ -0,0 +1,219 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Thread-safe participant registry.
+
+Participants are spread over a fixed number of dict shards, each guarded by
+its own lock, so concurrent lookups for different names never contend and
+create/get/join/leave stay O(1). An optional SQLite store makes membership
+visible to every process on the host (e.g. several uvicorn workers); each
+process materializes its own ``PersonClass`` on first use.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import sqlite3
+import threading
+import zlib
+
+from src.logging import logger
+
+
+class SQLiteStore:
+    """Participant membership shared between processes through SQLite.
+
+    Args:
+        path (str): Database file; created if missing.
+        timeout (float, optional): Seconds to wait on a locked database.
+            Defaults to 5.0.
+    """
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS participants ("
+                " name TEXT PRIMARY KEY,"
+                " is_bad_man INTEGER NOT NULL,"
+                " joined INTEGER NOT NULL DEFAULT 0)"
+            )
+
+    def _conn(self):
+        """Return this thread's connection (sqlite3 objects are per-thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def add(self, name, is_bad_man):
+        """Insert *name*; return False if another process got there first."""
+        with self._conn() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO participants (name, is_bad_man) VALUES (?, ?)",
+                (name, int(bool(is_bad_man))),
+            )
+        return cur.rowcount == 1
+
+    def get(self, name):
+        """Return ``{"is_bad_man": bool, "joined": bool}`` or None."""
+        row = self._conn().execute(
+            "SELECT is_bad_man, joined FROM participants WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"is_bad_man": bool(row[0]), "joined": bool(row[1])}
+
+    def set_joined(self, name, joined=True):
+        with self._conn() as conn:
+            conn.execute(
+                "UPDATE participants SET joined = ? WHERE name = ?",
+                (int(joined), name),
+            )
+
+    def remove(self, name):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM participants WHERE name = ?", (name,))
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM participants")
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM participants").fetchone()[0]
+
+
+class ParticipantRegistry:
+    """Name -> participant map, safe to share between request threads.
+
+    Args:
+        factory (callable): ``factory(name, is_bad_man)`` building a participant.
+        network (NetworkClass, optional): Network that :meth:`join` and
+            :meth:`leave` act on.
+        shards (int, optional): Number of lock-striped shards. Defaults to 16.
+        store (SQLiteStore, optional): Shared membership store. Without one
+            the registry is local to this process.
+
+    Raises:
+        ValueError: If *shards* is not positive.
+    """
+
+    def __init__(self, factory, network=None, shards=16, store=None):
+        if shards < 1:
+            raise ValueError("shards must be positive")
+        self.factory = factory
+        self.network = network
+        self.store = store
+        self._shards = [({}, threading.Lock()) for _ in range(shards)]
+
+    def _shard(self, name):
+        # crc32, not hash(): stable across processes and interpreter runs
+        return self._shards[zlib.crc32(name.encode()) % len(self._shards)]
+
+    def create(self, name, is_bad_man=False):
+        """Create and register a participant.
+
+        Returns:
+            tuple: ``(person, created)``; *created* is False and *person* the
+            existing participant if *name* was already registered.
+        """
+        people, lock = self._shard(name)
+        with lock:
+            person = self._lookup(name, people)
+            if person is not None:
+                return person, False
+            if self.store is not None and not self.store.add(name, is_bad_man):
+                return self._materialize(name, people), False
+            person = self.factory(name, is_bad_man)
+            people[name] = person
+        logger.debug("[REGISTRY] Created %s.", name)
+        return person, True
+
+    def get(self, name):
+        """Return the participant called *name*, or None."""
+        people, lock = self._shard(name)
+        if self.store is None:
+            return people.get(name)  # a single dict read needs no lock
+        with lock:
+            return self._lookup(name, people) or self._materialize(name, people)
+
+    def _lookup(self, name, people):
+        """Local cache hit, dropped if another process removed *name*."""
+        person = people.get(name)
+        if person is not None and self.store is not None and self.store.get(name) is None:
+            del people[name]
+            if self.network is not None:
+                self.network.leave(person)
+            return None
+        return person
+
+    def _materialize(self, name, people):
+        """Build the local copy of a participant another process created."""
+        row = self.store.get(name) if self.store is not None else None
+        if row is None:
+            return None
+        person = self.factory(name, row["is_bad_man"])
+        people[name] = person
+        if row["joined"] and self.network is not None:
+            self.network.join(person)
+        return person
+
+    def join(self, name):
+        """Join *name* to the network; repeated joins are no-ops.
+
+        Returns:
+            PersonClass: The participant, or None if *name* is unknown.
+        """
+        person = self.get(name)
+        if person is None:
+            return None
+        self.network.join(person)
+        if self.store is not None:
+            self.store.set_joined(name)
+        return person
+
+    def leave(self, name):
+        """Take *name* off the network but keep it registered."""
+        person = self.get(name)
+        if person is None:
+            return None
+        self.network.leave(person)
+        if self.store is not None:
+            self.store.set_joined(name, False)
+        return person
+
+    def remove(self, name):
+        """Forget *name* entirely; return the removed participant or None."""
+        people, lock = self._shard(name)
+        with lock:
+            person = people.pop(name, None)
+            if self.store is not None:
+                self.store.remove(name)
+        if person is not None and self.network is not None:
+            self.network.leave(person)
+        return person
+
+    def clear(self):
+        """Forget every participant, here and in the shared store.
+
+        Returns:
+            list: The participants this process had loaded.
+        """
+        forgotten = []
+        for people, lock in self._shards:
+            with lock:
+                forgotten.extend(people.values())
+                people.clear()
+        if self.store is not None:
+            self.store.clear()
+        return forgotten
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __len__(self):
+        if self.store is not None:
+            return len(self.store)
+        return sum(len(people) for people, _ in self._shards)
@@ -0,0 +1,474 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Sequenced, acknowledged delivery for pairwise messages.
+
+A sender numbers each conversation's messages 0, 1, 2, ... and keeps up to
+`window` of them in flight. The receiver hands them on in order, buffers
+early arrivals, drops anything it has already seen and answers every data
+message with a cumulative ack: the next sequence number it expects. A
+message still unacknowledged when its retransmission timer expires is sent
+again, with the timeout doubling on every attempt; after `max_retries`
+attempts the peer is taken to be gone and its whole window is dropped.
+The next message to that peer opens a new epoch numbered from 0 again; the
+receiver starts a fresh window when it sees the higher epoch and ignores
+anything left over from an older one.
+
+In encrypted conversations every message carries an HMAC-SHA256 tag over
+its direction, epoch, sequence number and ciphertext (encrypt-then-MAC),
+and acks carry one over their epoch and number, under a key derived from
+the session key with HKDF. That holds for the unauthenticated CBC modes
+too, whose IV would otherwise let an eavesdropper rewrite a number sealed
+in the first block: a replayed, renumbered or reflected message and a
+forged ack are all rejected. Plaintext conversations only get ordering and
+duplicate suppression.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import hashlib
+import hmac
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from Crypto.Hash import SHA256
+from Crypto.Protocol.KDF import HKDF
+
+from src.logging import logger
+from src.metrics import DROPPED, REGISTRY
+
+DEFAULT_WINDOW = 8
+DEFAULT_RTO = 1.0  # seconds before the first retransmission
+MAX_RTO = 30.0
+MAX_RETRIES = 8  # retransmissions of one message before giving up on a peer
+RECEIVE_BUFFER = 64  # out-of-order messages a receiver holds per sender
+
+HEADER = struct.Struct("!IQ")  # epoch, then sequence number or cumulative ack
+TAG_SIZE = 16  # bytes of HMAC-SHA256 kept
+_MAC_INFO = b"p2p sequence authentication"
+
+RETRANSMITTED = REGISTRY.counter(
+    "p2p_retransmissions_total", "Sequenced messages sent again after a timeout."
+)
+DUPLICATES = REGISTRY.counter(
+    "p2p_messages_duplicate_total", "Sequenced messages suppressed as already seen."
+)
+_BEYOND_WINDOW = DROPPED.labels("out_of_window")
+_GAVE_UP = DROPPED.labels("retries_exhausted")
+
+# ReceiveWindow.accept outcomes
+ACCEPTED = "accepted"
+DUPLICATE = "duplicate"
+OUT_OF_WINDOW = "out_of_window"
+
+
+class SequencedPayload:
+    """A pairwise message carrying its sequence number.
+
+    The recipient acknowledges it over the network it arrived on.
+
+    Args:
+        seq (int): Position in the sender's conversation with the recipient.
+        data: Plaintext ``str``, or raw ciphertext bytes from :func:`seal`.
+        epoch (int, optional): Restarts of the numbering after the sender
+            gave up on the recipient. Defaults to 0.
+    """
+
+    def __init__(self, seq: int, data, epoch: int = 0):
+        self.seq = seq
+        self.data = data
+        self.epoch = epoch
+
+    def __str__(self):
+        return f"<message #{self.seq}>"
+
+
+class AckPayload:
+    """Cumulative acknowledgement: every message before *ack* has arrived.
+
+    Args:
+        ack (int): Next sequence number the receiver expects.
+        sealed (bytes, optional): Tag over *ack* under the pairwise key.
+        epoch (int, optional): Epoch of the messages acknowledged.
+    """
+
+    def __init__(self, ack: int, sealed: bytes = None, epoch: int = 0):
+        self.ack = ack
+        self.sealed = sealed
+        self.epoch = epoch
+
+    def __str__(self):
+        return f"<ack {self.ack}>"
+
+
+@lru_cache(maxsize=64)
+def _mac_key(session_key: bytes) -> bytes:
+    """MAC key for a session, kept apart from the encryption key."""
+    return HKDF(session_key, 32, b"", SHA256, context=_MAC_INFO)
+
+
+def _tag(cipher, kind, sender, recipient, epoch, number, data=b""):
+    header = b"\x00".join(
+        (
+            kind,
+            sender.encode("utf-8"),
+            recipient.encode("utf-8"),
+            HEADER.pack(epoch, number),
+        )
+    )
+    mac = hmac.new(_mac_key(cipher.key), header + data, hashlib.sha256)
+    return mac.digest()[:TAG_SIZE]
+
+
+def seal(cipher, seq: int, body, sender: str, recipient: str, epoch: int = 0) -> bytes:
+    """Encrypt *body* (text or bytes) and append a tag binding *seq* to it.
+
+    The tag also covers the epoch and the direction, so a message cannot be
+    replayed into a later epoch or reflected back to its sender as if the
+    peer had sent it.
+    """
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    data = cipher.encrypt_bytes(body)
+    return data + _tag(cipher, b"msg", sender, recipient, epoch, seq, data)
+
+
+def open_sealed(cipher, seq: int, sealed: bytes, sender: str, recipient: str,
+                epoch: int = 0):
+    """Check the tag of :func:`seal` output for *seq*, then decrypt it.
+
+    Returns:
+        bytes: The sealed body.
+
+    Raises:
+        ValueError: If the tag does not match or decryption fails.
+    """
+    data, tag = sealed[:-TAG_SIZE], sealed[-TAG_SIZE:]
+    expected = _tag(cipher, b"msg", sender, recipient, epoch, seq, data)
+    if len(sealed) <= TAG_SIZE or not hmac.compare_digest(tag, expected):
+        raise ValueError("Sequence number is not authentic")
+    return cipher.decrypt_bytes(data)
+
+
+def seal_ack(cipher, ack: int, sender: str, recipient: str, epoch: int = 0) -> bytes:
+    """Tag authenticating cumulative ack *ack* from *sender* to *recipient*."""
+    return _tag(cipher, b"ack", sender, recipient, epoch, ack)
+
+
+def open_ack(cipher, payload: AckPayload, sender: str, recipient: str) -> bool:
+    """True if *payload* carries a valid tag for its number."""
+    if payload.sealed is None:
+        return False
+    expected = seal_ack(cipher, payload.ack, sender, recipient, payload.epoch)
+    return hmac.compare_digest(bytes(payload.sealed), expected)
+
+
+class SendWindow:
+    """Sender half of one conversation: numbering, window and retransmission.
+
+    Args:
+        size (int, optional): Most unacknowledged messages in flight.
+            Defaults to ``DEFAULT_WINDOW``.
+        rto (float, optional): Seconds before the first retransmission.
+            Defaults to ``DEFAULT_RTO``.
+        max_retries (int, optional): Retransmissions of one message before
+            :meth:`expired` gives up. Defaults to ``MAX_RETRIES``.
+        epoch (int, optional): Epoch the window numbers messages in.
+
+    Raises:
+        ValueError: If *size* or *rto* is not positive, or *max_retries* is
+            negative.
+    """
+
+    def __init__(self, size: int = DEFAULT_WINDOW, rto: float = DEFAULT_RTO,
+                 max_retries: int = MAX_RETRIES, epoch: int = 0):
+        if size < 1:
+            raise ValueError("Window size must be positive")
+        if rto <= 0:
+            raise ValueError("Retransmission timeout must be positive")
+        if max_retries < 0:
+            raise ValueError("Retry limit must not be negative")
+        self.size = size
+        self.rto = rto
+        self.max_retries = max_retries
+        self.epoch = epoch
+        self.next_seq = 0
+        self.base = 0  # oldest unacknowledged sequence number
+        # {seq: [message, network, deadline, rto, retries]}
+        self._in_flight = OrderedDict()
+        self._backlog = deque()  # [(seq, message, network)] waiting for room
+        self._lock = threading.Lock()
+
+    def enqueue(self, build, network, now: float = None):
+        """Number the next message and return what may be sent right away.
+
+        Args:
+            build (callable): ``build(seq)`` returns the message to send.
+            network: Network to (re)transmit it on.
+            now (float, optional): Current ``time.monotonic()``.
+
+        Returns:
+            list: ``(message, network)`` pairs to transmit now; empty when
+            the window is full and the message was queued behind it.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            seq = self.next_seq
+            self.next_seq += 1
+            self._backlog.append((seq, build(seq), network))
+            return self._fill(now)
+
+    def _fill(self, now):
+        sendable = []
+        while self._backlog and len(self._in_flight) < self.size:
+            seq, message, network = self._backlog.popleft()
+            self._in_flight[seq] = [message, network, now + self.rto, self.rto, 0]
+            sendable.append((message, network))
+        return sendable
+
+    def acknowledge(self, ack: int, now: float = None):
+        """Slide the window up to *ack* and return the messages now sendable.
+
+        Stale acks and acks for numbers not yet sent are ignored.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self.base < ack <= self.base + len(self._in_flight):
+                return []
+            for seq in range(self.base, ack):
+                del self._in_flight[seq]
+            self.base = ack
+            return self._fill(now)
+
+    def expired(self, now: float = None):
+        """Return in-flight messages whose timer ran out, backing each off.
+
+        Returns:
+            tuple: ``(due, dropped)``. *due* lists the ``(message, network)``
+            pairs to resend. Once a message has used up its retries the
+            window is emptied instead: *due* is empty and *dropped* counts
+            the messages given up, in flight or waiting for room.
+        """
+        now = time.monotonic() if now is None else now
+        due = []
+        with self._lock:
+            for entry in self._in_flight.values():
+                message, network, deadline, rto, retries = entry
+                if deadline > now:
+                    continue
+                if retries >= self.max_retries:
+                    dropped = len(self._in_flight) + len(self._backlog)
+                    self._in_flight.clear()
+                    self._backlog.clear()
+                    self.base = self.next_seq
+                    return [], dropped
+                rto = min(rto * 2, MAX_RTO)
+                entry[2:] = now + rto, rto, retries + 1
+                due.append((message, network))
+        return due, 0
+
+    def next_deadline(self):
+        """Earliest retransmission deadline, or None with nothing in flight."""
+        with self._lock:
+            return min((e[2] for e in self._in_flight.values()), default=None)
+
+    def __len__(self):
+        """Messages not yet acknowledged, in flight or waiting for room."""
+        with self._lock:
+            return len(self._in_flight) + len(self._backlog)
+
+
+class ReceiveWindow:
+    """Receiver half of one conversation: ordering and replay suppression.
+
+    A message from a later epoch means the sender gave up and started over,
+    so the window restarts at that epoch; messages from earlier epochs are
+    duplicates.
+
+    Args:
+        size (int, optional): Sequence numbers beyond the next expected one
+            that are buffered; later ones are dropped and left to the
+            sender's retransmission. Defaults to ``RECEIVE_BUFFER``.
+    """
+
+    def __init__(self, size: int = RECEIVE_BUFFER):
+        self.size = size
+        self.epoch = 0
+        self.expected = 0
+        self._early = {}  # {seq: item}
+        self._lock = threading.Lock()
+
+    def accept(self, seq: int, item, epoch: int = 0):
+        """Record message *seq* of *epoch* and release whatever is now in order.
+
+        Returns:
+            tuple: ``(outcome, ready, ack)``; *ready* lists the items to hand
+            on, oldest first, and *ack* is the cumulative ack to send back
+            for the window's current :attr:`epoch`.
+        """
+        with self._lock:
+            if epoch > self.epoch:
+                self.epoch, self.expected = epoch, 0
+                self._early.clear()
+            if epoch < self.epoch or seq < self.expected or seq in self._early:
+                DUPLICATES.inc()
+                return DUPLICATE, [], self.expected
+            if seq >= self.expected + self.size:
+                _BEYOND_WINDOW.inc()
+                return OUT_OF_WINDOW, [], self.expected
+            self._early[seq] = item
+            ready = []
+            while self.expected in self._early:
+                ready.append(self._early.pop(self.expected))
+                self.expected += 1
+            return ACCEPTED, ready, self.expected
+
+
+class ReliableSender:
+    """Send windows for every conversation of one participant.
+
+    Transmission goes through a single outbox drained by whichever thread
+    gets there first, so acks that open the window while a send is still in
+    progress never recurse into the network. A daemon timer resends expired
+    messages while anything is unacknowledged. A peer that has not
+    acknowledged a message after *max_retries* retransmissions is taken to
+    be gone: its window is dropped and the next message to it starts the
+    numbering again in a new epoch.
+
+    Args:
+        window (int, optional): Per-conversation window size.
+        rto (float, optional): Initial retransmission timeout in seconds.
+        send (callable, optional): ``send(message, network)``; defaults to
+            ``network.send_message(message)``.
+        max_retries (int, optional): Retransmissions of one message before
+            giving up on its peer. Defaults to ``MAX_RETRIES``.
+    """
+
+    def __init__(self, window: int = DEFAULT_WINDOW, rto: float = DEFAULT_RTO,
+                 send=None, max_retries: int = MAX_RETRIES):
+        SendWindow(window, rto, max_retries)  # validate up front
+        self.window = window
+        self.rto = rto
+        self.max_retries = max_retries
+        self._send = send or (lambda message, network: network.send_message(message))
+        self._windows = {}  # {peer_name: SendWindow}
+        self._epochs = {}  # {peer_name: epoch of the next window}
+        self._outbox = deque()
+        self._pumping = False
+        self._timer = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._acked = threading.Condition(self._lock)
+
+    def send(self, peer_name: str, build, network) -> None:
+        """Number a message for *peer_name* with ``build(seq, epoch)``, send it."""
+        with self._lock:
+            window = self._windows.get(peer_name)
+            if window is None:
+                window = self._windows[peer_name] = SendWindow(
+                    self.window,
+                    self.rto,
+                    self.max_retries,
+                    self._epochs.get(peer_name, 0),
+                )
+        epoch = window.epoch
+        self._transmit(window.enqueue(lambda seq: build(seq, epoch), network))
+        self._arm()
+
+    def acknowledge(self, peer_name: str, ack: int, epoch: int = 0) -> None:
+        """Apply a cumulative ack from *peer_name*; other epochs' are stale."""
+        window = self._windows.get(peer_name)
+        if window is None or window.epoch != epoch:
+            return
+        self._transmit(window.acknowledge(ack))
+        with self._acked:
+            self._acked.notify_all()
+
+    def retransmit(self, now: float = None) -> int:
+        """Resend every message whose timer expired; returns how many."""
+        due = []
+        for peer_name, window in list(self._windows.items()):
+            expired, dropped = window.expired(now)
+            if dropped:
+                with self._acked:
+                    if self._windows.get(peer_name) is window:
+                        del self._windows[peer_name]
+                        self._epochs[peer_name] = window.epoch + 1
+                    self._acked.notify_all()
+                _GAVE_UP.inc(dropped)
+                logger.warning(
+                    "[RELIABLE] No ack from %s after %d retries; dropped %d "
+                    "message(s).",
+                    peer_name,
+                    self.max_retries,
+                    dropped,
+                )
+            elif expired:
+                logger.info(
+                    "[RELIABLE] Retransmitting %d message(s) to %s.",
+                    len(expired),
+                    peer_name,
+                )
+            due.extend(expired)
+        RETRANSMITTED.inc(len(due))
+        self._transmit(due)
+        return len(due)
+
+    def pending(self, peer_name: str = None) -> int:
+        """Unacknowledged messages, for one peer or in total."""
+        if peer_name is not None:
+            window = self._windows.get(peer_name)
+            return len(window) if window else 0
+        return sum(len(w) for w in list(self._windows.values()))
+
+    def wait_acked(self, timeout: float = None) -> bool:
+        """Block until everything sent is acknowledged; False on timeout."""
+        with self._acked:
+            return self._acked.wait_for(lambda: not self.pending(), timeout)
+
+    def _transmit(self, items):
+        with self._lock:
+            self._outbox.extend(items)
+            if self._pumping:
+                return  # the thread already pumping will send these too
+            self._pumping = True
+        while True:
+            with self._lock:
+                if not self._outbox:
+                    self._pumping = False
+                    return
+                message, network = self._outbox.popleft()
+            try:
+                self._send(message, network)
+            except Exception:
+                logger.exception("[RELIABLE] Sending %s failed.", message.data)
+
+    def _arm(self):
+        """Start the retransmission timer if it is not already running."""
+        if self._timer is not None or self._closed:
+            return
+        deadlines = [w.next_deadline() for w in list(self._windows.values())]
+        deadlines = [d for d in deadlines if d is not None]
+        with self._lock:
+            if self._timer is not None or self._closed or not deadlines:
+                return
+            delay = max(0.0, min(deadlines) - time.monotonic())
+            self._timer = threading.Timer(delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self.retransmit()
+        self._arm()
+
+    def close(self) -> None:
+        """Stop retransmitting for good; unacknowledged messages are kept."""
+        with self._lock:
+            self._closed = True
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
@@ -0,0 +1,181 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Chunked, authenticated streaming encryption for large payloads.
+
+A stream is a header followed by length-prefixed ChaCha20-Poly1305 chunks.
+Each chunk nonce is an 8-byte per-stream prefix plus a 4-byte counter, and
+the final chunk is marked in the associated data, so reordered, dropped or
+truncated chunks are all rejected. Memory use is bounded by the chunk size
+regardless of payload length.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import struct
+
+from Crypto.Cipher import ChaCha20_Poly1305
+from Crypto.Random import get_random_bytes
+
+from src import RSA_utils
+
+CHUNK_SIZE = 64 * 1024
+KEY_SIZE = 32
+TAG_SIZE = 16
+
+_MAGIC = b"P2PS\x01"
+_PREFIX_SIZE = 8
+_LEN = struct.Struct("!I")
+_LAST = b"\x01"
+_MORE = b"\x00"
+
+
+def _chunks(source, chunk_size):
+    """Yield *source* as ``chunk_size`` blocks (the last may be shorter).
+
+    *source* is ``bytes``-like, a file-like object with ``read`` or an
+    iterable of bytes.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast("B")
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+    elif hasattr(source, "read"):
+        while True:
+            block = source.read(chunk_size)
+            if not block:
+                return
+            yield block
+    else:
+        buffer = bytearray()
+        for piece in source:
+            buffer += piece
+            while len(buffer) >= chunk_size:
+                yield bytes(buffer[:chunk_size])
+                del buffer[:chunk_size]
+        if buffer:
+            yield bytes(buffer)
+
+
+def _nonce(prefix, counter):
+    if counter >= 2 ** 32:
+        raise ValueError("Stream too long for its nonce space")
+    return prefix + counter.to_bytes(4, "big")
+
+
+def encrypt_stream(source, key, chunk_size=CHUNK_SIZE):
+    """Encrypt *source* lazily, yielding the header and then one frame per chunk.
+
+    Args:
+        source (bytes, file-like or Iterable[bytes]): Plaintext input.
+        key (bytes): 32-byte stream key.
+        chunk_size (int, optional): Plaintext bytes per chunk.
+
+    Yields:
+        bytes: Stream header, then ``length || ciphertext || tag`` frames.
+    """
+    prefix = get_random_bytes(_PREFIX_SIZE)
+    yield _MAGIC + prefix
+    counter = 0
+    pending = None
+    for block in _chunks(source, chunk_size):
+        if pending is not None:
+            yield _seal(key, prefix, counter, pending, _MORE)
+            counter += 1
+        pending = block
+    yield _seal(key, prefix, counter, pending or b"", _LAST)
+
+
+def _seal(key, prefix, counter, block, flag):
+    cipher = ChaCha20_Poly1305.new(key=key, nonce=_nonce(prefix, counter))
+    cipher.update(flag)
+    ct, tag = cipher.encrypt_and_digest(block)
+    return _LEN.pack(len(ct) + TAG_SIZE) + ct + tag
+
+
+def decrypt_stream(source, key):
+    """Decrypt a stream produced by :func:`encrypt_stream`, chunk by chunk.
+
+    Args:
+        source (file-like or Iterable[bytes]): Encrypted stream bytes, split
+            arbitrarily.
+        key (bytes): 32-byte stream key.
+
+    Yields:
+        bytes: Plaintext chunks in order.
+
+    Raises:
+        ValueError: On a bad header, a failed tag, a truncated stream or
+            data after the final chunk.
+    """
+    buffer = bytearray()
+    pieces = iter(source.read, b"") if hasattr(source, "read") else iter(source)
+
+    def fill(n):
+        while len(buffer) < n:
+            piece = next(pieces, None)
+            if piece is None:
+                raise ValueError("Stream truncated")
+            buffer.extend(piece)
+
+    def at_end():
+        # Read ahead so the final chunk is verified as final exactly once
+        while not buffer:
+            piece = next(pieces, None)
+            if piece is None:
+                return True
+            buffer.extend(piece)
+        return False
+
+    fill(len(_MAGIC) + _PREFIX_SIZE)
+    if bytes(buffer[:len(_MAGIC)]) != _MAGIC:
+        raise ValueError("Not an encrypted stream")
+    prefix = bytes(buffer[len(_MAGIC):len(_MAGIC) + _PREFIX_SIZE])
+    del buffer[:len(_MAGIC) + _PREFIX_SIZE]
+
+    counter = 0
+    while True:
+        fill(_LEN.size)
+        (length,) = _LEN.unpack_from(buffer)
+        if length < TAG_SIZE:
+            raise ValueError("Malformed chunk")
+        fill(_LEN.size + length)
+        frame = bytes(buffer[_LEN.size:_LEN.size + length])
+        del buffer[:_LEN.size + length]
+        last = at_end()
+        cipher = ChaCha20_Poly1305.new(key=key, nonce=_nonce(prefix, counter))
+        cipher.update(_LAST if last else _MORE)
+        try:
+            block = cipher.decrypt_and_verify(frame[:-TAG_SIZE], frame[-TAG_SIZE:])
+        except ValueError:
+            raise ValueError("Chunk failed verification") from None
+        yield block
+        if last:
+            return
+        counter += 1
+
+
+class StreamPayload:
+    """A lazily encrypted attachment travelling as ``MessageClass.data``.
+
+    RSA wraps only the random stream key; the body is produced chunk by
+    chunk as the recipient consumes :attr:`frames`, which can therefore be
+    iterated exactly once.
+
+    Args:
+        source (bytes, file-like or Iterable[bytes]): Plaintext input.
+        public_key (Crypto.PublicKey.RSA.RsaKey): Recipient's public key.
+        chunk_size (int, optional): Plaintext bytes per chunk.
+    """
+
+    def __init__(self, source, public_key, chunk_size=CHUNK_SIZE):
+        key = get_random_bytes(KEY_SIZE)
+        self.wrapped_key = RSA_utils.wrap_key(key, public_key)
+        self.frames = encrypt_stream(source, key, chunk_size)
+
+    def open(self, private_key):
+        """Unwrap the stream key and yield plaintext chunks."""
+        key = RSA_utils.unwrap_key(self.wrapped_key, private_key)
+        return decrypt_stream(self.frames, key)
+
+    def __str__(self):
+        return "<encrypted stream>"
@@ -0,0 +1,405 @@
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~
+Socket transport for running the demo network across processes.
+
+A small hub relays length-prefixed frames between terminals over TCP or a
+Unix domain socket. Each frame is a 4-byte big-endian length followed by a
+binary ``WireMessage``, so a delivery costs a single socket write instead of
+a rewrite of the on-disk history.
+
+Author: Ahsan Bilal, University of Oklahoma
+"""
+
+import asyncio
+import os
+import selectors
+import socket
+import struct
+import threading
+
+from src.logging import logger
+from src.message import WireMessage, FLAG_HELLO, FLAG_OBSERVER
+from src.network import NetworkClass, BROADCAST
+from src.reliable import AckPayload, SequencedPayload
+
+DEFAULT_ADDRESS = "tcp://127.0.0.1:8765"
+MAX_FRAME = 16 * 1024 * 1024
+# Bytes a hub may buffer for one peer before dropping it as too slow
+HIGH_WATER = 2 * MAX_FRAME
+
+_HEADER = struct.Struct("!I")
+# Payloads WireMessage can carry; streamed attachments stay local
+_WIRE_PAYLOADS = (str, bytes, SequencedPayload, AckPayload)
+
+
+def parse_address(address: str):
+    """Split ``tcp://host:port`` or ``unix:///path`` into ``(kind, target)``.
+
+    Raises:
+        ValueError: If the scheme is not ``tcp`` or ``unix``.
+    """
+    if address.startswith("unix://"):
+        return "unix", address[len("unix://"):]
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError("Unsupported address: use 'tcp://host:port' or 'unix:///path'")
+
+
+def encode_frame(payload: bytes) -> bytes:
+    """Prefix *payload* with its length, ready for a single socket write."""
+    return _HEADER.pack(len(payload)) + payload
+
+
+def decode_frames(buffer: bytearray):
+    """Pop every complete frame from *buffer* and yield its payload bytes.
+
+    Raises:
+        ValueError: If a frame header announces more than ``MAX_FRAME`` bytes.
+    """
+    while len(buffer) >= _HEADER.size:
+        (length,) = _HEADER.unpack_from(buffer)
+        if length > MAX_FRAME:
+            raise ValueError(f"Frame of {length} bytes exceeds limit")
+        end = _HEADER.size + length
+        if len(buffer) < end:
+            return
+        payload = bytes(buffer[_HEADER.size:end])
+        del buffer[:end]
+        yield payload
+
+
+async def _read_frame(reader):
+    """Read one frame from an asyncio stream; return ``(raw, payload)``."""
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME:
+        raise ValueError(f"Frame of {length} bytes exceeds limit")
+    payload = await reader.readexactly(length)
+    return header + payload, payload
+
+
+class HubServer:
+    """Asyncio relay that pushes each frame to its recipient and all observers.
+
+    Clients introduce themselves with a ``FLAG_HELLO`` wire message (plus
+    ``FLAG_OBSERVER`` to receive all traffic). Every following frame is routed
+    by peeking at its wire header and forwarded verbatim, without decoding
+    the payload. A sender is never held up by a slow reader: a peer with
+    more than ``HIGH_WATER`` bytes waiting in its write buffer is
+    disconnected instead.
+
+    Args:
+        address (str, optional): ``tcp://host:port`` or ``unix:///path``.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS):
+        self.address = address
+        self._peers = {}  # {name: StreamWriter}
+        self._observers = {}  # {name: StreamWriter}
+        self._server = None
+
+    async def start(self):
+        """Bind the listening socket."""
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            # Only reached once connecting failed, so any file here is stale.
+            if os.path.exists(target):
+                os.unlink(target)
+            self._server = await asyncio.start_unix_server(self._handle, path=target)
+        else:
+            host, port = target
+            self._server = await asyncio.start_server(self._handle, host, port)
+        logger.info("[HUB] Listening on %s.", self.address)
+
+    async def serve_forever(self):
+        """Start (if needed) and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self):
+        """Run the hub on a daemon thread; return once it is listening.
+
+        Raises:
+            OSError: If the address cannot be bound.
+        """
+        ready = threading.Event()
+        failure = []
+
+        async def run():
+            try:
+                await self.start()
+            except OSError as exc:
+                failure.append(exc)
+                return
+            finally:
+                ready.set()
+            await self.serve_forever()
+
+        threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+
+    async def _handle(self, reader, writer):
+        name = None
+        try:
+            _, hello = await _read_frame(reader)
+            flags, name, _ = WireMessage.peek(hello)
+            if not flags & FLAG_HELLO:
+                raise ValueError("Expected a hello frame")
+            self._peers[name] = writer
+            if flags & FLAG_OBSERVER:
+                self._observers[name] = writer
+            logger.info("[HUB] %s connected.", name)
+            while True:
+                raw, payload = await _read_frame(reader)
+                _, _, recipient = WireMessage.peek(payload)
+                self._route(name, recipient, raw)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            if name is not None and self._peers.get(name) is writer:
+                del self._peers[name]
+                self._observers.pop(name, None)
+                logger.info("[HUB] %s disconnected.", name)
+            writer.close()
+
+    def _route(self, sender, recipient, raw):
+        targets = dict(self._observers)
+        writer = self._peers.get(recipient)
+        if writer is not None:
+            targets[recipient] = writer
+        targets.pop(sender, None)
+        for name, writer in targets.items():
+            writer.write(raw)
+            backlog = writer.transport.get_write_buffer_size()
+            if backlog > HIGH_WATER:
+                logger.warning(
+                    "[HUB] Disconnected slow peer %s (%d bytes unsent).", name, backlog
+                )
+                self._disconnect(name, writer)
+
+    def _disconnect(self, name, writer):
+        if self._peers.get(name) is writer:
+            del self._peers[name]
+        if self._observers.get(name) is writer:
+            del self._observers[name]
+        writer.close()
+
+
+class HubClient:
+    """Blocking-send, push-receive connection to a :class:`HubServer`.
+
+    Incoming frames are read by one ``selectors`` loop on a daemon thread,
+    decoded to ``WireMessage`` and handed to *on_record*; :meth:`send`
+    performs a single ``sendall``. A frame that breaks the framing (one
+    longer than ``MAX_FRAME``) closes the connection, since the stream cannot
+    be resynchronised; the reason is kept in :attr:`error` and later sends
+    raise ``ConnectionError``.
+
+    Args:
+        name (str): Identity announced to the hub.
+        address (str, optional): ``tcp://host:port`` or ``unix:///path``.
+        observer (bool, optional): Ask the hub for a copy of all traffic.
+        on_record (Callable[[WireMessage], None], optional): Frame callback.
+    """
+
+    def __init__(self, name, address=DEFAULT_ADDRESS, observer=False, on_record=None):
+        self.name = name
+        self.address = address
+        self.observer = observer
+        self.on_record = on_record
+        self._sock = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self.error = None
+
+    def connect(self):
+        """Open the socket, announce ourselves and start the reader thread.
+
+        Raises:
+            OSError: If the hub is unreachable.
+        """
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(target)
+        else:
+            sock = socket.create_connection(target)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        flags = FLAG_HELLO | (FLAG_OBSERVER if self.observer else 0)
+        self.send(WireMessage(self.name, "", flags=flags))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, message: WireMessage):
+        """Write *message* to the hub as one frame.
+
+        Raises:
+            ConnectionError: If the reader closed the connection on a bad frame.
+        """
+        frame = encode_frame(message.encode())
+        with self._lock:
+            self._check()
+            self._sock.sendall(frame)
+
+    def send_many(self, messages):
+        """Write several messages with a single ``sendall``."""
+        frames = b"".join(encode_frame(m.encode()) for m in messages)
+        with self._lock:
+            self._check()
+            self._sock.sendall(frames)
+
+    def _check(self):
+        if self.error is not None:
+            raise ConnectionError(f"Hub connection closed: {self.error}")
+
+    def _run(self):
+        buffer = bytearray()
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._sock, selectors.EVENT_READ)
+            while True:
+                selector.select()
+                try:
+                    chunk = self._sock.recv(65536)
+                except OSError:
+                    return
+                if not chunk:
+                    return
+                buffer += chunk
+                try:
+                    for payload in decode_frames(buffer):
+                        if self.on_record is not None:
+                            try:
+                                self.on_record(WireMessage.decode(payload))
+                            except Exception:
+                                logger.exception(
+                                    "[%s] Failed to handle frame.", self.name
+                                )
+                except ValueError as exc:
+                    logger.error("[%s] Closing hub connection: %s.", self.name, exc)
+                    self.error = exc
+                    self.close()
+                    return
+
+    def close(self):
+        """Shut the connection down; the reader thread exits on EOF."""
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._sock.close()
+
+
+class RemotePeer:
+    """Stand-in for a participant that lives in another process."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.is_bad_man = False
+
+    def __str__(self):
+        return self.name
+
+
+class SocketNetworkClass(NetworkClass):
+    """:class:`NetworkClass` whose payloads also travel through a hub.
+
+    Local delivery is unchanged. In addition, every payload sent by the
+    connected local participant is pushed to the hub, and payloads pushed by
+    the hub are handed straight to that participant's ``receive_message``.
+    RSA key messages stay local, because each process holds its own stand-ins
+    for the remote peers.
+
+    Args:
+        name (str): Human-readable network name.
+        address (str, optional): Hub address.
+        mode (str, optional): ``"broadcast"`` (default) or ``"routed"``.
+    """
+
+    def __init__(self, name: str, address: str = DEFAULT_ADDRESS, mode: str = BROADCAST):
+        super().__init__(name, mode=mode)
+        self.address = address
+        self._local = None
+        self._client = None
+        self._on_receive = None
+
+    def connect(self, person, on_receive=None, serve_if_missing=True):
+        """Attach *person* to the hub, starting one in-process if none answers.
+
+        Args:
+            person (PersonClass): The participant living in this process.
+            on_receive (Callable[[MessageClass], None], optional): Called after
+                ``person.receive_message`` for every pushed payload.
+            serve_if_missing (bool, optional): Host the hub on a background
+                thread when connecting fails. Defaults to True.
+        """
+        self._local = person
+        self._on_receive = on_receive
+        client = HubClient(
+            person.name,
+            self.address,
+            observer=person.is_bad_man,
+            on_record=self._handle_record,
+        )
+        try:
+            client.connect()
+        except OSError:
+            if not serve_if_missing:
+                raise
+            HubServer(self.address).start_in_thread()
+            client.connect()
+        self._client = client
+
+    def _handle_record(self, wire):
+        if wire.flags & FLAG_HELLO:
+            return
+        sender = self._index.get(wire.sender) or RemotePeer(wire.sender)
+        if wire.recipient == self._local.name:
+            to_person = self._local
+        else:
+            to_person = self._index.get(wire.recipient) or RemotePeer(wire.recipient)
+        message = wire.to_message(sender, to_person)
+        self._local.receive_message(message, network=self)
+        if self._on_receive is not None:
+            self._on_receive(message)
+
+    def send_message(self, message):
+        """Deliver locally, then push the payload to the hub."""
+        super().send_message(message)
+        if not isinstance(message.data, _WIRE_PAYLOADS):
+            # Streamed attachments are single-use iterators; keep them local.
+            return
+        if self._client is not None and message.sender is self._local:
+            self._client.send(WireMessage.from_message(message))
+
+    def send_batch(self, messages):
+        """Deliver the batch locally, then push it to the hub in one write."""
+        super().send_batch(messages)
+        if self._client is not None:
+            wires = [
+                WireMessage.from_message(m)
+                for m in messages
+                if m.sender is self._local and isinstance(m.data, _WIRE_PAYLOADS)
+            ]
+            if wires:
+                self._client.send_many(wires)
+
+    def close(self):
+        """Disconnect from the hub."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a standalone message hub")
+    parser.add_argument("address", nargs="?", default=DEFAULT_ADDRESS)
+    asyncio.run(HubServer(parser.parse_args().address).serve_forever())
@@ -0,0 +1,6 @@
+import logging
+
+from src.fun_introduction import set_trace
+
+# Keep the @introduce banners and INFO chatter out of test output
+set_trace(enabled=False, level=logging.WARNING)
@@ -0,0 +1,80 @@
+import pytest
+
+from src import person as person_module
+from src.channel import ratchet
+from src.cryp import CipherClass
+from src.network import NetworkClass, ROUTED
+from src.person import PersonClass
+
+
+@pytest.fixture
+def channel_of_three(monkeypatch):
+    # An authenticated mode, so decrypting under a wrong key always fails
+    monkeypatch.setattr(person_module, "ALGO", "AES-GCM")
+    network = NetworkClass("test", mode=ROUTED)
+    owner = PersonClass("Alice", key_exchange="X25519")
+    bob = PersonClass("Bob", key_exchange="X25519")
+    # Mallory listens to all traffic and keeps trying once removed
+    mallory = PersonClass("Mallory", is_bad_man=True, key_exchange="X25519")
+    received = {"Bob": [], "Mallory": []}
+    for member in (owner, bob, mallory):
+        network.join(member)
+        if member is not owner:
+            owner.secure_partners[member.name] = CipherClass(member.name, "AES-GCM")
+            member.secure_partners["Alice"] = CipherClass(member.name, "AES-GCM")
+            member.on_message = (
+                lambda event, name=member.name: received[name].append(event["text"])
+            )
+    channel = owner.create_channel("team", [bob, mallory], network)
+    return network, owner, bob, mallory, channel, received
+
+
+def test_members_read_channel_messages(channel_of_three):
+    network, owner, _, _, channel, received = channel_of_three
+    owner.send_group_message(channel, "hello team", network)
+    assert received == {"Bob": ["hello team"], "Mallory": ["hello team"]}
+
+
+def test_removal_rekeys_the_channel(channel_of_three):
+    network, owner, bob, mallory, channel, received = channel_of_three
+    old_key = owner.channel_keys["team"][0]
+    owner.remove_from_channel(channel, mallory, network)
+
+    assert channel.epoch == 1
+    new_key = owner.channel_keys["team"][1]
+    # A fresh key, not a ratchet Mallory could compute from the old one
+    assert new_key not in (old_key, ratchet(old_key))
+    assert bob.channel_keys["team"][1] == new_key
+    assert 1 not in mallory.channel_keys["team"]
+
+    owner.send_group_message(channel, "after the removal", network)
+    assert received["Bob"] == ["after the removal"]
+    assert received["Mallory"] == []
+
+
+def test_join_ratchets_the_key_for_the_newcomer_only(channel_of_three):
+    network, owner, bob, mallory, channel, _ = channel_of_three
+    carol = PersonClass("Carol", key_exchange="X25519")
+    network.join(carol)
+    owner.secure_partners["Carol"] = CipherClass("Carol", "AES-GCM")
+    carol.secure_partners["Alice"] = CipherClass("Carol", "AES-GCM")
+    owner.add_to_channel(channel, carol, network)
+
+    assert carol.channel_keys["team"] == {1: ratchet(owner.channel_keys["team"][0])}
+    assert 0 not in carol.channel_keys["team"]  # no access to earlier history
+    assert 1 not in bob.channel_keys["team"]  # derived on demand instead
+
+
+def test_only_the_owner_changes_membership(channel_of_three):
+    network, _, bob, mallory, channel, _ = channel_of_three
+    with pytest.raises(ValueError):
+        bob.remove_from_channel(channel, mallory, network)
+
+
+def test_removing_a_non_member_does_not_rekey(channel_of_three):
+    network, owner, _, mallory, channel, _ = channel_of_three
+    owner.remove_from_channel(channel, mallory, network)
+    with pytest.raises(ValueError, match="not a member"):
+        owner.remove_from_channel(channel, mallory, network)
+    assert channel.epoch == 1
+    assert list(owner.channel_keys["team"]) == [0, 1]
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from src.compress import LZMA, ZLIB, build_dictionary, compress, decompress
+
+TEXT = "the quick brown fox jumps over the lazy dog. " * 20
+
+
+@pytest.mark.parametrize("method", [ZLIB, LZMA])
+def test_round_trip(method):
+    frame = compress(TEXT, method)
+    assert len(frame) < len(TEXT)
+    assert decompress(frame) == TEXT
+
+
+def test_dictionary_compresses_short_messages():
+    dictionary = build_dictionary(["see you at the meeting tomorrow"] * 3)
+    text = "see you at the meeting tomorrow!"
+    assert compress(text) is None  # too short without a dictionary
+    frame = compress(text, dictionary=dictionary)
+    assert decompress(frame, dictionary) == text
+    with pytest.raises(ValueError, match="dictionary"):
+        decompress(frame, build_dictionary(["something else entirely"]))
+
+
+def random_text(length):
+    """Text whose UTF-8 bytes are close to uniformly distributed."""
+    rng = random.Random(0)
+    return "".join(
+        chr(rng.randrange(128) if rng.random() < 2 / 3 else rng.randrange(0x80, 0x800))
+        for _ in range(length)
+    )
+
+
+@pytest.mark.parametrize("length", [1000, 10000])  # the second is probed first
+def test_incompressible_text_is_sent_as_is(length):
+    assert compress(random_text(length)) is None
+
+
+def test_bad_frames_and_methods_are_rejected():
+    frame = compress(TEXT)
+    for bad in (b"", frame[:len(frame) // 2], b"\x09" + frame[1:]):
+        with pytest.raises(ValueError):
+            decompress(bad)
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        compress(TEXT, "brotli")
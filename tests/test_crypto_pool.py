@@ -0,0 +1,67 @@
+from concurrent.futures import Future
+
+import pytest
+
+from src.cryp import CipherClass
+from src.crypto_pool import CryptoPool, OrderedLanes, chain, completed
+from src.network import NetworkClass
+from src.person import PersonClass
+
+
+@pytest.fixture
+def pool():
+    pool = CryptoPool(workers=2)
+    yield pool
+    pool.close()
+
+
+def test_lanes_run_callbacks_in_submission_order():
+    lanes = OrderedLanes()
+    first, second = Future(), Future()
+    seen = []
+    lanes.submit("alice", first, lambda f: seen.append(f.result()))
+    lanes.submit("alice", second, lambda f: seen.append(f.result()))
+    lanes.submit("bob", completed("b"), lambda f: seen.append(f.result()))
+    second.set_result(2)
+    assert seen == ["b"]  # alice's second result waits for her first
+    first.set_result(1)
+    assert seen == ["b", 1, 2]
+    assert lanes.wait_idle(timeout=1)
+
+
+def test_chain_waits_for_the_first_future():
+    key = Future()
+    result = chain(key, lambda value: completed(value * 2))
+    assert not result.done()
+    key.set_result(21)
+    assert result.result(timeout=1) == 42
+
+
+def test_pool_round_trips_every_algorithm(pool):
+    for algo in ("DES", "AES", "AES-GCM", "CHACHA20"):
+        cipher = CipherClass("shared", algo)
+        ciphertext = pool.encrypt(cipher, "hello").result(timeout=5)
+        assert cipher.decrypt(ciphertext) == "hello"
+        assert pool.decrypt(cipher, ciphertext).result(timeout=5) == "hello"
+
+
+def test_pooled_receiver_keeps_each_senders_order(pool):
+    network = NetworkClass("test")
+    bob = PersonClass("Bob", key_exchange="X25519", crypto_pool=pool)
+    senders = [PersonClass(n, key_exchange="X25519") for n in ("Alice", "Carol")]
+    received = []
+    bob.on_message = lambda event: received.append((event["from"], event["text"]))
+    for person in [bob, *senders]:
+        network.join(person)
+    for sender in senders:
+        cipher = CipherClass(sender.name, "AES-GCM")
+        sender.secure_partners["Bob"] = cipher
+        bob.secure_partners[sender.name] = cipher
+
+    items = [(bob, f"message {i}") for i in range(50)]
+    for sender in senders:
+        sender.send_many(items, network)
+    assert bob.drain(timeout=10)
+    for sender in senders:
+        texts = [text for name, text in received if name == sender.name]
+        assert texts == [text for _, text in items]
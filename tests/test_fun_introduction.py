@@ -0,0 +1,58 @@
+import logging
+
+import pytest
+
+from src.fun_introduction import EVENT, introduce, set_trace
+from src.logging import logger
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def records():
+    handler = Collect()
+    logger.addHandler(handler)
+    yield handler.records
+    logger.removeHandler(handler)
+    set_trace(enabled=False, style="banner", sample_every=1, level=logging.WARNING)
+
+
+class Greeter:
+    @introduce
+    def greet(self):
+        return "hi"
+
+    def __str__(self):
+        return "greeter"
+
+
+@introduce
+def standalone(actor):
+    return "done"
+
+
+def test_set_trace_rebinds_methods_and_standalone_functions(records):
+    assert (Greeter().greet(), standalone("x")) == ("hi", "done")
+    assert records == []
+
+    set_trace(enabled=True, level=logging.INFO)
+    Greeter().greet()
+    standalone("x")
+    assert [getattr(r, "event", None) for r in records] == [None, None]
+
+    set_trace(style=EVENT)
+    Greeter().greet()
+    standalone("x")
+    assert [r.actor for r in records[2:]] == ["greeter", "x"]
+
+    set_trace(enabled=False)
+    Greeter().greet()
+    standalone("x")
+    assert len(records) == 4
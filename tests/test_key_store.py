@@ -0,0 +1,57 @@
+import sqlite3
+
+import pytest
+from Crypto.PublicKey import RSA
+
+from src import key_store
+from src.cryp import CipherClass
+from src.key_store import KeyStore
+
+
+@pytest.fixture
+def path(tmp_path, monkeypatch):
+    monkeypatch.setattr(key_store, "SCRYPT_N", 2 ** 10)  # fast, for tests only
+    return str(tmp_path / "keys.db")
+
+
+def test_wrong_passphrase_is_rejected(path):
+    KeyStore(path, "correct horse").close()
+    with pytest.raises(ValueError, match="Wrong passphrase"):
+        KeyStore(path, "battery staple")
+
+
+def test_keys_survive_a_restart(path):
+    store = KeyStore(path, "correct horse")
+    cipher = CipherClass("shared", "AES-GCM")
+    store.partners("Alice")["Bob"] = cipher
+    store.conversations("Alice")[frozenset({"Alice", "Bob"})] = "xor key"
+    private_key = RSA.generate(1024)
+    store.save_identity("Alice", private_key)
+    store.close()
+
+    store = KeyStore(path, "correct horse")
+    partners = store.partners("Alice")
+    assert list(partners) == ["Bob"]
+    assert partners["Bob"].key == cipher.key
+    assert partners["Bob"].decrypt(cipher.encrypt("hi")) == "hi"
+    assert store.conversations("Alice")[frozenset({"Bob", "Alice"})] == "xor key"
+    assert store.identity("Alice")[0] == private_key
+    assert store.identity("Bob") is None
+    assert "Carol" not in partners
+
+
+def test_swapped_rows_are_rejected(path):
+    store = KeyStore(path, "correct horse")
+    partners = store.partners("Alice")
+    partners["Bob"] = CipherClass("for bob", "AES")
+    partners["Eve"] = CipherClass("for eve", "AES")
+    store.close()
+
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "UPDATE secrets SET sealed = (SELECT sealed FROM secrets WHERE name = 'Eve')"
+            " WHERE name = 'Bob'"
+        )
+    store = KeyStore(path, "correct horse")
+    with pytest.raises(ValueError):
+        store.partners("Alice")["Bob"]
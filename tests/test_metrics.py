@@ -0,0 +1,57 @@
+import pytest
+
+from src.cryp import CipherClass
+from src.message import MessageClass
+from src.metrics import UNDECRYPTABLE, MetricsRegistry
+from src.network import NetworkClass
+from src.person import PersonClass
+
+
+def test_counter_and_histogram_render_in_prometheus_format():
+    registry = MetricsRegistry()
+    sent = registry.counter("sent_total", "Messages sent.", ("kind",))
+    sent.labels("chat").inc()
+    sent.labels("chat").inc(2)
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    latency.observe(0.05)
+    latency.observe(0.5)
+
+    assert registry.render().splitlines() == [
+        "# HELP sent_total Messages sent.",
+        "# TYPE sent_total counter",
+        'sent_total{kind="chat"} 3',
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 1',
+        'latency_seconds_bucket{le="1.0"} 2',
+        'latency_seconds_bucket{le="+Inf"} 2',
+        "latency_seconds_sum 0.55",
+        "latency_seconds_count 2",
+    ]
+
+
+def test_registry_rejects_conflicting_kinds():
+    registry = MetricsRegistry()
+    assert registry.counter("x", "X.") is registry.counter("x", "X.")
+    with pytest.raises(ValueError):
+        registry.histogram("x", "X.")
+    with pytest.raises(ValueError):
+        registry.counter("y", "Y.", ("a",)).labels()
+
+
+def test_undecryptable_messages_are_counted_by_reason():
+    network = NetworkClass("test")
+    alice = PersonClass("Alice", key_exchange="X25519")
+    bob = PersonClass("Bob", key_exchange="X25519")
+    for person in (alice, bob):
+        network.join(person)
+    missing = UNDECRYPTABLE.labels("missing_key")
+    failed = UNDECRYPTABLE.labels("failed_verification")
+    before = missing.value, failed.value
+
+    ciphertext = CipherClass("alice's key", "AES-GCM").encrypt("secret")
+    network.send_message(MessageClass(ciphertext, alice, bob, True))
+    bob.secure_partners["Alice"] = CipherClass("another key", "AES-GCM")
+    network.send_message(MessageClass(ciphertext, alice, bob, True))
+
+    assert (missing.value, failed.value) == (before[0] + 1, before[1] + 1)
@@ -0,0 +1,178 @@
+import pytest
+
+from src import reliable
+from src.cryp import CipherClass
+from src.message import MessageClass, WireMessage
+from src.network import NetworkClass, ROUTED
+from src.person import PersonClass
+from src.reliable import (
+    ACCEPTED, DUPLICATE, OUT_OF_WINDOW, AckPayload, ReceiveWindow, SendWindow,
+    SequencedPayload,
+)
+
+
+class Recording(NetworkClass):
+    """Routed network that remembers sequenced messages and can drop them."""
+
+    def __init__(self):
+        super().__init__("test", mode=ROUTED)
+        self.sent = []
+        self.drop = False
+
+    def send_message(self, message):
+        if isinstance(message.data, SequencedPayload):
+            self.sent.append(message)
+            if self.drop:
+                return
+        super().send_message(message)
+
+
+def pair(algo="AES"):
+    """Alice (with a window) and Bob on a recording network, optionally keyed."""
+    network = Recording()
+    # A long rto keeps the background timer out of the way; tests call retransmit
+    alice = PersonClass("Alice", key_exchange="X25519", window=2, rto=60)
+    bob = PersonClass("Bob", key_exchange="X25519")
+    if algo:
+        alice.secure_partners["Bob"] = CipherClass("shared", algo)
+        bob.secure_partners["Alice"] = CipherClass("shared", algo)
+    for person in (alice, bob):
+        network.join(person)
+    received = []
+    bob.on_message = lambda event: received.append(event["text"])
+    return network, alice, bob, received
+
+
+def test_receive_window_orders_and_suppresses_duplicates():
+    window = ReceiveWindow(size=4)
+    assert window.accept(1, "b") == (ACCEPTED, [], 0)
+    assert window.accept(0, "a") == (ACCEPTED, ["a", "b"], 2)
+    assert window.accept(1, "b") == (DUPLICATE, [], 2)
+    assert window.accept(6, "g") == (OUT_OF_WINDOW, [], 2)
+    assert window.accept(5, "f") == (ACCEPTED, [], 2)
+
+
+def test_send_window_limits_flight_and_slides_on_ack():
+    window = SendWindow(size=2, rto=1.0)
+    sent = [window.enqueue(lambda seq: seq, None, now=0) for _ in range(3)]
+    assert sent == [[(0, None)], [(1, None)], []]
+    assert window.acknowledge(0, now=0) == []  # stale
+    assert window.acknowledge(3, now=0) == []  # beyond what was sent
+    assert window.acknowledge(1, now=0) == [(2, None)]
+    assert len(window) == 2
+
+
+def test_send_window_backs_off_then_gives_up():
+    window = SendWindow(size=2, rto=1.0, max_retries=2)
+    window.enqueue(lambda seq: seq, None, now=0)
+    assert window.expired(now=0.5) == ([], 0)
+    assert window.expired(now=1) == ([(0, None)], 0)
+    assert window.expired(now=2) == ([], 0)  # timeout doubled to 2 s
+    assert window.expired(now=3) == ([(0, None)], 0)
+    assert window.expired(now=7) == ([], 1)
+    assert len(window) == 0
+
+
+@pytest.mark.parametrize("algo", [None, "DES", "AES-GCM"])
+def test_messages_arrive_once_and_in_order(algo):
+    network, alice, bob, received = pair(algo)
+    network.drop = True
+    alice.send_message(bob, "lost", network)
+    network.drop = False
+    for text in ("one", "two", "three"):
+        alice.send_message(bob, text, network)
+    assert received == []  # blocked behind the lost message
+
+    # Both messages in flight time out; "one" is already buffered by Bob
+    assert alice.retransmit(now=float("inf")) == 2
+    assert received == ["lost", "one", "two", "three"]
+    assert alice.wait_acked(timeout=1)
+
+    network.send_message(network.sent[1])  # replay
+    assert received == ["lost", "one", "two", "three"]
+
+
+@pytest.mark.parametrize("algo", ["DES", "AES", "AES-GCM", "CHACHA20"])
+def test_tampered_or_renumbered_messages_are_rejected(algo):
+    network, alice, bob, received = pair(algo)
+    alice.send_message(bob, "transfer $100", network)
+    original = network.sent[0]
+    sealed = bytearray(original.data.data)
+
+    flipped = bytes(sealed[:-1]) + bytes([sealed[-1] ^ 1])
+    renumbered = SequencedPayload(1, bytes(sealed))
+    bodged_iv = bytes([sealed[0] ^ 1]) + bytes(sealed[1:])
+    new_epoch = SequencedPayload(0, bytes(sealed), 1)
+    for payload in (SequencedPayload(1, flipped), renumbered,
+                    SequencedPayload(1, bodged_iv), new_epoch):
+        network.send_message(MessageClass(payload, alice, bob, True))
+
+    assert received == ["transfer $100"]
+    assert bob._receive_windows["Alice"].expected == 1
+    assert bob._receive_windows["Alice"].epoch == 0
+
+
+class AckDropping(Recording):
+    """Recording network that can also lose every ack."""
+
+    def __init__(self):
+        super().__init__()
+        self.drop_acks = False
+
+    def send_message(self, message):
+        if self.drop_acks and isinstance(message.data, AckPayload):
+            return
+        super().send_message(message)
+
+
+@pytest.mark.parametrize("lost", ["acks", "messages"])
+def test_giving_up_starts_a_new_epoch(lost):
+    network = AckDropping()
+    alice = PersonClass("Alice", key_exchange="X25519", window=2, rto=60)
+    bob = PersonClass("Bob", key_exchange="X25519")
+    alice.secure_partners["Bob"] = bob.secure_partners["Alice"] = CipherClass(
+        "shared", "AES"
+    )
+    for person in (alice, bob):
+        network.join(person)
+    received = []
+    bob.on_message = lambda event: received.append(event["text"])
+
+    setattr(network, "drop_acks" if lost == "acks" else "drop", True)
+    alice.send_message(bob, "one", network)
+    alice.send_message(bob, "two", network)
+    for _ in range(alice._reliable.max_retries + 1):
+        alice.retransmit(now=float("inf"))
+    assert alice._reliable.pending("Bob") == 0  # given up
+    network.drop = network.drop_acks = False
+
+    alice.send_message(bob, "three", network)
+    assert received[-1] == "three"
+    assert alice._reliable.pending("Bob") == 0
+    assert network.sent[-1].data.epoch == 1
+
+    # A message from the abandoned epoch is not delivered again
+    network.send_message(network.sent[0])
+    assert received.count("one") == (1 if lost == "acks" else 0)
+
+
+def test_unauthenticated_ack_is_ignored():
+    network, alice, bob, _ = pair("AES")
+    network.drop = True
+    alice.send_message(bob, "hello", network)
+    forged = MessageClass(AckPayload(1), bob, alice, False)
+    network.send_message(forged)
+    assert alice._reliable.pending("Bob") == 1
+
+
+def test_sequenced_and_ack_payloads_survive_the_wire_format():
+    alice, bob = "Alice", "Bob"
+    for message in (
+        MessageClass(SequencedPayload(7, b"\x00sealed", 2), alice, bob, True),
+        MessageClass(SequencedPayload(8, "plain"), alice, bob, False),
+        MessageClass(AckPayload(9, b"t" * reliable.TAG_SIZE, 3), bob, alice, True),
+    ):
+        wire = WireMessage.decode(WireMessage.from_message(message).encode())
+        data = wire.to_message(message.sender, message.to_person).data
+        assert type(data) is type(message.data)
+        assert vars(data) == vars(message.data)
@@ -0,0 +1,82 @@
+import io
+
+import pytest
+from Crypto.Random import get_random_bytes
+
+from src.network import NetworkClass
+from src.person import PersonClass
+from src.stream import KEY_SIZE, decrypt_stream, encrypt_stream
+
+DATA = bytes(range(256)) * 40  # 10 KiB
+
+
+@pytest.fixture
+def key():
+    return get_random_bytes(KEY_SIZE)
+
+
+def frames(key, source=DATA, chunk_size=1024):
+    return list(encrypt_stream(source, key, chunk_size))
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        DATA,
+        bytearray(DATA),
+        io.BytesIO(DATA),
+        (DATA[i:i + 700] for i in range(0, len(DATA), 700)),
+    ],
+    ids=["bytes", "bytearray", "file", "iterator"],
+)
+def test_round_trip(key, source):
+    stream = frames(key, source)
+    assert len(stream) == 1 + 10  # header, then one frame per chunk
+    assert b"".join(decrypt_stream(stream, key)) == DATA
+
+
+def test_arbitrary_splits_and_empty_input(key):
+    joined = b"".join(frames(key))
+    pieces = [joined[i:i + 33] for i in range(0, len(joined), 33)]
+    assert b"".join(decrypt_stream(pieces, key)) == DATA
+    assert b"".join(decrypt_stream(frames(key, b""), key)) == b""
+
+
+def test_tampered_chunks_are_rejected(key):
+    header, *chunks = frames(key)
+    flipped = bytearray(chunks[3])
+    flipped[-1] ^= 1
+    for tampered in (
+        [header, *chunks[:3], bytes(flipped), *chunks[4:]],
+        [header, chunks[1], chunks[0], *chunks[2:]],  # reordered
+        [header, *chunks, chunks[-1]],  # data after the final chunk
+    ):
+        with pytest.raises(ValueError):
+            list(decrypt_stream(tampered, key))
+    with pytest.raises(ValueError, match="verification"):
+        list(decrypt_stream(frames(key), get_random_bytes(KEY_SIZE)))
+
+
+@pytest.mark.parametrize("keep", [0, 5, 9])
+def test_truncated_streams_are_rejected(key, keep):
+    header, *chunks = frames(key)
+    with pytest.raises(ValueError):
+        list(decrypt_stream([header, *chunks[:keep]], key))
+    joined = b"".join(frames(key))
+    with pytest.raises(ValueError, match="truncated"):
+        list(decrypt_stream([joined[:-1]], key))
+
+
+def test_bytes_are_sent_as_an_attachment():
+    network = NetworkClass("test")
+    alice = PersonClass("Alice", key_exchange="RSA")
+    bob = PersonClass("Bob", key_exchange="RSA")
+    for person in (alice, bob):
+        network.join(person)
+    received = []
+    bob.on_attachment = lambda sender, chunks: received.append(
+        (sender, b"".join(chunks))
+    )
+    alice.send_message(bob, b"raw bytes", network)
+    alice.send_message(bob, io.BytesIO(DATA), network)
+    assert received == [("Alice", b"raw bytes"), ("Alice", DATA)]
@@ -0,0 +1,25 @@
+import socket
+
+import pytest
+
+from src.message import WireMessage
+from src.transport import MAX_FRAME, HubClient
+
+
+def test_oversized_frame_closes_the_client():
+    listener = socket.create_server(("127.0.0.1", 0))
+    address = "tcp://127.0.0.1:%d" % listener.getsockname()[1]
+    received = []
+    client = HubClient("Alice", address, on_record=received.append)
+    client.connect()
+    hub, _ = listener.accept()
+    hub.sendall((MAX_FRAME + 1).to_bytes(4, "big"))
+    client._thread.join(timeout=5)
+
+    assert not client._thread.is_alive()
+    assert "exceeds limit" in str(client.error)
+    with pytest.raises(ConnectionError):
+        client.send(WireMessage("Alice", "Bob", b"hello"))
+    assert received == []
+    hub.close()
+    listener.close()